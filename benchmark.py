@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Neon DB MCP tools against the local mock Neon API.
+
+Starts neon_mock.MockNeonServer, points the server at it, then drives each
+tool through an in-memory MCP client under concurrent load and reports
+p50/p99 latency, requests per second and upstream API calls per tool.
+
+    python benchmark.py --projects 200 --concurrency 32 --iterations 500
+    python benchmark.py --tools get_project_details,list_project_branches --cold
+    python benchmark.py --codec --projects 200
+    python benchmark.py --memory --projects 5000 --branches 10
+
+--codec times the JSON path on its own instead: decoding representative API
+pages (whole, and item by item as streamed), and encoding them as tool results,
+for each available backend. --memory compares the memory held by decoded API
+objects with that of the compact records the server keeps them as.
+"""
+
+import argparse
+import asyncio
+import itertools
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from neon_mock import MockNeonServer, MockOrg, add_config_arguments, config_from_args
+
+def _project(org: MockOrg, i: int) -> Dict[str, Any]:
+    return org.projects[i % len(org.projects)]
+
+def _branch_args(org: MockOrg, i: int) -> Dict[str, Any]:
+    project = _project(org, i)
+    branches = org.branches[project["id"]]
+    return {"project_id": project["id"], "branch_id": branches[i % len(branches)]["id"]}
+
+# Tool name -> builder of call arguments for the i-th call
+SCENARIOS: Dict[str, Callable[[MockOrg, int], Dict[str, Any]]] = {
+    "list_projects": lambda org, i: {"limit": 10},
+    "get_project_details": lambda org, i: {"project_id": _project(org, i)["id"]},
+    "list_project_branches": lambda org, i: {"project_id": _project(org, i)["id"]},
+    "list_branch_databases": _branch_args,
+    "list_branch_roles": _branch_args,
+    "get_project_operations": lambda org, i: {"project_id": _project(org, i)["id"]},
+    "find_project_operations": lambda org, i: {"project_id": _project(org, i)["id"], "status": "finished", "limit": 5},
+    "list_project_endpoints": lambda org, i: {"project_id": _project(org, i)["id"]},
+    "get_organization_info": lambda org, i: {},
+    "search_projects_by_name": lambda org, i: {"name_pattern": _project(org, i)["name"].split("-")[0]},
+    "find_projects": lambda org, i: {"region_id": _project(org, i)["region_id"], "limit": 20},
+    "get_organization_inventory": lambda org, i: {},
+}
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+async def run_scenario(mcp_client: Any, server: MockNeonServer, tool: str, iterations: int,
+                       concurrency: int) -> Dict[str, Any]:
+    make_args = SCENARIOS[tool]
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors = 0
+    upstream_before = server.requests_total
+
+    async def worker() -> None:
+        nonlocal errors
+        while (i := next(counter)) < iterations:
+            started = time.perf_counter()
+            try:
+                await mcp_client.call_tool(tool, make_args(server.org, i))
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, iterations)))))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "tool": tool,
+        "calls": iterations,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "rps": round(iterations / elapsed, 1) if elapsed else 0.0,
+        "upstream_calls": server.requests_total - upstream_before,
+    }
+
+def print_table(results: List[Dict[str, Any]], columns: Optional[List[str]] = None) -> None:
+    columns = columns or ["tool", "calls", "errors", "p50_ms", "p99_ms", "mean_ms", "rps", "upstream_calls"]
+    widths = {col: max(len(col), *(len(str(row[col])) for row in results)) for col in columns}
+    print("  ".join(col.ljust(widths[col]) for col in columns))
+    print("  ".join("-" * widths[col] for col in columns))
+    for row in results:
+        print("  ".join(str(row[col]).ljust(widths[col]) for col in columns))
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    tools = args.tools.split(",") if args.tools else list(SCENARIOS)
+    unknown = [tool for tool in tools if tool not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown tools: {', '.join(unknown)}; choose from {', '.join(SCENARIOS)}")
+
+    server = MockNeonServer(config_from_args(args))
+    base_url = await server.start()
+    # Configure the server before it is imported: settings are read at import time
+    os.environ["NEON_API_BASE"] = base_url
+    os.environ["NEON_API_KEY"] = "mock-benchmark-key"
+    os.environ["NEON_RATE_LIMIT_RPS"] = str(args.rate_limit_rps)
+
+    from fastmcp import Client
+    import neonorgdb
+
+    results = []
+    try:
+        async with Client(neonorgdb.mcp) as mcp_client:
+            for tool in tools:
+                if args.cold:
+                    await neonorgdb.close_neon_client()
+                results.append(await run_scenario(mcp_client, server, tool, args.iterations, args.concurrency))
+    finally:
+        await server.stop()
+    return results
+
+CODEC_COLUMNS = ["payload", "backend", "bytes", "decode_ms", "stream_ms", "encode_ms", "encoded_bytes"]
+
+def _best_ms(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return round(best * 1000, 3)
+
+def run_codec(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Time decode, streamed decode and tool-result encode of mock API pages per JSON backend"""
+    from fastmcp.tools.tool import default_serializer
+    from neon_json import JSONCodec, iter_page, orjson
+    from neon_mock import MockOrg
+
+    org = MockOrg(config_from_args(args))
+    first = org.projects[0]["id"]
+    payloads = {
+        "projects": ("projects", {"projects": org.projects[:100], "pagination": {"cursor": "c"}}),
+        "operations": ("operations", {"operations": org.operations[first][:100], "pagination": {"cursor": "c"}}),
+        "consumption": ("projects", {
+            "projects": [org.daily_consumption(project["id"], "2024-01-01T00:00:00Z", "2025-01-01T00:00:00Z")
+                         for project in org.projects[:100]],
+            "pagination": {"cursor": "c"},
+        }),
+    }
+    backends = ["default"] + (["orjson"] if orjson is not None else [])
+    repeat = max(1, args.iterations // 20)
+    rows = []
+    for name, (items_key, payload) in payloads.items():
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        for backend in backends:
+            codec = JSONCodec(backend, fallback=default_serializer)
+            decoded = codec.loads(body)
+            rows.append({
+                "payload": name,
+                "backend": backend,
+                "bytes": len(body),
+                "decode_ms": _best_ms(lambda: codec.loads(body), repeat),
+                # Streaming always uses the standard library's incremental decoder
+                "stream_ms": _best_ms(lambda: sum(1 for _ in iter_page(body, items_key)[1]), repeat),
+                "encode_ms": _best_ms(lambda: codec.dumps(decoded), repeat),
+                "encoded_bytes": len(codec.dumps(decoded)),
+            })
+    return rows
+
+MEMORY_COLUMNS = ["kind", "items", "dict_bytes", "record_bytes", "ratio", "build_us", "rehydrate_us"]
+
+def _retained_bytes(build: Callable[[], Any]) -> Tuple[Any, int]:
+    """The value `build` returns and the bytes it still holds once built"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        value = build()
+        gc.collect()
+        return value, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+def run_memory(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Memory per object as decoded dicts and as records, from the JSON listings of a synthetic org"""
+    from neon_records import RECORD_TYPES
+
+    org = MockOrg(config_from_args(args))
+    listings = {
+        "projects": org.projects,
+        "branches": [item for items in org.branches.values() for item in items],
+        "endpoints": [item for items in org.endpoints.values() for item in items],
+        "databases": [item for items in org.databases.values() for item in items],
+        "roles": [item for items in org.roles.values() for item in items],
+        "operations": [item for items in org.operations.values() for item in items],
+    }
+    rows = []
+    for kind, items in listings.items():
+        if not items:
+            continue
+        # Decoded from JSON like an API response, so nothing is shared with the mock's own objects
+        body = json.dumps(items).encode()
+        decoded, dict_bytes = _retained_bytes(lambda: json.loads(body))
+        record_type = RECORD_TYPES[kind]
+        started = time.perf_counter()
+        records, record_bytes = _retained_bytes(lambda: [record_type.from_payload(item) for item in decoded])
+        build = time.perf_counter() - started
+        sample = records[:1000]
+        rehydrate = _best_ms(lambda: [record.payload() for record in sample], 3) / len(sample)
+        rows.append({
+            "kind": kind,
+            "items": len(items),
+            "dict_bytes": dict_bytes,
+            "record_bytes": record_bytes,
+            "ratio": round(dict_bytes / record_bytes, 1),
+            "build_us": round(build * 1e6 / len(items), 1),
+            "rehydrate_us": round(rehydrate * 1000, 1),
+        })
+        del decoded, records
+    return rows
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Neon DB MCP tools against a local mock Neon API")
+    parser.add_argument("--tools", help=f"Comma-separated tools to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--iterations", type=int, default=200, help="Calls per tool")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent in-flight calls per tool")
+    parser.add_argument("--cold", action="store_true", help="Start every tool with a fresh client and empty cache")
+    parser.add_argument("--rate-limit-rps", type=float, default=0,
+                        help="Client-side rate limit during the run (default: 0, unlimited)")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this JSON file")
+    parser.add_argument("--json-backend", choices=["auto", "orjson", "default"],
+                        help="NEON_JSON_BACKEND for the tool run (default: the environment's setting)")
+    parser.add_argument("--codec", action="store_true", help="Benchmark JSON decoding and encoding instead of tools")
+    parser.add_argument("--memory", action="store_true",
+                        help="Compare memory of decoded API objects and compact records instead of running tools")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    if args.codec or args.memory:
+        results = run_codec(args) if args.codec else run_memory(args)
+        print_table(results, CODEC_COLUMNS if args.codec else MEMORY_COLUMNS)
+        if args.json_path:
+            with open(args.json_path, "w") as f:
+                json.dump(results, f, indent=2)
+        return 0
+
+    if args.json_backend:
+        os.environ["NEON_JSON_BACKEND"] = args.json_backend
+    results = asyncio.run(run(args))
+    print_table(results)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if any(row["errors"] for row in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,11 +3,73 @@
 Main entry point for the Neon DB Organization MCP Server.
 """
 
-from neonorgdb import mcp
+import argparse
+import json
+import os
+
+TRANSPORTS = {"http": "streamable-http", "sse": "sse"}
+
+def private_cache_dir() -> str:
+    """The user's neonorgdb cache directory, created (or tightened) to be accessible by its owner only"""
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    path = os.path.join(base, "neonorgdb")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    # makedirs leaves an existing directory's mode alone; fails if another user owns it
+    os.chmod(path, 0o700)
+    return path
+
+def serve_http(transport: str, host: str, port: int, workers: int) -> None:
+    """Serve concurrent MCP sessions over HTTP, optionally from several worker processes"""
+    import uvicorn
+    
+    if workers == 1:
+        from neonorgdb import http_app
+        uvicorn.run(http_app(transport), host=host, port=port, lifespan="on", timeout_graceful_shutdown=0)
+        return
+    # Workers import the server themselves, so configure them before it is imported: each takes an
+    # equal share of the rate budget, and they share responses through one SQLite cache tier
+    os.environ["NEON_WORKERS"] = str(workers)
+    os.environ["NEON_TRANSPORT"] = transport
+    if not os.getenv("NEON_SHARED_CACHE_PATH"):
+        # It holds the org's cached responses, so never in a shared, predictable place such as /tmp
+        os.environ["NEON_SHARED_CACHE_PATH"] = os.path.join(private_cache_dir(), f"shared-{port}.sqlite3")
+    uvicorn.run("neonorgdb:worker_app", factory=True, host=host, port=port, workers=workers, lifespan="on",
+                timeout_graceful_shutdown=0)
 
 def main():
     """Run the Neon DB MCP server"""
-    mcp.run()
+    parser = argparse.ArgumentParser(prog="neonorgdb", description="Neon DB Organization MCP Server")
+    parser.add_argument("--transport", choices=["stdio", *TRANSPORTS], default="stdio",
+                        help="stdio for one client (default), or serve many sessions over streamable HTTP or SSE")
+    parser.add_argument("--host", default="127.0.0.1", help="HTTP bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="HTTP port (default: 8000)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="HTTP worker processes sharing one cache tier (default: 1; streamable HTTP only)")
+    parser.add_argument("--measure-startup", action="store_true",
+                        help="Report import and startup time by module instead of serving")
+    parser.add_argument("--runs", type=int, default=3, help="Cold starts to measure (default: 3)")
+    parser.add_argument("--top", type=int, default=15, help="Rows per breakdown table (default: 15)")
+    parser.add_argument("--json", action="store_true", help="Print the startup report as JSON")
+    args = parser.parse_args()
+
+    if args.measure_startup:
+        from neon_startup import format_report, measure_startup
+        report = measure_startup(runs=args.runs, top=args.top)
+        print(json.dumps(report, indent=2) if args.json else format_report(report))
+        return
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.transport == "stdio":
+        if args.workers != 1:
+            parser.error("--workers needs --transport http")
+        # Imported here so --help and --measure-startup never pay for the server's imports
+        from neonorgdb import mcp
+        mcp.run()
+        return
+    if args.transport == "sse" and args.workers > 1:
+        parser.error("SSE sessions are tied to one process; use --transport http with --workers")
+    serve_http(TRANSPORTS[args.transport], args.host, args.port, args.workers)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,296 @@
+"""
+Columnar store and group-by aggregation for Neon consumption history.
+
+Daily per-project consumption is kept in typed arrays (one column per
+metric) instead of nested JSON, so a year of history for hundreds of
+projects stays a few megabytes. Aggregation uses numpy when it is installed
+and falls back to a plain Python loop otherwise. Days that are settled (old
+enough not to change) are fetched once and reused by later queries over
+overlapping ranges; recent days are re-fetched on every query.
+"""
+
+import asyncio
+from array import array
+from datetime import date, datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Optional, for vectorized aggregation. Imported on first aggregation rather than at
+# startup, since numpy alone takes longer to import than all of the server's own modules.
+_NOT_LOADED: Any = object()
+np: Any = _NOT_LOADED
+
+def _numpy() -> Any:
+    """The numpy module, or None when it is not installed"""
+    global np
+    if np is _NOT_LOADED:
+        try:
+            import numpy
+        except ImportError:
+            np = None
+        else:
+            np = numpy
+    return np
+
+CONSUMPTION_METRICS = (
+    "active_time_seconds",
+    "compute_time_seconds",
+    "written_data_bytes",
+    "synthetic_storage_size_bytes",
+    "data_storage_bytes_hour",
+    "data_transfer_bytes",
+)
+GROUP_BY_FIELDS = ("project", "day", "week", "month")
+
+DayRange = Tuple[int, int]
+
+def parse_day(value: str) -> int:
+    """Day ordinal of an ISO 8601 date or timestamp (UTC)"""
+    value = value.strip()
+    if len(value) > 10:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc)
+        return parsed.date().toordinal()
+    return date.fromisoformat(value).toordinal()
+
+def day_timestamp(day: int) -> str:
+    """RFC 3339 timestamp for midnight UTC of a day ordinal, as the consumption API expects"""
+    return date.fromordinal(day).isoformat() + "T00:00:00Z"
+
+def missing_ranges(covered: Sequence[DayRange], start: int, end: int) -> List[DayRange]:
+    """Sub-ranges of [start, end) not covered by the sorted, disjoint `covered` ranges"""
+    gaps = []
+    cursor = start
+    for lo, hi in covered:
+        if hi <= cursor:
+            continue
+        if lo >= end:
+            break
+        if lo > cursor:
+            gaps.append((cursor, lo))
+        cursor = max(cursor, hi)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+def merge_ranges(ranges: Iterable[DayRange]) -> List[DayRange]:
+    merged: List[DayRange] = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+class ConsumptionColumns:
+    """Append-only rows of (project, day, metric values) stored column-wise"""
+
+    def __init__(self, metrics: Sequence[str]):
+        self.project = array("I")
+        self.day = array("I")
+        self.values = {metric: array("d") for metric in metrics}
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+    def append(self, project: int, day: int, consumption: Dict[str, Any]) -> None:
+        self.project.append(project)
+        self.day.append(day)
+        for metric, column in self.values.items():
+            column.append(float(consumption.get(metric) or 0))
+
+    def extend(self, other: "ConsumptionColumns") -> None:
+        self.project.extend(other.project)
+        self.day.extend(other.day)
+        for metric, column in self.values.items():
+            column.extend(other.values[metric])
+
+    @property
+    def nbytes(self) -> int:
+        columns = [self.project, self.day, *self.values.values()]
+        return sum(column.itemsize * len(column) for column in columns)
+
+# Fetches consumption for [start, end) day ordinals, yielding one API project record at a time
+FetchRange = Callable[[int, int], AsyncIterator[Dict[str, Any]]]
+
+class ConsumptionStore:
+    """Settled daily consumption cached in columns, plus group-by aggregation over any day range"""
+
+    def __init__(self, metrics: Sequence[str] = CONSUMPTION_METRICS, settle_days: int = 2):
+        self.metrics = tuple(metrics)
+        # Days within `settle_days` of today may still change and are never cached
+        self.settle_days = settle_days
+        self._project_ids: List[str] = []
+        self._project_index: Dict[str, int] = {}
+        self.settled = ConsumptionColumns(self.metrics)
+        self.covered: List[DayRange] = []
+        self._lock = asyncio.Lock()
+        self.fetched_days = 0
+        self.reused_days = 0
+
+    def _project(self, project_id: str) -> int:
+        index = self._project_index.get(project_id)
+        if index is None:
+            index = self._project_index[project_id] = len(self._project_ids)
+            self._project_ids.append(project_id)
+        return index
+
+    def clear(self) -> None:
+        self.settled = ConsumptionColumns(self.metrics)
+        self.covered = []
+
+    async def _load(self, fetch: FetchRange, start: int, end: int, into: ConsumptionColumns) -> None:
+        async for record in fetch(start, end):
+            project = self._project(record["project_id"])
+            for period in record.get("periods", []):
+                for consumption in period.get("consumption", []):
+                    day = parse_day(consumption["timeframe_start"])
+                    # Stay inside the requested range so adjacent fetches never double count
+                    if start <= day < end:
+                        into.append(project, day, consumption)
+        self.fetched_days += end - start
+
+    async def query(self, fetch: FetchRange, start: int, end: int, group_by: Sequence[str] = ("project",),
+                    metrics: Optional[Sequence[str]] = None, project_ids: Optional[Sequence[str]] = None,
+                    today: Optional[int] = None, refresh: bool = False) -> Dict[str, Any]:
+        """Aggregate consumption over [start, end), fetching only the days not already cached"""
+        unknown = [field for field in group_by if field not in GROUP_BY_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown group_by fields {unknown}; choose from {list(GROUP_BY_FIELDS)}")
+        metrics = self.metrics if metrics is None else tuple(metrics)
+        unknown = [metric for metric in metrics if metric not in self.metrics]
+        if unknown:
+            raise ValueError(f"Unknown metrics {unknown}; choose from {list(self.metrics)}")
+        if today is None:
+            today = datetime.now(timezone.utc).date().toordinal()
+        settled_end = min(end, today + 1 - self.settle_days)
+
+        async with self._lock:
+            if refresh:
+                self.clear()
+            gaps = missing_ranges(self.covered, start, settled_end)
+            self.reused_days += max(0, settled_end - start) - sum(hi - lo for lo, hi in gaps)
+            for lo, hi in gaps:
+                # Loaded aside, so a fetch failing partway leaves no rows behind for the retry to add again
+                loaded = ConsumptionColumns(self.metrics)
+                await self._load(fetch, lo, hi, loaded)
+                self.settled.extend(loaded)
+                self.covered = merge_ranges([*self.covered, (lo, hi)])
+            recent = ConsumptionColumns(self.metrics)
+            if end > max(start, settled_end):
+                await self._load(fetch, max(start, settled_end), end, recent)
+
+        result = self._aggregate([self.settled, recent], start, end, list(group_by), metrics, project_ids)
+        result["fetched_ranges"] = [[date.fromordinal(lo).isoformat(), date.fromordinal(hi).isoformat()]
+                                    for lo, hi in gaps]
+        return result
+
+    def _aggregate(self, parts: List[ConsumptionColumns], start: int, end: int, group_by: List[str],
+                   metrics: Sequence[str], project_ids: Optional[Sequence[str]]) -> Dict[str, Any]:
+        wanted = None
+        if project_ids is not None:
+            wanted = {self._project_index[pid] for pid in project_ids if pid in self._project_index}
+        if _numpy() is not None:
+            groups, sums = self._aggregate_numpy(parts, start, end, group_by, metrics, wanted)
+        else:
+            groups, sums = self._aggregate_python(parts, start, end, group_by, metrics, wanted)
+        rows = sorted(
+            ([*(self._label(field, value) for field, value in zip(group_by, key)), *(_number(v) for v in values)]
+             for key, values in zip(groups, sums)),
+            key=lambda row: [str(cell) for cell in row[:len(group_by)]],
+        )
+        totals = {metric: _number(sum(values[i] for values in sums)) for i, metric in enumerate(metrics)}
+        return {"columns": [*group_by, *metrics], "rows": rows, "totals": totals}
+
+    def _aggregate_numpy(self, parts, start, end, group_by, metrics, wanted):
+        projects = np.concatenate([np.frombuffer(part.project, dtype=np.uint32) for part in parts])
+        days = np.concatenate([np.frombuffer(part.day, dtype=np.uint32) for part in parts])
+        mask = (days >= start) & (days < end)
+        if wanted is not None:
+            mask &= np.isin(projects, np.fromiter(wanted, dtype=np.uint32, count=len(wanted)))
+        projects, days = projects[mask], days[mask]
+        values = [np.concatenate([np.frombuffer(part.values[metric], dtype=np.float64) for part in parts])[mask]
+                  for metric in metrics]
+        if not len(days):
+            return [], []
+        if not group_by:
+            return [()], [[float(column.sum()) for column in values]]
+        keys = np.stack([self._bucket_numpy(field, projects, days) for field in group_by], axis=1)
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        sums = np.stack([np.bincount(inverse, weights=column, minlength=len(unique)) for column in values], axis=1)
+        return [tuple(int(v) for v in key) for key in unique], sums.tolist()
+
+    @staticmethod
+    def _bucket_numpy(field: str, projects: "np.ndarray", days: "np.ndarray") -> "np.ndarray":
+        days = days.astype(np.int64)
+        if field == "project":
+            return projects.astype(np.int64)
+        if field == "day":
+            return days
+        if field == "week":
+            # Ordinal 1 (0001-01-01) is a Monday, so weeks start on Mondays
+            return days - (days - 1) % 7
+        unique, inverse = np.unique(days, return_inverse=True)
+        months = np.array([_month(int(day)) for day in unique], dtype=np.int64)
+        return months[inverse.reshape(-1)]
+
+    def _aggregate_python(self, parts, start, end, group_by, metrics, wanted):
+        totals: Dict[Tuple[int, ...], List[float]] = {}
+        for part in parts:
+            columns = [part.values[metric] for metric in metrics]
+            for i, day in enumerate(part.day):
+                project = part.project[i]
+                if not start <= day < end or (wanted is not None and project not in wanted):
+                    continue
+                key = tuple(_bucket(field, project, day) for field in group_by)
+                sums = totals.get(key)
+                if sums is None:
+                    sums = totals[key] = [0.0] * len(columns)
+                for j, column in enumerate(columns):
+                    sums[j] += column[i]
+        return list(totals), list(totals.values())
+
+    def _label(self, field: str, value: int) -> str:
+        if field == "project":
+            return self._project_ids[value]
+        if field == "month":
+            return f"{value // 12:04d}-{value % 12 + 1:02d}"
+        return date.fromordinal(value).isoformat()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rows": len(self.settled),
+            "bytes": self.settled.nbytes,
+            "projects": len(self._project_ids),
+            "covered": [[date.fromordinal(lo).isoformat(), date.fromordinal(hi).isoformat()]
+                        for lo, hi in self.covered],
+            "fetched_days": self.fetched_days,
+            "reused_days": self.reused_days,
+            "vectorized": _numpy() is not None,
+        }
+
+def _month(day: int) -> int:
+    d = date.fromordinal(day)
+    return d.year * 12 + d.month - 1
+
+def _bucket(field: str, project: int, day: int) -> int:
+    if field == "project":
+        return project
+    if field == "day":
+        return day
+    if field == "week":
+        return day - (day - 1) % 7
+    return _month(day)
+
+def _number(value: float) -> Any:
+    return int(value) if float(value).is_integer() else round(value, 3)
+
+def default_range(from_date: Optional[str], to_date: Optional[str], days: int = 30) -> Tuple[int, int]:
+    """[start, end) day ordinals for a tool call: `to_date` is exclusive and defaults to tomorrow"""
+    today = datetime.now(timezone.utc).date().toordinal()
+    end = parse_day(to_date) if to_date else today + 1
+    start = parse_day(from_date) if from_date else end - days
+    if start >= end:
+        raise ValueError("from_date must be before to_date")
+    return start, end
@@ -0,0 +1,71 @@
+"""
+Run many independent Neon lookups from one MCP call.
+
+Each request names an operation and its ids. Requests run concurrently under
+a semaphore, results come back in request order, and a failing request
+reports its own error without failing the rest of the batch.
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from neon_projection import shape
+
+# Operation -> (client method, required id arguments in call order)
+BATCH_OPERATIONS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "project": ("get_project", ("project_id",)),
+    "branches": ("get_branches", ("project_id",)),
+    "databases": ("get_databases", ("project_id", "branch_id")),
+    "roles": ("get_roles", ("project_id", "branch_id")),
+    "endpoints": ("get_endpoints", ("project_id",)),
+    "operations": ("get_operations", ("project_id",)),
+}
+
+class BatchRunner:
+    """Executes one batch against a NeonAPIClient with bounded concurrency"""
+
+    def __init__(self, client: Any, max_concurrency: int = 8, refresh: bool = False,
+                 fields: Optional[Sequence[str]] = None, compact: bool = False):
+        self.client = client
+        self.refresh = refresh
+        self.fields = fields
+        self.compact = compact
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    @staticmethod
+    def _resolve(request: Dict[str, Any]) -> Tuple[str, List[str]]:
+        op = request.get("op")
+        if op not in BATCH_OPERATIONS:
+            raise ValueError(f"Unknown op {op!r}; expected one of {list(BATCH_OPERATIONS)}")
+        method, required = BATCH_OPERATIONS[op]
+        missing = [name for name in required if not request.get(name)]
+        if missing:
+            raise ValueError(f"Op {op!r} requires {', '.join(missing)}")
+        return method, [request[name] for name in required]
+
+    async def _run_one(self, index: int, request: Dict[str, Any]) -> Dict[str, Any]:
+        item: Dict[str, Any] = {"index": index, **{key: request[key] for key in ("op", "project_id", "branch_id")
+                                                   if request.get(key) is not None}}
+        try:
+            method, args = self._resolve(request)
+            async with self._semaphore:
+                result = await getattr(self.client, method)(*args, refresh=self.refresh)
+        except ValueError as exc:
+            return {**item, "error": str(exc)}
+        except httpx.HTTPStatusError as exc:
+            return {**item, "error": str(exc), "status": exc.response.status_code}
+        except httpx.HTTPError as exc:
+            return {**item, "error": f"{type(exc).__name__}: {exc}"}
+        fields = request.get("fields", self.fields)
+        compact = request.get("compact", self.compact)
+        return {**item, "result": shape(result, fields, compact)}
+
+    async def run(self, requests: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        results = await asyncio.gather(*(self._run_one(i, request) for i, request in enumerate(requests)))
+        failed = sum(1 for result in results if "error" in result)
+        return {
+            "results": list(results),
+            "summary": {"requested": len(results), "succeeded": len(results) - failed, "failed": failed},
+        }
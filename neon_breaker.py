@@ -0,0 +1,136 @@
+"""
+Per-endpoint-class circuit breakers for Neon API calls.
+
+After `failure_threshold` consecutive failed requests (transport errors,
+timeouts or 5xx responses still failing after their retries) a class's
+circuit opens: callers fail fast with CircuitOpenError instead of queueing
+doomed requests, and the client probes the API in the background every
+`reset_timeout` seconds until a probe succeeds and the circuit closes again.
+Each endpoint class also gets an explicit read timeout, so a hung request
+fails in seconds rather than waiting out a generic client default.
+"""
+
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Default read timeout (seconds) for each endpoint class; consumption queries are slow server-side
+DEFAULT_TIMEOUTS: Dict[str, float] = {
+    "organization": 10.0,
+    "projects": 15.0,
+    "project": 10.0,
+    "branches": 10.0,
+    "databases": 10.0,
+    "roles": 10.0,
+    "endpoints": 10.0,
+    "operations": 10.0,
+    "consumption": 30.0,
+}
+
+def timeouts_from_env() -> Dict[str, float]:
+    """Default timeouts overridden by NEON_TIMEOUT_<CLASS> environment variables"""
+    timeouts = dict(DEFAULT_TIMEOUTS)
+    for name in DEFAULT_TIMEOUTS:
+        value = os.getenv(f"NEON_TIMEOUT_{name.upper()}")
+        if value is not None:
+            timeouts[name] = float(value)
+    return timeouts
+
+class CircuitOpenError(httpx.HTTPError):
+    """Raised instead of sending a request while its endpoint class's circuit is open"""
+
+    def __init__(self, endpoint_class: str, retry_in: float, last_error: Optional[str] = None):
+        message = f"Neon API circuit for {endpoint_class} is open; next probe in {retry_in:.1f}s"
+        if last_error:
+            message += f" (last error: {last_error})"
+        super().__init__(message)
+        self.endpoint_class = endpoint_class
+        self.retry_in = retry_in
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.opens = 0
+        self.rejected = 0
+        self.probes = 0
+
+    def allow(self) -> bool:
+        """Whether a regular request may be sent; only background probes go out while not closed"""
+        return self.state == CLOSED
+
+    def reject(self) -> CircuitOpenError:
+        self.rejected += 1
+        return CircuitOpenError(self.name, self.retry_in(), self.last_error)
+
+    def retry_in(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - self._clock())
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        if self.state != CLOSED:
+            self.state = CLOSED
+            self.opened_at = None
+
+    def record_failure(self, error: str) -> bool:
+        """Count a failure; returns True when this failure opened the circuit"""
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+            was_closed = self.state == CLOSED
+            self.state = OPEN
+            self.opened_at = self._clock()
+            if was_closed:
+                self.opens += 1
+            return was_closed
+        return False
+
+    def begin_probe(self) -> None:
+        self.state = HALF_OPEN
+        self.probes += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in": round(self.retry_in(), 3) if self.state != CLOSED else None,
+            "last_error": self.last_error,
+            "opens": self.opens,
+            "rejected": self.rejected,
+            "probes": self.probes,
+        }
+
+class BreakerBoard:
+    """One lazily created breaker per endpoint class"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, endpoint_class: str) -> CircuitBreaker:
+        breaker = self._breakers.get(endpoint_class)
+        if breaker is None:
+            breaker = self._breakers[endpoint_class] = CircuitBreaker(
+                endpoint_class, self.failure_threshold, self.reset_timeout, self._clock)
+        return breaker
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: breaker.stats() for name, breaker in sorted(self._breakers.items())}
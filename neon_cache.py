@@ -0,0 +1,328 @@
+"""
+In-process TTL + LRU cache and request coalescing for read-only Neon API responses.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+# Default time-to-live (seconds) for each endpoint class
+DEFAULT_TTLS: Dict[str, float] = {
+    "organization": 300.0,
+    "projects": 60.0,
+    "project": 60.0,
+    "branches": 30.0,
+    "databases": 60.0,
+    "roles": 60.0,
+    "endpoints": 15.0,
+    "operations": 5.0,
+    "consumption": 300.0,
+}
+DEFAULT_TTL = 30.0
+
+# Collection segments whose endpoint class is named differently
+_CLASS_ALIASES = {
+    "users": "organization",
+    "consumption_history": "consumption",
+}
+
+CacheKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+def endpoint_class(endpoint: str) -> str:
+    """Classify an API path such as `/projects/{id}/branches` into a TTL class"""
+    parts = [part for part in endpoint.strip("/").split("/") if part]
+    if not parts:
+        return "default"
+    # Collection names sit at even positions: projects/{id}/branches/{id}/roles
+    collection = parts[(len(parts) - 1) & ~1]
+    if collection == "projects" and len(parts) == 2:
+        return "project"
+    return _CLASS_ALIASES.get(collection, collection)
+
+def make_cache_key(endpoint: str, params: Optional[Dict[str, Any]] = None) -> CacheKey:
+    """Build a hashable key from a request path and its query parameters"""
+    path = "/" + endpoint.strip("/")
+    items = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items() if v is not None))
+    return path, items
+
+def ttls_from_env() -> Dict[str, float]:
+    """Default TTLs overridden by NEON_CACHE_TTL_<CLASS> environment variables"""
+    ttls = dict(DEFAULT_TTLS)
+    for name in DEFAULT_TTLS:
+        value = os.getenv(f"NEON_CACHE_TTL_{name.upper()}")
+        if value is not None:
+            ttls[name] = float(value)
+    return ttls
+
+@dataclass
+class CacheEntry:
+    value: Any
+    size: int
+    endpoint_class: str
+    stored_at: float
+    expires_at: float
+    # Validators for conditional GETs; `digest` hashes the raw body and doubles as a version
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    digest: Optional[str] = None
+    # Restored from a snapshot: may be served once, stale, while it revalidates
+    serve_stale: bool = False
+    # Marked stale by expire(): the shared tier may still hold the same outdated copy
+    expired: bool = False
+
+def content_digest(body: bytes) -> str:
+    """Cheap fingerprint of a response body, used when the API sends no validators"""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+class ResponseCache:
+    """
+    Memory-bounded LRU cache with a TTL per endpoint class.
+
+    Cached values are shared between callers and must be treated as read-only.
+    Sizes are the length of the raw response body, which keeps the bound cheap
+    to maintain while still tracking the relative weight of large listings.
+    Expired entries are kept (until evicted) so their validators can be used
+    to revalidate them with a conditional request.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 ttls: Optional[Dict[str, float]] = None, default_ttl: float = DEFAULT_TTL,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bypasses = 0
+        self.revalidations = 0
+        self.not_modified = 0
+        self.unchanged = 0
+        self.stale_served = 0
+        self.stale_fallbacks = 0
+        self._class_counters: Dict[str, Dict[str, int]] = {}
+
+    def ttl_for(self, endpoint_class: str) -> float:
+        return self.ttls.get(endpoint_class, self.default_ttl)
+
+    def _count(self, endpoint_class: str, event: str) -> None:
+        counters = self._class_counters.setdefault(endpoint_class, {"hits": 0, "misses": 0})
+        counters[event] = counters.get(event, 0) + 1
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        """Return a fresh cached value, or None on miss/expiry"""
+        entry = self.get_entry(key)
+        return None if entry is None else entry.value
+
+    def get_entry(self, key: CacheKey) -> Optional[CacheEntry]:
+        """Return the fresh entry for `key`, counting a hit or miss"""
+        cls = endpoint_class(key[0])
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= self._clock():
+            if entry is not None and entry.serve_stale:
+                # Left for take_stale(), which counts it
+                return None
+            if entry is not None:
+                self.expirations += 1
+            self.misses += 1
+            self._count(cls, "misses")
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self._count(cls, "hits")
+        return entry
+
+    def take_stale(self, key: CacheKey) -> Optional[CacheEntry]:
+        """Return a restored entry that may be served stale once while the caller revalidates it"""
+        entry = self._entries.get(key)
+        if entry is None or not entry.serve_stale:
+            return None
+        entry.serve_stale = False
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.stale_served += 1
+        self._count(entry.endpoint_class, "hits")
+        return entry
+
+    def fallback(self, key: CacheKey, max_age: float) -> Optional[CacheEntry]:
+        """Return the last stored entry for `key`, however stale, while the API is unavailable"""
+        entry = self._entries.get(key)
+        if entry is None or self.age(entry) > max_age:
+            return None
+        self.stale_fallbacks += 1
+        return entry
+
+    def age(self, entry: CacheEntry) -> float:
+        return self._clock() - entry.stored_at
+
+    def is_fresh(self, key: CacheKey) -> bool:
+        """Whether `key` would be served from the cache, without touching counters"""
+        entry = self._entries.get(key)
+        return entry is not None and entry.expires_at > self._clock()
+
+    def peek(self, key: CacheKey) -> Optional[CacheEntry]:
+        """Return the entry for `key` even if expired, without touching counters"""
+        return self._entries.get(key)
+
+    def set(self, key: CacheKey, value: Any, size: int, etag: Optional[str] = None,
+            last_modified: Optional[str] = None, digest: Optional[str] = None, age: float = 0.0) -> CacheEntry:
+        """Store a value fetched `age` seconds ago, evicting least recently used entries past the bounds"""
+        cls = endpoint_class(key[0])
+        ttl = self.ttl_for(cls)
+        stored_at = self._clock() - age
+        entry = CacheEntry(value, size, cls, stored_at, stored_at + ttl, etag, last_modified, digest)
+        if ttl <= 0 or size > self.max_bytes:
+            return entry
+        self._insert(key, entry)
+        return entry
+
+    def restore(self, key: CacheKey, value: Any, size: int, etag: Optional[str] = None,
+                last_modified: Optional[str] = None, digest: Optional[str] = None, age: float = 0.0) -> None:
+        """Load a persisted entry as already expired, to be served stale once and then revalidated"""
+        cls = endpoint_class(key[0])
+        if self.ttl_for(cls) <= 0 or size > self.max_bytes:
+            return
+        entry = CacheEntry(value, size, cls, self._clock() - age, 0.0, etag, last_modified, digest,
+                           serve_stale=True)
+        self._insert(key, entry)
+
+    def _insert(self, key: CacheKey, entry: CacheEntry) -> None:
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def items(self) -> List[Tuple[CacheKey, CacheEntry]]:
+        """Current entries, least recently used first"""
+        return list(self._entries.items())
+
+    def revalidated(self, key: CacheKey, not_modified: bool) -> Optional[CacheEntry]:
+        """Renew an entry's TTL after the API confirmed it unchanged (304 or same digest)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if not_modified:
+            self.not_modified += 1
+        else:
+            self.unchanged += 1
+        entry.expires_at = self._clock() + self.ttl_for(entry.endpoint_class)
+        entry.serve_stale = False
+        entry.expired = False
+        self._entries.move_to_end(key)
+        return entry
+
+    def record_revalidation(self) -> None:
+        self.revalidations += 1
+
+    def record_bypass(self) -> None:
+        self.bypasses += 1
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _matching(self, path_prefix: str, recursive: bool) -> List[CacheKey]:
+        prefix = "/" + path_prefix.strip("/")
+        return [key for key in self._entries
+                if key[0] == prefix or (recursive and key[0].startswith(prefix + "/"))]
+
+    def invalidate(self, path_prefix: Optional[str] = None, recursive: bool = True) -> int:
+        """Drop entries for `path_prefix` and, if recursive, everything below it (all entries if None)"""
+        if path_prefix is None:
+            removed = len(self._entries)
+            self.clear()
+            return removed
+        keys = self._matching(path_prefix, recursive)
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def expire(self, path_prefix: str, recursive: bool = True) -> int:
+        """Mark entries stale so the next read revalidates them, keeping their validators"""
+        keys = self._matching(path_prefix, recursive)
+        for key in keys:
+            self._entries[key].expires_at = 0.0
+            self._entries[key].serve_stale = False
+            self._entries[key].expired = True
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "bypasses": self.bypasses,
+            "revalidations": self.revalidations,
+            "not_modified": self.not_modified,
+            "unchanged": self.unchanged,
+            "stale_served": self.stale_served,
+            "stale_fallbacks": self.stale_fallbacks,
+            "by_endpoint_class": {cls: dict(counters) for cls, counters in self._class_counters.items()},
+            "ttls": dict(self.ttls),
+        }
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls so one upstream request serves every waiter.
+
+    The shared call runs as its own task, so a cancelled waiter never cancels
+    the request the other waiters depend on.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def pending(self, key: Hashable) -> bool:
+        """Whether a call for `key` is in flight, i.e. a new caller would be coalesced"""
+        return key in self._calls
+
+    def _forget(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter was cancelled
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "upstream_calls": self.leaders,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,186 @@
+"""
+Indexed in-memory catalog of Neon projects.
+
+The catalog is rebuilt from a full `/projects` listing and answers name,
+id, region and creation-date lookups without touching the Neon API. Projects
+are held as compact records and rebuilt into full objects only for results.
+"""
+
+import heapq
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from neon_records import ProjectRecord, as_record
+
+# Minimum trigram similarity for a fuzzy match (same default as pg_trgm)
+FUZZY_THRESHOLD = 0.3
+
+def trigrams(text: str) -> Set[str]:
+    """Case-folded trigrams of `text`, padded so short words still index"""
+    padded = f"  {text.casefold()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _negate(score: Tuple[float, ...]) -> Tuple[float, ...]:
+    return tuple(-value for value in score)
+
+class ProjectCatalog:
+    """Project index by name trigrams, id, region and creation date"""
+
+    def __init__(self):
+        self._projects: Dict[str, ProjectRecord] = {}
+        self._names: Dict[str, str] = {}
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._gram_counts: Dict[str, int] = {}
+        self._by_region: Dict[str, Set[str]] = {}
+        self._by_created: List[Tuple[str, str]] = []
+        self.loaded_at: Optional[float] = None
+        self.refreshes = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def __len__(self) -> int:
+        return len(self._projects)
+
+    def load(self, projects: Iterable[Union[Dict[str, Any], ProjectRecord]]) -> None:
+        """Rebuild every index from a complete project listing"""
+        by_id: Dict[str, ProjectRecord] = {}
+        names: Dict[str, str] = {}
+        grams: Dict[str, Set[str]] = {}
+        gram_counts: Dict[str, int] = {}
+        by_region: Dict[str, Set[str]] = {}
+        by_created: List[Tuple[str, str]] = []
+
+        for project in projects:
+            project = as_record(ProjectRecord, project)
+            project_id = project.get("id")
+            if not project_id:
+                continue
+            by_id[project_id] = project
+            name = project.get("name") or ""
+            names[project_id] = name.casefold()
+            name_grams = trigrams(name)
+            gram_counts[project_id] = len(name_grams)
+            for gram in name_grams:
+                grams.setdefault(gram, set()).add(project_id)
+            region = project.get("region_id")
+            if region:
+                by_region.setdefault(region, set()).add(project_id)
+            # Projects without a timestamp sort first and never match a date range
+            by_created.append((project.get("created_at") or "", project_id))
+        by_created.sort()
+
+        # Swap in the new indexes together so readers never see a partial build
+        self._projects, self._names, self._trigrams = by_id, names, grams
+        self._gram_counts = gram_counts
+        self._by_region, self._by_created = by_region, by_created
+        self.loaded_at = time.time()
+        self.refreshes += 1
+
+    def get(self, project_id: str) -> Optional[Dict[str, Any]]:
+        project = self._projects.get(project_id)
+        return project.payload() if project is not None else None
+
+    def find(self, project_ids: Optional[Iterable[str]] = None, region_id: Optional[str] = None,
+             created_after: Optional[str] = None, created_before: Optional[str] = None,
+             limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Filter projects by id, region and creation date, oldest first.
+
+        Dates are ISO 8601 strings compared lexicographically, which matches
+        the UTC timestamps returned by the Neon API.
+        """
+        candidates: Optional[Set[str]] = None
+        if project_ids is not None:
+            candidates = {pid for pid in project_ids if pid in self._projects}
+        if region_id is not None:
+            in_region = self._by_region.get(region_id, set())
+            candidates = in_region if candidates is None else candidates & in_region
+
+        dated = created_after is not None or created_before is not None
+        start = bisect_right(self._by_created, (created_after or "", "\uffff")) if dated else 0
+        end = len(self._by_created) if created_before is None else bisect_left(self._by_created, (created_before, ""))
+        results = []
+        for _, project_id in self._by_created[start:end]:
+            if candidates is None or project_id in candidates:
+                results.append(self._projects[project_id].payload())
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+
+    def search(self, pattern: str, limit: Optional[int] = None, fuzzy: bool = False) -> List[Dict[str, Any]]:
+        """
+        Find projects whose name contains `pattern` (case-insensitive).
+
+        Results are ranked exact > prefix > word prefix > substring, then by
+        name length. With `fuzzy`, names sharing enough trigrams with the
+        pattern also match and are ranked by similarity.
+        """
+        query = pattern.casefold()
+        scored: Dict[str, Tuple[float, ...]] = {}
+
+        for project_id in self._substring_candidates(query):
+            name = self._names[project_id]
+            rank = self._substring_rank(name, query)
+            if rank:
+                scored[project_id] = (rank, 1.0, -len(name))
+
+        if fuzzy and query:
+            query_grams = trigrams(pattern)
+            shared: Counter = Counter()
+            for gram in query_grams:
+                shared.update(self._trigrams.get(gram, ()))
+            for project_id, common in shared.items():
+                if project_id in scored:
+                    continue
+                union = len(query_grams) + self._gram_counts[project_id] - common
+                similarity = common / union if union else 0.0
+                if similarity >= FUZZY_THRESHOLD:
+                    scored[project_id] = (0, similarity, -len(self._names[project_id]))
+
+        if limit is not None and limit < len(scored):
+            # Only the top `limit` entries need ordering; ties break on name
+            ranked = heapq.nsmallest(limit, scored, key=lambda pid: (_negate(scored[pid]), self._names[pid]))
+        else:
+            ranked = sorted(scored, key=self._names.__getitem__)
+            ranked.sort(key=scored.__getitem__, reverse=True)
+        return [self._projects[project_id].payload() for project_id in ranked]
+
+    def _substring_candidates(self, query: str) -> Iterable[str]:
+        if len(query) < 3:
+            return self._names.keys()
+        postings = []
+        for i in range(len(query) - 2):
+            ids = self._trigrams.get(query[i:i + 3])
+            if not ids:
+                return ()
+            postings.append(ids)
+        postings.sort(key=len)
+        return set.intersection(*postings)
+
+    @staticmethod
+    def _substring_rank(name: str, query: str) -> int:
+        """4 exact, 3 prefix, 2 word prefix, 1 substring, 0 no match"""
+        pos = name.find(query)
+        if pos < 0:
+            return 0
+        if pos == 0:
+            return 4 if len(name) == len(query) else 3
+        while pos > 0:
+            if name[pos - 1] in " -_.":
+                return 2
+            pos = name.find(query, pos + 1)
+        return 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "projects": len(self._projects),
+            "regions": len(self._by_region),
+            "trigrams": len(self._trigrams),
+            "loaded_at": self.loaded_at,
+            "age_seconds": round(time.time() - self.loaded_at, 3) if self.loaded_at else None,
+            "refreshes": self.refreshes,
+        }
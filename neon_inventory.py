@@ -0,0 +1,103 @@
+"""
+Organization-wide inventory crawl with bounded concurrency.
+
+Fans out projects -> branches -> databases/roles (and project endpoints)
+inside the server and returns one consolidated tree.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Dict, Iterable, List, Optional, TypeVar
+
+import httpx
+
+INVENTORY_RESOURCES = ("branches", "databases", "roles", "endpoints")
+
+T = TypeVar("T")
+
+class InventoryCrawler:
+    """Runs every upstream call of one inventory crawl under a shared semaphore"""
+
+    def __init__(self, client: Any, include: Iterable[str] = INVENTORY_RESOURCES, max_concurrency: int = 8,
+                 refresh: bool = False):
+        unknown = set(include) - set(INVENTORY_RESOURCES)
+        if unknown:
+            raise ValueError(f"Unknown inventory resources: {sorted(unknown)}; "
+                             f"expected a subset of {list(INVENTORY_RESOURCES)}")
+        self.client = client
+        self.include = set(include)
+        # Databases and roles hang off branches, so they imply a branch listing
+        if self.include & {"databases", "roles"}:
+            self.include.add("branches")
+        self.refresh = refresh
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self.errors: List[Dict[str, Any]] = []
+        self.upstream_calls = 0
+
+    async def _call(self, awaitable: Awaitable[T], scope: Dict[str, str]) -> Optional[T]:
+        async with self._semaphore:
+            self.upstream_calls += 1
+            try:
+                return await awaitable
+            except httpx.HTTPError as exc:
+                self.errors.append({**scope, "error": str(exc)})
+                return None
+
+    async def crawl(self, projects: List[Dict[str, Any]]) -> Dict[str, Any]:
+        tree = await asyncio.gather(*(self._crawl_project(project) for project in projects))
+        summary = {"projects": len(tree)}
+        for resource in ("branches", "endpoints"):
+            if resource in self.include:
+                summary[resource] = sum(len(project.get(resource, [])) for project in tree)
+        for resource in ("databases", "roles"):
+            if resource in self.include:
+                summary[resource] = sum(len(branch.get(resource, []))
+                                        for project in tree for branch in project.get("branches", []))
+        summary["upstream_calls"] = self.upstream_calls
+        return {"projects": tree, "summary": summary, "errors": self.errors}
+
+    async def _crawl_project(self, project: Dict[str, Any]) -> Dict[str, Any]:
+        project_id = project["id"]
+        scope = {"project_id": project_id}
+        node = dict(project)
+        jobs = []
+        if "branches" in self.include:
+            jobs.append(self._crawl_branches(project_id, node))
+        if "endpoints" in self.include:
+            jobs.append(self._crawl_endpoints(project_id, node, scope))
+        await asyncio.gather(*jobs)
+        return node
+
+    async def _crawl_endpoints(self, project_id: str, node: Dict[str, Any], scope: Dict[str, str]) -> None:
+        result = await self._call(self.client.get_endpoints(project_id, refresh=self.refresh),
+                                  {**scope, "resource": "endpoints"})
+        node["endpoints"] = (result or {}).get("endpoints", [])
+
+    async def _crawl_branches(self, project_id: str, node: Dict[str, Any]) -> None:
+        result = await self._call(self.client.get_branches(project_id, refresh=self.refresh),
+                                  {"project_id": project_id, "resource": "branches"})
+        branches = [dict(branch) for branch in (result or {}).get("branches", [])]
+        node["branches"] = branches
+        await asyncio.gather(*(self._crawl_branch(project_id, branch) for branch in branches))
+
+    async def _crawl_branch(self, project_id: str, branch: Dict[str, Any]) -> None:
+        scope = {"project_id": project_id, "branch_id": branch["id"]}
+        jobs = []
+        if "databases" in self.include:
+            jobs.append(self._call(self.client.get_databases(project_id, branch["id"], refresh=self.refresh),
+                                   {**scope, "resource": "databases"}))
+        if "roles" in self.include:
+            jobs.append(self._call(self.client.get_roles(project_id, branch["id"], refresh=self.refresh),
+                                   {**scope, "resource": "roles"}))
+        results = await asyncio.gather(*jobs)
+        for resource, result in zip([r for r in ("databases", "roles") if r in self.include], results):
+            branch[resource] = (result or {}).get(resource, [])
+
+def select_projects(projects: Iterable[Dict[str, Any]], project_ids: Optional[Iterable[str]] = None,
+                    exclude_project_ids: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """Apply project include/exclude filters, preserving order"""
+    wanted = set(project_ids) if project_ids is not None else None
+    excluded = set(exclude_project_ids or ())
+    return [
+        project for project in projects
+        if (wanted is None or project.get("id") in wanted) and project.get("id") not in excluded
+    ]
@@ -0,0 +1,109 @@
+"""
+JSON decoding of Neon API responses and encoding of tool results.
+
+`JSONCodec` picks a backend once: orjson when it is installed (or forced with
+NEON_JSON_BACKEND=orjson), otherwise the standard library for decoding and
+FastMCP's own serializer for encoding. `iter_page` decodes a large list
+response one item at a time, so a caller that folds items into a compact
+structure never holds the whole decoded page.
+"""
+
+import json
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional: faster decoding and encoding
+    orjson = None
+
+BACKENDS = ("auto", "orjson", "default")
+
+class JSONCodec:
+    """Decode API bodies and encode tool results with the selected backend"""
+
+    def __init__(self, backend: str = "auto", indent: int = 2,
+                 fallback: Optional[Callable[[Any], str]] = None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown JSON backend {backend!r}; choose from {list(BACKENDS)}")
+        if backend == "orjson" and orjson is None:
+            raise ValueError('NEON_JSON_BACKEND=orjson requires `pip install "neonorgdb[fast-json]"`')
+        self.name = "orjson" if backend != "default" and orjson is not None else "default"
+        self.indent = indent
+        # Encoder for the default backend and for values orjson cannot encode
+        self._fallback = fallback or (lambda value: json.dumps(value, indent=indent or None, default=str))
+
+    def loads(self, body: bytes) -> Any:
+        if self.name == "orjson":
+            return orjson.loads(body)
+        return json.loads(body)
+
+    def dumps(self, value: Any) -> str:
+        """Serialize a tool result; used as the FastMCP tool serializer"""
+        if self.name == "orjson":
+            option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if self.indent else 0)
+            try:
+                return orjson.dumps(value, option=option).decode()
+            except TypeError:
+                pass
+        return self._fallback(value)
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+def _skip(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+def _expect(text: str, pos: int, char: str) -> int:
+    pos = _skip(text, pos)
+    if pos >= len(text) or text[pos] != char:
+        raise ValueError(f"Expected {char!r} at offset {pos}")
+    return pos + 1
+
+def iter_page(body: bytes, items_key: str) -> Tuple[Dict[str, Any], Iterator[Any]]:
+    """
+    Split a list response into its envelope and a lazy iterator over `items_key`.
+
+    Items are decoded one at a time as the iterator advances. Every other top-level
+    key (e.g. "pagination") is decoded into the envelope; keys that follow the
+    items array are only present once the iterator is exhausted.
+    """
+    text = body.decode("utf-8")
+    envelope: Dict[str, Any] = {}
+
+    def next_key(pos: int) -> Tuple[Optional[str], int]:
+        """Decode the envelope up to the items array; returns (items_key, offset of "[") or (None, end)"""
+        while True:
+            pos = _skip(text, pos)
+            if text.startswith("}", pos):
+                return None, pos + 1
+            key, pos = _decoder.raw_decode(text, pos)
+            pos = _skip(text, _expect(text, pos, ":"))
+            if key == items_key and text.startswith("[", pos):
+                return key, pos
+            envelope[key], pos = _decoder.raw_decode(text, pos)
+            pos = _skip(text, pos)
+            if text.startswith(",", pos):
+                pos += 1
+
+    def items(pos: int) -> Iterator[Any]:
+        pos = _skip(text, pos + 1)
+        if text.startswith("]", pos):
+            pos += 1
+        else:
+            while True:
+                item, pos = _decoder.raw_decode(text, _skip(text, pos))
+                yield item
+                pos = _skip(text, pos)
+                if text.startswith("]", pos):
+                    pos += 1
+                    break
+                pos = _expect(text, pos, ",")
+        pos = _skip(text, pos)
+        if text.startswith(",", pos):
+            pos += 1
+        next_key(pos)
+
+    key, pos = next_key(_expect(text, 0, "{"))
+    return envelope, (items(pos) if key is not None else iter(()))
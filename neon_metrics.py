@@ -0,0 +1,253 @@
+"""
+In-process latency histograms, counters and gauges, with a Prometheus text export.
+
+Metrics are keyed by name and a small, fixed set of labels. API paths are
+reduced to route templates such as `/projects/{id}/branches` so label
+cardinality stays bounded however many projects the organization has.
+"""
+
+import asyncio
+import functools
+import logging
+import math
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("neonorgdb")
+
+# Latency bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Path segments followed by a resource id or name, e.g. /projects/{id}
+ID_COLLECTIONS = frozenset({"projects", "branches", "endpoints", "databases", "roles", "operations"})
+
+def route_template(path: str) -> str:
+    """Replace resource ids in an API path: /projects/abc/branches -> /projects/{id}/branches"""
+    parts = [part for part in path.split("?", 1)[0].strip("/").split("/") if part]
+    return "/" + "/".join("{id}" if i and parts[i - 1] in ID_COLLECTIONS else part for i, part in enumerate(parts))
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating linearly inside its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, bound in enumerate(self.buckets):
+            if seen + self.counts[i] >= rank:
+                fraction = (rank - seen) / self.counts[i] if self.counts[i] else 0.0
+                return lower + (bound - lower) * fraction
+            seen += self.counts[i]
+            lower = bound
+        return self.buckets[-1]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50) * 1000, 3),
+            "p90_ms": round(self.quantile(0.90) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+        }
+
+class MetricsRegistry:
+    """Process-wide counters, gauges and histograms"""
+
+    def __init__(self, slow_call_seconds: float = 0.0):
+        # Calls slower than this are logged as warnings (0 disables)
+        self.slow_call_seconds = slow_call_seconds
+        self._help: Dict[str, str] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.started_at = time.time()
+
+    def describe(self, name: str, help_text: str) -> None:
+        """Set the # HELP line for a metric"""
+        self._help[name] = help_text
+
+    @staticmethod
+    def _labels(labels: Dict[str, Any]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, amount: float = 1.0, **labels: Any) -> None:
+        series = self._counters.setdefault(name, {})
+        key = self._labels(labels)
+        series[key] = series.get(key, 0.0) + amount
+
+    def gauge_add(self, name: str, delta: float, **labels: Any) -> None:
+        series = self._gauges.setdefault(name, {})
+        key = self._labels(labels)
+        series[key] = series.get(key, 0.0) + delta
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        series = self._histograms.setdefault(name, {})
+        key = self._labels(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(value)
+
+    @contextmanager
+    def in_flight(self, name: str, **labels: Any) -> Iterator[None]:
+        self.gauge_add(name, 1, **labels)
+        try:
+            yield
+        finally:
+            self.gauge_add(name, -1, **labels)
+
+    def log_if_slow(self, kind: str, name: str, seconds: float, **details: Any) -> None:
+        if self.slow_call_seconds > 0 and seconds >= self.slow_call_seconds:
+            extra = " ".join(f"{key}={value}" for key, value in details.items())
+            logger.warning("slow %s %s took %.1f ms %s", kind, name, seconds * 1000, extra)
+
+    def counter_value(self, name: str, **labels: Any) -> float:
+        return self._counters.get(name, {}).get(self._labels(labels), 0.0)
+
+    def histogram(self, name: str, **labels: Any) -> Optional[Histogram]:
+        return self._histograms.get(name, {}).get(self._labels(labels))
+
+    def reset(self) -> None:
+        self._counters.clear()
+        self._gauges.clear()
+        self._histograms.clear()
+        self.started_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-friendly view: histogram summaries and counter/gauge values grouped by metric name"""
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 3),
+            "histograms": {
+                name: [{**dict(labels), **histogram.summary()} for labels, histogram in sorted(series.items())]
+                for name, series in self._histograms.items()
+            },
+            "counters": {
+                name: [{**dict(labels), "value": _number(value)} for labels, value in sorted(series.items())]
+                for name, series in self._counters.items()
+            },
+            "gauges": {
+                name: [{**dict(labels), "value": _number(value)} for labels, value in sorted(series.items())]
+                for name, series in self._gauges.items()
+            },
+        }
+
+    def render_prometheus(self) -> str:
+        """Text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+
+        def header(name: str, kind: str) -> None:
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name, series in sorted(self._counters.items()):
+            header(name, "counter")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(labels)} {_number(value)}")
+        for name, series in sorted(self._gauges.items()):
+            header(name, "gauge")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(labels)} {_number(value)}")
+        for name, series in sorted(self._histograms.items()):
+            header(name, "histogram")
+            for labels, histogram in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip((*histogram.buckets, math.inf), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else repr(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def instrument_tool(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap an async MCP tool with call counts, a latency histogram, an in-flight gauge and slow-call logging"""
+        name = fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            outcome = "error"
+            started = time.perf_counter()
+            with self.in_flight("neonorgdb_tool_in_flight", tool=name):
+                try:
+                    result = await fn(*args, **kwargs)
+                    outcome = "ok"
+                    return result
+                finally:
+                    elapsed = time.perf_counter() - started
+                    self.observe("neonorgdb_tool_duration_seconds", elapsed, tool=name)
+                    self.inc("neonorgdb_tool_calls_total", tool=name, outcome=outcome)
+                    self.log_if_slow("tool", name, elapsed, outcome=outcome)
+
+        return wrapper
+
+    def timed_serializer(self, serializer: Callable[[Any], str]) -> Callable[[Any], str]:
+        """Wrap a tool result serializer to record its duration and output size"""
+
+        @functools.wraps(serializer)
+        def wrapper(data: Any) -> str:
+            started = time.perf_counter()
+            text = serializer(data)
+            self.observe("neonorgdb_serialization_duration_seconds", time.perf_counter() - started)
+            self.inc("neonorgdb_serialized_bytes_total", len(text))
+            return text
+
+        return wrapper
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _number(value: float) -> Any:
+    return int(value) if float(value).is_integer() else value
+
+async def serve_metrics(registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9464) -> asyncio.AbstractServer:
+    """Serve GET /metrics in Prometheus text format, for stdio deployments that have no HTTP server"""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()).strip():
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", registry.render_prometheus().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
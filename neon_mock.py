@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Neon API v2, for benchmarks and offline testing.
+
+Serves a synthetic organization over plain HTTP/1.1 (with keep-alive) using
+only the standard library, with configurable latency, page sizes, org size
+and injected 429/5xx errors. Point the server at it with NEON_API_BASE:
+
+    python neon_mock.py --projects 500 --port 4010
+    NEON_API_BASE=http://127.0.0.1:4010/api/v2 NEON_API_KEY=mock python neonorgdb.py
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+API_PREFIX = "/api/v2"
+
+_WORDS = [
+    "autumn", "billing", "cold", "dawn", "ember", "frost", "glade", "harbor", "iris", "jade",
+    "kelp", "lunar", "maple", "night", "orbit", "pine", "quiet", "river", "solar", "tide",
+]
+_REGIONS = ["aws-us-east-2", "aws-us-west-2", "aws-eu-central-1", "aws-ap-southeast-1", "azure-eastus2"]
+
+@dataclass
+class MockNeonConfig:
+    projects: int = 50
+    branches_per_project: int = 3
+    databases_per_branch: int = 2
+    roles_per_branch: int = 2
+    endpoints_per_project: int = 2
+    operations_per_project: int = 30
+    latency: float = 0.02
+    latency_jitter: float = 0.005
+    max_page_size: int = 100
+    error_rate_429: float = 0.0
+    error_rate_5xx: float = 0.0
+    retry_after: float = 0.1
+    etags: bool = True
+    seed: int = 42
+    # Returned by /connection_uri instead of a made-up endpoint URI, e.g. a local PostgreSQL standing in for Neon
+    connection_uri: Optional[str] = None
+
+@dataclass
+class MockOrg:
+    """Deterministic synthetic organization generated from a MockNeonConfig"""
+
+    config: MockNeonConfig
+    projects: List[Dict[str, Any]] = field(default_factory=list)
+    branches: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    databases: Dict[Tuple[str, str], List[Dict[str, Any]]] = field(default_factory=dict)
+    roles: Dict[Tuple[str, str], List[Dict[str, Any]]] = field(default_factory=dict)
+    endpoints: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    operations: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        rng = random.Random(self.config.seed)
+        epoch = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+        def stamp(offset_hours: float) -> str:
+            return (epoch + timedelta(hours=offset_hours)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        for p in range(self.config.projects):
+            project_id = f"{rng.choice(_WORDS)}-{rng.choice(_WORDS)}-{p:06d}"
+            created = p * 6.0
+            region = rng.choice(_REGIONS)
+            self.projects.append({
+                "id": project_id,
+                "platform_id": region.split("-")[0],
+                "region_id": region,
+                "name": f"{rng.choice(_WORDS)}-{rng.choice(_WORDS)}-{p}",
+                "provisioner": "k8s-neonvm",
+                "pg_version": rng.choice([15, 16, 17]),
+                "proxy_host": f"{region}.aws.neon.tech",
+                "store_passwords": True,
+                "creation_source": "console",
+                "history_retention_seconds": 86400,
+                "created_at": stamp(created),
+                "updated_at": stamp(created + rng.uniform(1, 500)),
+                "owner_id": "mock-owner",
+                "org_id": "org-mock-000000",
+                "default_endpoint_settings": {"autoscaling_limit_min_cu": 0.25, "autoscaling_limit_max_cu": 2,
+                                              "suspend_timeout_seconds": 0},
+                "settings": {"allowed_ips": {"ips": [], "protected_branches_only": False},
+                             "enable_logical_replication": False},
+            })
+
+            branches = []
+            for b in range(self.config.branches_per_project):
+                branch_id = f"br-{project_id}-{b:03d}"
+                parent = branches[rng.randrange(len(branches))]["id"] if branches else None
+                branch_created = created + b * 2.0
+                branch = {
+                    "id": branch_id,
+                    "project_id": project_id,
+                    "name": "main" if b == 0 else f"dev-{rng.choice(_WORDS)}-{b}",
+                    "current_state": "ready",
+                    "state_changed_at": stamp(branch_created + 1),
+                    "logical_size": rng.randrange(10_000_000, 2_000_000_000),
+                    "creation_source": "console",
+                    "primary": b == 0,
+                    "default": b == 0,
+                    "protected": False,
+                    "cpu_used_sec": rng.randrange(0, 100_000),
+                    "compute_time_seconds": rng.randrange(0, 100_000),
+                    "active_time_seconds": rng.randrange(0, 400_000),
+                    "written_data_bytes": rng.randrange(0, 10_000_000_000),
+                    "data_transfer_bytes": rng.randrange(0, 1_000_000_000),
+                    "created_at": stamp(branch_created),
+                    "updated_at": stamp(branch_created + rng.uniform(1, 300)),
+                }
+                if parent:
+                    branch["parent_id"] = parent
+                    branch["parent_lsn"] = f"0/{rng.randrange(1 << 28):X}"
+                branches.append(branch)
+                self.databases[(project_id, branch_id)] = [
+                    {"id": p * 10_000 + b * 100 + d, "branch_id": branch_id,
+                     "name": "neondb" if d == 0 else f"db_{rng.choice(_WORDS)}_{d}", "owner_name": "neondb_owner",
+                     "created_at": stamp(branch_created), "updated_at": stamp(branch_created)}
+                    for d in range(self.config.databases_per_branch)
+                ]
+                self.roles[(project_id, branch_id)] = [
+                    {"branch_id": branch_id, "name": "neondb_owner" if r == 0 else f"role_{r}",
+                     "protected": False, "created_at": stamp(branch_created), "updated_at": stamp(branch_created)}
+                    for r in range(self.config.roles_per_branch)
+                ]
+            self.branches[project_id] = branches
+
+            self.endpoints[project_id] = [
+                {
+                    "id": f"ep-{project_id}-{e:03d}",
+                    "host": f"ep-{project_id}-{e:03d}.{region}.aws.neon.tech",
+                    "project_id": project_id,
+                    "branch_id": branches[e % len(branches)]["id"] if branches else None,
+                    "autoscaling_limit_min_cu": 0.25,
+                    "autoscaling_limit_max_cu": 2,
+                    "region_id": region,
+                    "type": "read_write" if e == 0 else "read_only",
+                    "current_state": rng.choice(["active", "idle"]),
+                    "pooler_enabled": False,
+                    "pooler_mode": "transaction",
+                    "disabled": False,
+                    "passwordless_access": True,
+                    "creation_source": "console",
+                    "created_at": stamp(created),
+                    "updated_at": stamp(created + 1),
+                    "suspend_timeout_seconds": 0,
+                    "provisioner": "k8s-neonvm",
+                }
+                for e in range(self.config.endpoints_per_project)
+            ]
+
+            operations = []
+            for o in range(self.config.operations_per_project):
+                branch = branches[o % len(branches)] if branches else None
+                operations.append({
+                    "id": f"op-{project_id}-{o:05d}",
+                    "project_id": project_id,
+                    "branch_id": branch["id"] if branch else None,
+                    "action": rng.choice(["create_branch", "start_compute", "suspend_compute", "apply_config"]),
+                    "status": "finished",
+                    "failures_count": 0,
+                    "created_at": stamp(created + o * 0.5),
+                    "updated_at": stamp(created + o * 0.5 + 0.01),
+                    "total_duration_ms": rng.randrange(50, 5000),
+                })
+            # The API lists operations newest first
+            self.operations[project_id] = operations[::-1]
+
+        self.project_index = {project["id"]: project for project in self.projects}
+
+    def daily_consumption(self, project_id: str, from_date: Optional[str], to_date: Optional[str]) -> Dict[str, Any]:
+        """Deterministic daily consumption for [from_date, to_date), shaped like /consumption_history/projects"""
+        start = datetime.fromisoformat((from_date or "2024-01-01T00:00:00Z").replace("Z", "+00:00")).date()
+        end = datetime.fromisoformat((to_date or "2024-01-08T00:00:00Z").replace("Z", "+00:00")).date()
+        consumption = []
+        day = start
+        while day < end:
+            seed = int.from_bytes(hashlib.blake2b(f"{project_id}:{day}".encode(), digest_size=4).digest(), "big")
+            consumption.append({
+                "timeframe_start": f"{day.isoformat()}T00:00:00Z",
+                "timeframe_end": f"{(day + timedelta(days=1)).isoformat()}T00:00:00Z",
+                "active_time_seconds": seed % 86_400,
+                "compute_time_seconds": seed % 20_000,
+                "written_data_bytes": seed % 1_000_000_000,
+                "synthetic_storage_size_bytes": 1_000_000_000 + seed % 100_000_000,
+                "data_storage_bytes_hour": seed % 50_000_000,
+                "data_transfer_bytes": seed % 10_000_000,
+            })
+            day += timedelta(days=1)
+        return {"project_id": project_id,
+                "periods": [{"period_id": f"period-{project_id}", "period_plan": "scale", "consumption": consumption}]}
+
+    def record_operation(self, project_id: str, action: str, branch_id: Optional[str] = None,
+                         endpoint_id: Optional[str] = None, status: str = "finished") -> Dict[str, Any]:
+        """Append an operation to a project's feed and touch the project, as a live change would"""
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        operations = self.operations[project_id]
+        operation = {
+            "id": f"op-{project_id}-{len(operations):05d}",
+            "project_id": project_id,
+            "branch_id": branch_id,
+            "action": action,
+            "status": status,
+            "failures_count": 0,
+            "created_at": now,
+            "updated_at": now,
+            "total_duration_ms": 0,
+        }
+        if endpoint_id is not None:
+            operation["endpoint_id"] = endpoint_id
+        operations.insert(0, operation)
+        self.project_index[project_id]["updated_at"] = now
+        return operation
+
+    def set_operation_status(self, project_id: str, operation_id: str, status: str) -> Dict[str, Any]:
+        """Move an operation to a new status, as a running operation progressing would"""
+        for operation in self.operations[project_id]:
+            if operation["id"] == operation_id:
+                operation["status"] = status
+                operation["updated_at"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+                return operation
+        raise KeyError(operation_id)
+
+class MockNeonServer:
+    """Asyncio HTTP/1.1 server answering a subset of the Neon API v2 from a MockOrg"""
+
+    def __init__(self, config: Optional[MockNeonConfig] = None, org: Optional[MockOrg] = None):
+        self.config = config or MockNeonConfig()
+        self.org = org or MockOrg(self.config)
+        self._rng = random.Random(self.config.seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.base_url: Optional[str] = None
+        self.requests_total = 0
+        self.requests_by_route: Dict[str, int] = {}
+        self.errors_injected: Dict[int, int] = {}
+        self.not_modified = 0
+        self.connections = 0
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        bound_host, bound_port = self._server.sockets[0].getsockname()[:2]
+        self.base_url = f"http://{bound_host}:{bound_port}{API_PREFIX}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "MockNeonServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.stop()
+
+    def reset_counters(self) -> None:
+        self.requests_total = 0
+        self.requests_by_route = {}
+        self.errors_injected = {}
+        self.not_modified = 0
+        self.connections = 0
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", "0") or 0)
+                if length:
+                    await reader.readexactly(length)
+
+                status, body, extra_headers = await self._respond(method, target, headers)
+                payload = json.dumps(body).encode()
+                if status == 200 and self.config.etags:
+                    etag = '"' + hashlib.blake2b(payload, digest_size=8).hexdigest() + '"'
+                    extra_headers["ETag"] = etag
+                    if headers.get("if-none-match") == etag:
+                        self.not_modified += 1
+                        status, payload = 304, b""
+                keep_alive = headers.get("connection", "").lower() != "close"
+                head = [f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}",
+                        "Content-Type: application/json",
+                        f"Content-Length: {len(payload)}",
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                head.extend(f"{name}: {value}" for name, value in extra_headers.items())
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method: str, target: str, headers: Dict[str, str]) -> Tuple[int, Any, Dict[str, str]]:
+        config = self.config
+        delay = config.latency + self._rng.uniform(-config.latency_jitter, config.latency_jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        url = urlsplit(target)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        path = url.path[len(API_PREFIX):] if url.path.startswith(API_PREFIX) else url.path
+        parts = [part for part in path.strip("/").split("/") if part]
+        route = self._route_name(parts)
+        self.requests_total += 1
+        self.requests_by_route[route] = self.requests_by_route.get(route, 0) + 1
+
+        if not headers.get("authorization", "").startswith("Bearer "):
+            return 401, {"code": "", "message": "authorization header is required"}, {}
+        if config.error_rate_429 and self._rng.random() < config.error_rate_429:
+            self.errors_injected[429] = self.errors_injected.get(429, 0) + 1
+            return 429, {"code": "", "message": "rate limit exceeded"}, {"Retry-After": f"{config.retry_after:g}"}
+        if config.error_rate_5xx and self._rng.random() < config.error_rate_5xx:
+            self.errors_injected[503] = self.errors_injected.get(503, 0) + 1
+            return 503, {"code": "", "message": "service unavailable"}, {}
+        if method != "GET":
+            return 405, {"code": "", "message": "the mock API is read-only"}, {}
+
+        body = self._dispatch(parts, params)
+        if body is None:
+            return 404, {"code": "", "message": "not found"}, {}
+        return 200, body, {}
+
+    @staticmethod
+    def _route_name(parts: List[str]) -> str:
+        return "/" + "/".join("{id}" if i % 2 else part for i, part in enumerate(parts))
+
+    def _page(self, items: List[Dict[str, Any]], key: str, params: Dict[str, str],
+              id_field: str = "id") -> Dict[str, Any]:
+        limit = min(int(params.get("limit", 10)), self.config.max_page_size)
+        start = 0
+        cursor = params.get("cursor")
+        if cursor:
+            positions = {str(item[id_field]): i for i, item in enumerate(items)}
+            start = positions.get(cursor, len(items) - 1) + 1
+        page = items[start:start + limit]
+        pagination = {"cursor": str(page[-1][id_field])} if page else {}
+        return {key: page, "pagination": pagination}
+
+    def _dispatch(self, parts: List[str], params: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        org = self.org
+        if parts == ["users", "me"]:
+            return {"id": "mock-owner", "email": "owner@example.com", "name": "Mock Owner",
+                    "projects_limit": 1000, "branches_limit": 5000, "plan": "scale"}
+        if parts == ["projects"]:
+            return self._page(org.projects, "projects", params)
+        if parts[:2] == ["consumption_history", "account"]:
+            return {"periods": []}
+        if parts == ["consumption_history", "projects"]:
+            page = self._page(org.projects, "projects", params)
+            page["projects"] = [org.daily_consumption(project["id"], params.get("from"), params.get("to"))
+                                for project in page["projects"]]
+            return page
+        if len(parts) < 2 or parts[0] != "projects" or parts[1] not in org.project_index:
+            return None
+        project_id = parts[1]
+        if len(parts) == 2:
+            return {"project": org.project_index[project_id]}
+        if parts[2:] == ["branches"]:
+            return {"branches": org.branches[project_id]}
+        if parts[2:] == ["endpoints"]:
+            return {"endpoints": org.endpoints[project_id]}
+        if parts[2:] == ["operations"]:
+            return self._page(org.operations[project_id], "operations", params)
+        if len(parts) == 4 and parts[2] == "operations":
+            for operation in org.operations[project_id]:
+                if operation["id"] == parts[3]:
+                    return {"operation": operation}
+            return None
+        if parts[2:] == ["connection_uri"]:
+            return self._connection_uri(project_id, params)
+        if len(parts) == 5 and parts[2] == "branches" and parts[4] in ("databases", "roles"):
+            source = org.databases if parts[4] == "databases" else org.roles
+            items = source.get((project_id, parts[3]))
+            return None if items is None else {parts[4]: items}
+        return None
+
+    def _connection_uri(self, project_id: str, params: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        org = self.org
+        branch_id = params.get("branch_id") or org.branches[project_id][0]["id"]
+        databases = org.databases.get((project_id, branch_id), [])
+        roles = org.roles.get((project_id, branch_id), [])
+        database, role = params.get("database_name"), params.get("role_name")
+        endpoint = next((endpoint for endpoint in org.endpoints[project_id] if endpoint["branch_id"] == branch_id), None)
+        if (endpoint is None or all(item["name"] != database for item in databases)
+                or all(item["name"] != role for item in roles)):
+            return None
+        if self.config.connection_uri:
+            return {"uri": self.config.connection_uri}
+        return {"uri": f"postgresql://{role}:mock-password@{endpoint['host']}/{database}?sslmode=require"}
+
+_REASONS = {200: "OK", 304: "Not Modified", 401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed",
+            429: "Too Many Requests", 503: "Service Unavailable"}
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    """Register MockNeonConfig options on an argument parser"""
+    defaults = MockNeonConfig()
+    parser.add_argument("--projects", type=int, default=defaults.projects)
+    parser.add_argument("--branches", type=int, default=defaults.branches_per_project, help="Branches per project")
+    parser.add_argument("--databases", type=int, default=defaults.databases_per_branch, help="Databases per branch")
+    parser.add_argument("--roles", type=int, default=defaults.roles_per_branch, help="Roles per branch")
+    parser.add_argument("--endpoints", type=int, default=defaults.endpoints_per_project, help="Endpoints per project")
+    parser.add_argument("--operations", type=int, default=defaults.operations_per_project,
+                        help="Operations per project")
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency * 1000)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.latency_jitter * 1000)
+    parser.add_argument("--max-page-size", type=int, default=defaults.max_page_size)
+    parser.add_argument("--error-rate-429", type=float, default=defaults.error_rate_429)
+    parser.add_argument("--error-rate-5xx", type=float, default=defaults.error_rate_5xx)
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--no-etags", dest="etags", action="store_false", help="Do not send ETag validators")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--connection-uri", help="URI returned by /connection_uri, e.g. a local PostgreSQL")
+
+def config_from_args(args: argparse.Namespace) -> MockNeonConfig:
+    return MockNeonConfig(
+        projects=args.projects,
+        branches_per_project=args.branches,
+        databases_per_branch=args.databases,
+        roles_per_branch=args.roles,
+        endpoints_per_project=args.endpoints,
+        operations_per_project=args.operations,
+        latency=args.latency_ms / 1000,
+        latency_jitter=args.jitter_ms / 1000,
+        max_page_size=args.max_page_size,
+        error_rate_429=args.error_rate_429,
+        error_rate_5xx=args.error_rate_5xx,
+        retry_after=args.retry_after,
+        etags=args.etags,
+        seed=args.seed,
+        connection_uri=args.connection_uri,
+    )
+
+async def _serve(config: MockNeonConfig, host: str, port: int) -> None:
+    server = MockNeonServer(config)
+    base_url = await server.start(host, port)
+    print(f"Mock Neon API serving {config.projects} projects at {base_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the Neon API v2")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4010)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(config_from_args(args), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Several Neon organizations served from one process.
+
+NEON_ORGS names the organizations ("prod,staging"). Each one reads its API key
+from NEON_API_KEY_<ORG> and gets its own NeonAPIClient, so connection pools,
+rate budgets, caches, circuit breakers and snapshots are never shared between
+tenants. Client settings can be overridden per org by suffixing the variable
+with _<ORG>, e.g. NEON_RATE_LIMIT_RPS_PROD. Without NEON_ORGS the server runs a
+single org from NEON_API_KEY.
+"""
+
+import asyncio
+import itertools
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+# Org selector that fans a cross-org tool out to every configured org
+ALL_ORGS = "*"
+
+T = TypeVar("T")
+
+def env_suffix(org: str) -> str:
+    """Environment variable suffix for an org name: "eu-prod" -> "EU_PROD" """
+    return re.sub(r"[^0-9A-Za-z]", "_", org).upper()
+
+def org_override(name: str, org: Optional[str], default: T, cast: Callable[[str], T]) -> T:
+    """`default` unless `<name>_<ORG>` is set for this org"""
+    if org is None:
+        return default
+    value = os.getenv(f"{name}_{env_suffix(org)}")
+    return default if value is None else cast(value)
+
+@dataclass
+class OrgConfig:
+    name: str
+    api_key: str
+
+def orgs_from_env() -> Dict[str, OrgConfig]:
+    """Configured orgs in NEON_ORGS order; empty in single-org mode"""
+    names = [name.strip() for name in os.getenv("NEON_ORGS", "").split(",") if name.strip()]
+    orgs: Dict[str, OrgConfig] = {}
+    for name in names:
+        if name == ALL_ORGS or name in orgs:
+            raise ValueError(f"Invalid or duplicate org name {name!r} in NEON_ORGS")
+        api_key = os.getenv(f"NEON_API_KEY_{env_suffix(name)}")
+        if not api_key:
+            raise ValueError(f"NEON_API_KEY_{env_suffix(name)} environment variable is required for org {name!r}")
+        orgs[name] = OrgConfig(name, api_key)
+    return orgs
+
+def default_org(orgs: Dict[str, OrgConfig]) -> str:
+    """NEON_DEFAULT_ORG, or the first org listed in NEON_ORGS"""
+    name = os.getenv("NEON_DEFAULT_ORG") or next(iter(orgs))
+    if name not in orgs:
+        raise ValueError(f"NEON_DEFAULT_ORG {name!r} is not listed in NEON_ORGS")
+    return name
+
+def org_snapshot_path(path: str, org: str) -> str:
+    """Per-org snapshot file next to the configured one: /var/neon.jsonl.gz -> /var/prod-neon.jsonl.gz"""
+    directory, filename = os.path.split(path)
+    return os.path.join(directory, f"{org}-{filename}")
+
+async def across_orgs(names: List[str], fn: Callable[[str], Awaitable[T]]) -> Tuple[Dict[str, T], Dict[str, str]]:
+    """Run `fn` for every org concurrently; returns results and errors keyed by org"""
+    if not names:
+        raise ValueError(f'org="{ALL_ORGS}" requires NEON_ORGS to list the organizations to query')
+    outcomes = await asyncio.gather(*(fn(name) for name in names), return_exceptions=True)
+    results: Dict[str, T] = {}
+    errors: Dict[str, str] = {}
+    for name, outcome in zip(names, outcomes):
+        if isinstance(outcome, asyncio.CancelledError):
+            raise outcome
+        if isinstance(outcome, Exception):
+            errors[name] = str(outcome) or type(outcome).__name__
+        else:
+            results[name] = outcome
+    return results, errors
+
+def tag_org(items: List[Dict[str, Any]], org: str) -> List[Dict[str, Any]]:
+    """Copies of `items` carrying the org they came from (cached items are shared and never mutated)"""
+    return [{**item, "org": org} for item in items]
+
+def interleave(lists: List[List[T]]) -> List[T]:
+    """Round-robin merge that keeps each list's own order, e.g. per-org search rankings"""
+    sentinel = object()
+    return [item for item in itertools.chain.from_iterable(itertools.zip_longest(*lists, fillvalue=sentinel))
+            if item is not sentinel]
+
+def org_summary(results: Dict[str, Any], errors: Dict[str, str], count: Callable[[Any], int]) -> Dict[str, Any]:
+    """Per-org outcome of a cross-org call: item counts, or the error that org raised"""
+    summary: Dict[str, Any] = {name: {"count": count(result)} for name, result in results.items()}
+    summary.update({name: {"error": error} for name, error in errors.items()})
+    return summary
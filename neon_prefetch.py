@@ -0,0 +1,221 @@
+"""
+Speculative prefetching of the Neon API calls agents usually make next.
+
+Agents follow a few call sequences: list a project's branches, then read the
+databases and roles of one of them; look at a project, then its endpoints.
+A Prefetcher sees every interactive GET. When a route has follow-ups, either
+configured or learned from how often one route follows another in the same
+project, it fetches them into the cache at bulk priority right after the
+first call returns, so the second call of the sequence is a cache hit.
+
+Prefetching spends the same API budget as real calls. Each trigger fetches at
+most `max_per_trigger` follow-ups, and a prefetch is skipped whenever the
+scheduler has fewer than `reserve` free request slots or tokens left for
+interactive calls.
+"""
+
+import asyncio
+import itertools
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+import httpx
+
+from neon_metrics import route_template
+from neon_scheduler import PRIORITY_INTERACTIVE, bulk_priority, request_priority
+
+# Built-in follow-ups: route template -> routes usually read next
+DEFAULT_RULES: Dict[str, List[str]] = {
+    "/projects/{id}": ["/projects/{id}/endpoints"],
+    "/projects/{id}/branches": ["/projects/{id}/branches/{id}/databases", "/projects/{id}/branches/{id}/roles"],
+    "/projects/{id}/branches/{id}/databases": ["/projects/{id}/branches/{id}/roles"],
+    "/projects/{id}/branches/{id}/roles": ["/projects/{id}/branches/{id}/databases"],
+}
+
+def parse_rules(value: str) -> Dict[str, List[str]]:
+    """Parse "trigger -> follow-up" pairs separated by commas, e.g. "/projects/{id} -> /projects/{id}/endpoints" """
+    rules: Dict[str, List[str]] = {}
+    for pair in filter(None, (part.strip() for part in value.split(","))):
+        trigger, arrow, follow_up = pair.partition("->")
+        if not arrow or not trigger.strip() or not follow_up.strip():
+            raise ValueError(f"Invalid prefetch rule {pair!r}; expected 'trigger -> follow-up'")
+        rules.setdefault(route_template(trigger.strip()), []).append(route_template(follow_up.strip()))
+    return rules
+
+def expand(path: str, value: Any, template: str) -> List[str]:
+    """
+    Concrete paths for a follow-up `template` of the response `value` read from `path`.
+
+    Ids come from the triggering path where the two routes share a prefix
+    (/projects/abc -> /projects/abc/endpoints). At most one further id is taken
+    from the items the trigger listed, e.g. every branch of a branch listing,
+    primary and default branches first. Returns [] when an id is unknown.
+    """
+    source = [part for part in path.strip("/").split("/") if part]
+    target = [part for part in template.strip("/").split("/") if part]
+    filled: List[str] = []
+    choices: Optional[List[str]] = None
+    choice_at = -1
+    for i, part in enumerate(target):
+        if part != "{id}":
+            filled.append(part)
+        elif i < len(source) and source[:i:2] == target[:i:2]:
+            filled.append(source[i])
+        elif choices is None and isinstance(value, dict) and isinstance(value.get(target[i - 1]), list):
+            items = [item for item in value[target[i - 1]] if isinstance(item, dict) and item.get("id") is not None]
+            items.sort(key=lambda item: not (item.get("primary") or item.get("default")))
+            choices = [str(item["id"]) for item in items]
+            choice_at = len(filled)
+            filled.append("")
+        else:
+            return []
+    if choices is None:
+        return ["/" + "/".join(filled)]
+    return ["/" + "/".join(filled[:choice_at] + [choice] + filled[choice_at + 1:]) for choice in choices]
+
+@dataclass
+class _Visit:
+    route: str
+    at: float
+    followed_by: Set[str] = field(default_factory=set)
+
+class TransitionStats:
+    """How often each route is followed by another within `window` seconds, in the same project"""
+
+    def __init__(self, window: float = 30.0, max_projects: int = 256, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.max_projects = max_projects
+        self._clock = clock
+        self.visits: Dict[str, int] = {}
+        self.follows: Dict[str, Dict[str, int]] = {}
+        # Recent routes per project, oldest first
+        self._recent: "OrderedDict[str, Deque[_Visit]]" = OrderedDict()
+
+    def record(self, project_id: str, route: str) -> None:
+        now = self._clock()
+        recent = self._recent.get(project_id)
+        if recent is None:
+            recent = self._recent[project_id] = deque(maxlen=8)
+            while len(self._recent) > self.max_projects:
+                self._recent.popitem(last=False)
+        self._recent.move_to_end(project_id)
+        while recent and now - recent[0].at > self.window:
+            recent.popleft()
+        for visit in recent:
+            # One route visit counts each follow-up once, however often it is repeated
+            if visit.route != route and route not in visit.followed_by:
+                visit.followed_by.add(route)
+                follows = self.follows.setdefault(visit.route, {})
+                follows[route] = follows.get(route, 0) + 1
+        recent.append(_Visit(route, now))
+        self.visits[route] = self.visits.get(route, 0) + 1
+
+    def likely(self, route: str, min_samples: int, min_ratio: float) -> List[str]:
+        """Routes that followed `route` at least `min_ratio` of the time over `min_samples` visits"""
+        visits = self.visits.get(route, 0)
+        if visits < min_samples:
+            return []
+        return [follow_up for follow_up, count in self.follows.get(route, {}).items() if count / visits >= min_ratio]
+
+class Prefetcher:
+    """Fetch likely follow-up calls into the client's cache after each interactive GET"""
+
+    def __init__(self, client: Any, rules: Optional[Dict[str, List[str]]] = None, learn: bool = True,
+                 max_per_trigger: int = 6, reserve: float = 5.0, min_samples: int = 5, min_ratio: float = 0.5,
+                 window: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.client = client
+        self.rules = dict(DEFAULT_RULES if rules is None else rules)
+        self.learn = learn
+        self.max_per_trigger = max_per_trigger
+        self.reserve = reserve
+        self.min_samples = min_samples
+        self.min_ratio = min_ratio
+        self.transitions = TransitionStats(window, clock=clock)
+        self._tasks: Set[asyncio.Task] = set()
+        # Prefetched paths not read yet, oldest first
+        self._unread: "OrderedDict[str, None]" = OrderedDict()
+        self.issued = 0
+        self.used = 0
+        self.skipped_cached = 0
+        self.skipped_busy = 0
+        self.errors = 0
+
+    def follow_ups(self, route: str) -> List[str]:
+        routes = list(self.rules.get(route, []))
+        if self.learn:
+            routes.extend(follow_up for follow_up in self.transitions.likely(route, self.min_samples, self.min_ratio)
+                          if follow_up not in routes)
+        return routes
+
+    def observe(self, path: str, params: Optional[Dict[str, Any]], value: Any) -> None:
+        """Called with every GET result; only interactive reads teach or trigger prefetches"""
+        if request_priority.get() != PRIORITY_INTERACTIVE:
+            return
+        path = "/" + path.strip("/")
+        if not params and path in self._unread:
+            del self._unread[path]
+            self.used += 1
+        route = route_template(path)
+        parts = path.strip("/").split("/")
+        if self.learn and len(parts) >= 2 and parts[0] == "projects":
+            self.transitions.record(parts[1], route)
+        targets = [target for template in self.follow_ups(route) if (target := expand(path, value, template))]
+        if not targets:
+            return
+        # Round-robin across follow-up routes so the first items get all their follow-ups within budget
+        paths = [path for path in itertools.chain.from_iterable(itertools.zip_longest(*targets)) if path]
+        with bulk_priority():
+            task = asyncio.create_task(self._prefetch(paths[:self.max_per_trigger]))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _prefetch(self, paths: List[str]) -> None:
+        for path in paths:
+            if self.client.scheduler.headroom() <= self.reserve:
+                self.skipped_busy += len(paths) - paths.index(path)
+                return
+            try:
+                fetched = await self.client.prefetch(path)
+            except httpx.HTTPError:
+                self.errors += 1
+                continue
+            if not fetched:
+                self.skipped_cached += 1
+                continue
+            self.issued += 1
+            self._unread[path] = None
+            while len(self._unread) > 1024:
+                self._unread.popitem(last=False)
+
+    async def drain(self) -> None:
+        """Wait for prefetches already started"""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        learned = {}
+        if self.learn:
+            for route in self.transitions.visits:
+                likely = [follow_up for follow_up in self.transitions.likely(route, self.min_samples, self.min_ratio)
+                          if follow_up not in self.rules.get(route, [])]
+                if likely:
+                    learned[route] = likely
+        return {
+            "enabled": True,
+            "issued": self.issued,
+            "used": self.used,
+            "hit_rate": round(self.used / self.issued, 3) if self.issued else None,
+            "skipped_cached": self.skipped_cached,
+            "skipped_busy": self.skipped_busy,
+            "errors": self.errors,
+            "in_flight": len(self._tasks),
+            "rules": self.rules,
+            "learned_rules": learned,
+        }
@@ -0,0 +1,115 @@
+"""
+Field selection and compact tabular output for tool results.
+
+Shaping runs in the server before serialization and always builds new
+containers, so cached API responses are never modified.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+# Top-level response keys that describe the listing rather than hold resources
+METADATA_KEYS = {"pagination", "scanned", "summary", "errors", "_cache"}
+
+_MISSING = object()
+
+def _lookup(value: Any, path: Sequence[str]) -> Any:
+    """Value at a dotted path; lists along the way are mapped element-wise, leaving out elements without it"""
+    for i, part in enumerate(path):
+        if isinstance(value, list):
+            found = (_lookup(item, path[i:]) for item in value)
+            return [item for item in found if item is not _MISSING]
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+def _project(value: Any, paths: List[Sequence[str]]) -> Any:
+    """Copy of `value` holding only `paths`; lists keep their shape with each element projected"""
+    if any(not path for path in paths):
+        # An enclosing field is selected whole
+        return value
+    if isinstance(value, list):
+        projected = [_project(item, paths) for item in value]
+        kept = [item for item in projected if item is not _MISSING]
+        return kept if kept or not value else _MISSING
+    if not isinstance(value, dict):
+        return _MISSING
+    grouped: Dict[str, List[Sequence[str]]] = {}
+    for path in paths:
+        grouped.setdefault(path[0], []).append(path[1:])
+    selected: Dict[str, Any] = {}
+    for part, rest in grouped.items():
+        if part in value:
+            child = _project(value[part], rest)
+            if child is not _MISSING:
+                selected[part] = child
+    return selected if selected else _MISSING
+
+def select_fields(item: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    """
+    Copy only `fields` of `item`, keeping the nesting of dotted paths.
+
+    `select_fields(project, ["id", "settings.allowed_ips.ips"])` returns
+    `{"id": ..., "settings": {"allowed_ips": {"ips": [...]}}}`. A path through a
+    list selects from each element, so `"endpoints.id"` gives `{"endpoints": [{"id": ...}, ...]}`.
+    Missing fields, and list elements without the field, are left out.
+    """
+    selected = _project(item, [field.split(".") for field in fields])
+    return {} if selected is _MISSING else selected
+
+def tabulate(items: List[Dict[str, Any]], fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Render objects as {"columns": [...], "rows": [[...], ...]}.
+
+    Columns are `fields` (dotted paths allowed) or, by default, every top-level
+    key in order of first appearance. Missing values are null.
+    """
+    if fields is None:
+        columns: Dict[str, None] = {}
+        for item in items:
+            columns.update(dict.fromkeys(item))
+        fields = list(columns)
+    paths = [field.split(".") for field in fields]
+    rows = []
+    for item in items:
+        row = []
+        for path in paths:
+            value = _lookup(item, path)
+            row.append(None if value is _MISSING else value)
+        rows.append(row)
+    return {"columns": list(fields), "rows": rows}
+
+def _is_records(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(item, dict) for item in value)
+
+def shape(result: Any, fields: Optional[Sequence[str]] = None, compact: bool = False) -> Any:
+    """
+    Apply field selection and/or compact tables to a tool result.
+
+    Lists of objects, either the whole result or under a top-level key such as
+    "projects", are projected or tabulated; a single resource object (e.g.
+    {"project": {...}}) is projected; metadata such as pagination passes through.
+    """
+    if not fields and not compact:
+        return result
+    fields = list(fields) if fields else None
+    if _is_records(result):
+        return _shape_records(result, fields, compact)
+    if not isinstance(result, dict):
+        return result
+    shaped: Dict[str, Any] = {}
+    for key, value in result.items():
+        if key in METADATA_KEYS:
+            shaped[key] = value
+        elif _is_records(value):
+            shaped[key] = _shape_records(value, fields, compact)
+        elif isinstance(value, dict) and fields:
+            shaped[key] = select_fields(value, fields)
+        else:
+            shaped[key] = value
+    return shaped
+
+def _shape_records(items: List[Dict[str, Any]], fields: Optional[List[str]], compact: bool) -> Any:
+    if compact:
+        return tabulate(items, fields)
+    return [select_fields(item, fields) for item in items]
@@ -0,0 +1,158 @@
+"""
+Compact records for Neon objects held by the server's long-lived stores.
+
+A decoded API object is a dict of strings, numbers and nested dicts, and with
+tens of thousands of branches, databases and roles that overhead dominates
+the process's memory. A record keeps only the fields the catalog, sync model
+and topology index read, in __slots__, with strings that repeat across
+objects (parent ids, regions, states) interned. Everything else is kept as
+one zlib-compressed JSON blob, and the full payload is rebuilt only when a
+caller asks for it with `payload()`.
+
+Blobs are compressed against a dictionary primed with the first payload of
+each kind, so the field names and common values that every object repeats
+cost almost nothing after the first one.
+"""
+
+import json
+import sys
+import zlib
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple, Type, TypeVar, Union
+
+from neon_json import orjson
+
+ZLIB_LEVEL = 6
+
+# Kept fields the payload did not have, so get() can tell them from an explicit null
+_MISSING: Any = object()
+# One shared tuple per distinct key order, so records only hold a reference to it
+_orders: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+R = TypeVar("R", bound="Record")
+
+def _dumps(value: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+def _loads(body: bytes) -> Dict[str, Any]:
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+class Record:
+    """Slotted view of one API object; read fields with get() or [] and the full object with payload()"""
+
+    __slots__ = ("_order", "_rest")
+    # Fields kept as attributes, and those whose string values are interned
+    FIELDS: Tuple[str, ...] = ()
+    INTERNED: FrozenSet[str] = frozenset()
+    _fields: FrozenSet[str] = frozenset()
+    _zdict: Optional[bytes] = None
+
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        cls._fields = frozenset(cls.FIELDS)
+        cls._zdict = None
+
+    @classmethod
+    def from_payload(cls: Type[R], payload: Dict[str, Any]) -> R:
+        record = cls.__new__(cls)
+        for name in cls.FIELDS:
+            value = payload.get(name, _MISSING)
+            if name in cls.INTERNED and type(value) is str:
+                value = sys.intern(value)
+            setattr(record, name, value)
+        order = tuple(payload)
+        record._order = _orders.setdefault(order, order)
+        rest = {key: value for key, value in payload.items() if key not in cls._fields}
+        record._rest = cls._compress(_dumps(rest)) if rest else None
+        return record
+
+    @classmethod
+    def _compress(cls, body: bytes) -> bytes:
+        if cls._zdict is None:
+            cls._zdict = body
+        compressor = zlib.compressobj(ZLIB_LEVEL, zdict=cls._zdict)
+        return compressor.compress(body) + compressor.flush()
+
+    def _extra(self) -> Dict[str, Any]:
+        """The fields not kept as attributes, decompressed"""
+        if self._rest is None:
+            return {}
+        return _loads(zlib.decompressobj(zdict=type(self)._zdict).decompress(self._rest))
+
+    def payload(self) -> Dict[str, Any]:
+        """The full API object, rebuilt with its original key order"""
+        extra = self._extra()
+        return {key: getattr(self, key) if key in self._fields else extra[key] for key in self._order}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._fields:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        if key not in self._order:
+            return default
+        return self._extra().get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._order
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(id={self.get('id')!r}, name={self.get('name')!r})"
+
+class ProjectRecord(Record):
+    FIELDS = ("id", "name", "region_id", "pg_version", "created_at", "updated_at")
+    INTERNED = frozenset({"region_id"})
+    __slots__ = FIELDS
+
+class BranchRecord(Record):
+    FIELDS = ("id", "project_id", "parent_id", "name", "current_state", "primary", "default", "protected",
+              "created_at", "updated_at")
+    INTERNED = frozenset({"project_id", "parent_id", "current_state"})
+    __slots__ = FIELDS
+
+class EndpointRecord(Record):
+    FIELDS = ("id", "project_id", "branch_id", "host", "region_id", "type", "current_state", "created_at",
+              "updated_at")
+    INTERNED = frozenset({"project_id", "branch_id", "region_id", "type", "current_state"})
+    __slots__ = FIELDS
+
+class DatabaseRecord(Record):
+    FIELDS = ("id", "branch_id", "name", "owner_name")
+    INTERNED = frozenset({"branch_id", "owner_name"})
+    __slots__ = FIELDS
+
+class RoleRecord(Record):
+    FIELDS = ("branch_id", "name", "protected")
+    INTERNED = frozenset({"branch_id", "name"})
+    __slots__ = FIELDS
+
+class OperationRecord(Record):
+    FIELDS = ("id", "project_id", "branch_id", "endpoint_id", "action", "status", "created_at", "updated_at")
+    INTERNED = frozenset({"project_id", "branch_id", "endpoint_id", "action", "status"})
+    __slots__ = FIELDS
+
+# Listing key of each API collection -> its record type
+RECORD_TYPES: Dict[str, Type[Record]] = {
+    "projects": ProjectRecord,
+    "branches": BranchRecord,
+    "endpoints": EndpointRecord,
+    "databases": DatabaseRecord,
+    "roles": RoleRecord,
+    "operations": OperationRecord,
+}
+
+def as_record(cls: Type[R], item: Union[R, Dict[str, Any]]) -> R:
+    return item if isinstance(item, cls) else cls.from_payload(item)
+
+def index_records(cls: Type[R], items: Iterable[Dict[str, Any]], key: str = "id") -> Dict[str, R]:
+    """Records of `items` keyed by `key`, as the sync model holds a listing"""
+    return {item[key]: cls.from_payload(item) for item in items}
+
+def payloads(records: Iterable[Record]) -> List[Dict[str, Any]]:
+    return [record.payload() for record in records]
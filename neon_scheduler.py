@@ -0,0 +1,202 @@
+"""
+Rate-limit-aware scheduling for Neon API requests.
+
+Every upstream call takes a slot from a RequestScheduler, which enforces a
+client-side token bucket and a concurrency cap, and hands out slots to
+interactive callers before background bulk crawls.
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+
+_PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BULK: "bulk"}
+
+request_priority: ContextVar[int] = ContextVar("neon_request_priority", default=PRIORITY_INTERACTIVE)
+
+@contextmanager
+def bulk_priority() -> Iterator[None]:
+    """Run requests issued in this context (and tasks spawned from it) at bulk priority"""
+    token = request_priority.set(PRIORITY_BULK)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    current = datetime.now(timezone.utc).timestamp() if now is None else now
+    return max(0.0, when.timestamp() - current)
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff for the given zero-based retry attempt"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class TokenBucket:
+    """Client-side request budget refilled at `rate` tokens per second up to `burst`"""
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available (0 if one can be taken now)"""
+        if self.rate <= 0:
+            return 0.0
+        now = self._clock()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        self._refill(now)
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def available(self) -> float:
+        """Tokens that could be taken right now"""
+        if self.rate <= 0:
+            return float("inf")
+        now = self._clock()
+        if now < self._blocked_until:
+            return 0.0
+        self._refill(now)
+        return self._tokens
+
+    def consume(self) -> None:
+        self._tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for `seconds`, e.g. after a 429 with Retry-After"""
+        now = self._clock()
+        self._blocked_until = max(self._blocked_until, now + seconds)
+        self._tokens = 0.0
+        self._updated = now
+
+class RequestScheduler:
+    """Token bucket + concurrency cap with priority-ordered admission"""
+
+    def __init__(self, rate: float = 10.0, burst: float = 20.0, max_concurrency: int = 10):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_concurrency = max(1, max_concurrency)
+        self._active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.admitted = {name: 0 for name in _PRIORITY_NAMES.values()}
+        self.queued = 0
+        self.retries = 0
+        self.rate_limited = 0
+
+    async def acquire(self, priority: Optional[int] = None) -> None:
+        if priority is None:
+            priority = request_priority.get()
+        if not self._waiters and self._active < self.max_concurrency and self.bucket.delay() == 0:
+            self._admit(priority)
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self.queued += 1
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as we were cancelled: hand the slot back
+                self.release()
+            raise
+        self.admitted[_PRIORITY_NAMES.get(priority, "bulk")] += 1
+
+    def _admit(self, priority: int) -> None:
+        self.bucket.consume()
+        self._active += 1
+        self.admitted[_PRIORITY_NAMES.get(priority, "bulk")] += 1
+
+    def release(self) -> None:
+        self._active -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._waiters and self._active < self.max_concurrency:
+            if self._waiters[0][2].done():
+                heapq.heappop(self._waiters)
+                continue
+            wait = self.bucket.delay()
+            if wait > 0:
+                if self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(wait, self._on_timer)
+                return
+            _, _, future = heapq.heappop(self._waiters)
+            self.bucket.consume()
+            self._active += 1
+            future.set_result(None)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[int] = None) -> AsyncIterator[None]:
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def headroom(self) -> float:
+        """Requests that could start right now without queueing (0 while anyone is queued)"""
+        if any(not future.done() for _, _, future in self._waiters):
+            return 0.0
+        return min(self.max_concurrency - self._active, self.bucket.available())
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller after the API signalled a rate limit"""
+        self.rate_limited += 1
+        self.bucket.pause(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        waiting: Dict[str, int] = {}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                name = _PRIORITY_NAMES.get(priority, "bulk")
+                waiting[name] = waiting.get(name, 0) + 1
+        return {
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "rate_per_second": self.bucket.rate,
+            "burst": self.bucket.burst,
+            "waiting": waiting,
+            "admitted": dict(self.admitted),
+            "queued_total": self.queued,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+        }
@@ -0,0 +1,147 @@
+"""
+Response cache tier shared by the worker processes of one HTTP server.
+
+Each worker keeps its own in-process ResponseCache. On a miss it looks in a
+SQLite database before calling the Neon API, and writes every response it
+fetches back, so N workers make about one upstream call per resource rather
+than N. The database runs in WAL mode, so readers never wait for a writer.
+Rows are namespaced by an API key fingerprint, so orgs never read each
+other's responses. When a worker expires responses because an operation
+changed them, it marks their rows stale too, so neither it nor another
+worker reads the outdated copy back from the database.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlencode
+
+from neon_cache import CacheKey
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    digest TEXT,
+    stored_at REAL NOT NULL
+)
+"""
+
+@dataclass
+class SharedEntry:
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    digest: Optional[str]
+    age: float
+
+class SharedCache:
+    """SQLite-backed response store for one API key, safe to use from several processes"""
+
+    def __init__(self, path: str, namespace: str, max_entries: int = 20000,
+                 clock: Callable[[], float] = time.time):
+        self.path = os.path.expanduser(path)
+        self.namespace = namespace
+        self.max_entries = max_entries
+        # Wall clock: ages are compared across processes
+        self._clock = clock
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # Created readable by the owner only; SQLite gives its WAL and shared-memory files the same mode
+            os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _key(self, key: CacheKey) -> str:
+        path, params = key
+        return f"{self.namespace}:{path}?{urlencode(params)}"
+
+    def get(self, key: CacheKey, max_age: float) -> Optional[SharedEntry]:
+        """The stored response for `key` if it is younger than `max_age` seconds"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT body, etag, last_modified, digest, stored_at FROM responses WHERE key = ?",
+                (self._key(key),)).fetchone()
+        age = self._clock() - row[4] if row is not None else None
+        if age is None or age >= max_age:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return SharedEntry(row[0], row[1], row[2], row[3], max(0.0, age))
+
+    def put(self, key: CacheKey, body: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None,
+            digest: Optional[str] = None) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                         (self._key(key), body, etag, last_modified, digest, self._clock()))
+            self.writes += 1
+            if self.writes % 256 == 0:
+                # Trim the oldest rows now and then rather than on every write
+                conn.execute("DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                             "ORDER BY stored_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def touch(self, key: CacheKey) -> None:
+        """Mark a stored response as just confirmed unchanged by the API"""
+        with self._lock:
+            self._connect().execute("UPDATE responses SET stored_at = ? WHERE key = ?",
+                                    (self._clock(), self._key(key)))
+
+    def expire(self, path_prefix: str, recursive: bool = True) -> None:
+        """Mark the rows for `path_prefix` (and, if recursive, the paths below it) too old to be served"""
+        path = "/" + path_prefix.strip("/")
+        exact, below = f"{self.namespace}:{path}?", f"{self.namespace}:{path}/"
+        with self._lock:
+            self._connect().execute(
+                "UPDATE responses SET stored_at = 0 WHERE substr(key, 1, ?) = ? OR (? AND substr(key, 1, ?) = ?)",
+                (len(exact), exact, recursive, len(below), below))
+
+    async def aget(self, key: CacheKey, max_age: float) -> Optional[SharedEntry]:
+        """`get` off the event loop; a failing database counts as a miss"""
+        try:
+            return await asyncio.to_thread(self.get, key, max_age)
+        except sqlite3.Error:
+            self.errors += 1
+            return None
+
+    async def arun(self, fn: Callable[..., None], *args: Any) -> None:
+        """Run `put`, `touch` or `expire` off the event loop, counting rather than raising database errors"""
+        try:
+            await asyncio.to_thread(fn, *args)
+        except sqlite3.Error:
+            self.errors += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "path": self.path,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "writes": self.writes,
+            "errors": self.errors,
+        }
@@ -0,0 +1,127 @@
+"""
+On-disk snapshot of the project catalog and cached Neon API responses.
+
+The snapshot is a gzip-compressed JSON-lines file: a header line (format
+version and a fingerprint of the API key and base URL), one line with the
+catalog's project listing, then one line per cached response with its
+validators. It is read line by line, so loading streams rather than parsing
+one large document, and written to a temporary file that atomically replaces
+the previous snapshot.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+SNAPSHOT_FORMAT = 1
+
+def key_fingerprint(api_key: str, base_url: str) -> str:
+    """Identify the account a snapshot belongs to without storing the key itself"""
+    return hashlib.blake2b(f"{base_url}\0{api_key}".encode(), digest_size=16).hexdigest()
+
+class SnapshotStore:
+    """Reads and writes one snapshot file for one API key"""
+
+    def __init__(self, path: str, fingerprint: str, max_age: float = 86400.0):
+        self.path = os.path.expanduser(path)
+        self.fingerprint = fingerprint
+        self.max_age = max_age
+        self.loaded_projects = 0
+        self.loaded_entries = 0
+        self.skipped_entries = 0
+        # Set when the whole snapshot was older than `max_age` and ignored
+        self.expired = False
+        self.load_ms: Optional[float] = None
+        self.saved_at: Optional[float] = None
+        self.saves = 0
+        self.save_ms: Optional[float] = None
+        self.bytes_written = 0
+
+    def read(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the snapshot's records: one {"projects": [...]} then {"key": ..., "value": ...} per response.
+
+        Yields nothing if the file is missing, unreadable, from another format
+        version, for another account or saved more than `max_age` ago. Responses
+        older than `max_age` are skipped.
+        """
+        started = time.perf_counter()
+        now = time.time()
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                header = json.loads(f.readline() or "{}")
+                if header.get("format") != SNAPSHOT_FORMAT or header.get("fingerprint") != self.fingerprint:
+                    return
+                # The catalog line carries no timestamp of its own, so the save time bounds its age
+                if now - header.get("saved_at", 0) > self.max_age:
+                    self.expired = True
+                    return
+                for line in f:
+                    record = json.loads(line)
+                    if "projects" in record:
+                        self.loaded_projects = len(record["projects"])
+                    elif now - record.get("stored_at", 0) > self.max_age:
+                        self.skipped_entries += 1
+                        continue
+                    else:
+                        self.loaded_entries += 1
+                    yield record
+        except (OSError, EOFError, ValueError):
+            # A truncated or corrupt snapshot only costs the warm start
+            return
+        finally:
+            self.load_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    def write(self, projects: Optional[List[Dict[str, Any]]], entries: Iterable[Dict[str, Any]]) -> int:
+        """Replace the snapshot atomically; returns the compressed size in bytes"""
+        started = time.perf_counter()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        # mkstemp creates the file readable by the owner only
+        fd, tmp_path = tempfile.mkstemp(prefix=".neonorgdb-snapshot-", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=1) as f:
+                header = {"format": SNAPSHOT_FORMAT, "fingerprint": self.fingerprint, "saved_at": time.time()}
+                f.write(_line(header))
+                if projects is not None:
+                    f.write(_line({"projects": projects}))
+                for record in entries:
+                    f.write(_line(record))
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        self.saves += 1
+        self.saved_at = time.time()
+        self.save_ms = round((time.perf_counter() - started) * 1000, 3)
+        self.bytes_written = os.path.getsize(self.path)
+        return self.bytes_written
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "loaded_projects": self.loaded_projects,
+            "loaded_entries": self.loaded_entries,
+            "skipped_entries": self.skipped_entries,
+            "expired": self.expired,
+            "load_ms": self.load_ms,
+            "saves": self.saves,
+            "saved_at": self.saved_at,
+            "save_ms": self.save_ms,
+            "bytes": self.bytes_written,
+        }
+
+def _line(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+def cache_key_from_record(record: Dict[str, Any]) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    """Rebuild the hashable cache key stored in a snapshot record"""
+    path, params = record["key"]
+    return path, tuple((str(k), str(v)) for k, v in params)
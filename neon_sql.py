@@ -0,0 +1,349 @@
+"""
+Read-only SQL against branch databases over pooled asyncpg connections.
+
+A query names a project, branch and database. The target resolves to a
+connection URI for the branch's compute endpoint, kept until connecting with
+it fails, and each URI (endpoint, database and role) gets a small asyncpg
+pool on first use. Pools that sit idle are closed and the least recently
+used is evicted beyond `max_pools`.
+
+Every query runs in a read-only transaction with a statement timeout and
+reads rows through a server-side cursor, a chunk per round trip. A call
+returns at most `max_rows` rows; when more remain, the transaction stays open
+under a cursor id that later calls continue from, so a large result is never
+read or held whole.
+"""
+
+import asyncio
+import datetime
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Optional, for direct SQL access. Imported on first use rather than at startup.
+_NOT_LOADED: Any = object()
+asyncpg: Any = _NOT_LOADED
+
+def _asyncpg() -> Any:
+    """The asyncpg module; raises when it is not installed"""
+    global asyncpg
+    if asyncpg is _NOT_LOADED:
+        try:
+            import asyncpg as module
+        except ImportError:
+            module = None
+        asyncpg = module
+    if asyncpg is None:
+        raise ValueError('SQL queries require asyncpg: `pip install "neonorgdb[sql]"`')
+    return asyncpg
+
+# (project id, branch id, database name, role name)
+SQLTarget = Tuple[str, str, str, str]
+
+# Seconds past the statement timeout before a read is cancelled client-side. The statement can
+# raise its own statement_timeout with set_config(), so the server alone cannot be relied on.
+CLIENT_TIMEOUT_MARGIN = 1.0
+
+def jsonable(value: Any) -> Any:
+    """A column value as JSON: bytea as Postgres hex text, dates as ISO 8601, other types as their text form"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [jsonable(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): jsonable(item) for key, item in value.items()}
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "\\x" + bytes(value).hex()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+@dataclass
+class _Pool:
+    pool: Any
+    last_used: float
+    # Connections currently out of the pool, including those held by open cursors
+    leases: int = 0
+    queries: int = 0
+
+@dataclass
+class _OpenCursor:
+    id: str
+    dsn: str
+    connection: Any
+    transaction: Any
+    cursor: Any
+    columns: List[str]
+    timeout: float
+    last_used: float
+    rows_returned: int = 0
+    # One row read ahead, so a call that ends exactly at the last row reports no cursor
+    lookahead: List[Any] = field(default_factory=list)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+class SQLPools:
+    """asyncpg pool per connection URI and the open result cursors read from them"""
+
+    def __init__(self, resolve: Callable[[SQLTarget], Awaitable[str]], max_size: int = 5, max_pools: int = 20,
+                 idle_seconds: float = 300.0, statement_timeout: float = 30.0, chunk_rows: int = 500,
+                 max_cursors: int = 16, cursor_idle_seconds: float = 120.0,
+                 create_pool: Optional[Callable[..., Awaitable[Any]]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.resolve = resolve
+        self.max_size = max(1, max_size)
+        self.max_pools = max(1, max_pools)
+        self.idle_seconds = idle_seconds
+        self.statement_timeout = statement_timeout
+        self.chunk_rows = max(1, chunk_rows)
+        self.max_cursors = max(1, max_cursors)
+        self.cursor_idle_seconds = cursor_idle_seconds
+        self._create_pool = create_pool
+        self._clock = clock
+        # Resolved URIs embed the role's password, so they are kept in memory only
+        self._dsns: Dict[SQLTarget, str] = {}
+        self._pools: "OrderedDict[str, _Pool]" = OrderedDict()
+        self._pool_lock = asyncio.Lock()
+        self._cursors: "OrderedDict[str, _OpenCursor]" = OrderedDict()
+        # Prefix of this instance's cursor ids, so a cursor from another worker process is recognized as such
+        self.instance = secrets.token_hex(4)
+        self._reaper: Optional[asyncio.Task] = None
+        self.pools_created = 0
+        self.pools_evicted = 0
+        self.cursors_expired = 0
+        self.queries = 0
+        self.rows = 0
+
+    async def _dsn(self, target: SQLTarget) -> str:
+        dsn = self._dsns.get(target)
+        if dsn is None:
+            dsn = self._dsns[target] = await self.resolve(target)
+        return dsn
+
+    async def _pool(self, dsn: str) -> _Pool:
+        entry = self._pools.get(dsn)
+        if entry is None:
+            async with self._pool_lock:
+                entry = self._pools.get(dsn)
+                if entry is None:
+                    create_pool = self._create_pool or _asyncpg().create_pool
+                    pool = await create_pool(dsn, min_size=0, max_size=self.max_size,
+                                             max_inactive_connection_lifetime=self.idle_seconds)
+                    entry = self._pools[dsn] = _Pool(pool, self._clock())
+                    self.pools_created += 1
+                    await self._evict_lru(keep=dsn)
+        self._pools.move_to_end(dsn)
+        entry.last_used = self._clock()
+        self._start_reaper()
+        return entry
+
+    async def _evict_lru(self, keep: str) -> None:
+        """Close the least recently used idle pools beyond max_pools"""
+        excess = len(self._pools) - self.max_pools
+        idle = [dsn for dsn, entry in self._pools.items() if not entry.leases and dsn != keep]
+        for dsn in idle[:max(0, excess)]:
+            await self._close_pool(dsn)
+
+    async def _close_pool(self, dsn: str) -> None:
+        entry = self._pools.pop(dsn)
+        self.pools_evicted += 1
+        await entry.pool.close()
+
+    async def query(self, target: SQLTarget, sql: str, params: Optional[List[Any]] = None, max_rows: int = 100,
+                    timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Run `sql` read-only and return its first `max_rows` rows, with a cursor id if more remain"""
+        if timeout is not None and timeout <= 0:
+            # statement_timeout = 0 would disable the timeout altogether
+            raise ValueError(f"timeout_seconds must be positive, got {timeout}")
+        timeout = self.statement_timeout if timeout is None else min(timeout, self.statement_timeout)
+        dsn = await self._dsn(target)
+        return await self._query(dsn, sql, params or [], max_rows, timeout)
+
+    async def _query(self, dsn: str, sql: str, params: List[Any], max_rows: int, timeout: float) -> Dict[str, Any]:
+        entry = await self._pool(dsn)
+        if entry.leases >= self.max_size:
+            # Every connection is taken; free one held by an open cursor rather than wait out the timeout
+            await self._expire_oldest(dsn)
+        # Counted before acquiring, so the pool is not evicted while this call waits for a connection
+        entry.leases += 1
+        try:
+            connection = await entry.pool.acquire(timeout=timeout)
+        except BaseException as exc:
+            entry.leases -= 1
+            if isinstance(exc, Exception):
+                # The password may have been reset, the endpoint moved or the branch deleted since the URI
+                # was resolved, so resolve it again on the next query
+                self._forget(dsn)
+            raise
+        entry.queries += 1
+        self.queries += 1
+        transaction = connection.transaction(readonly=True)
+        try:
+            await transaction.start()
+            await connection.execute(f"SET LOCAL statement_timeout = {max(1, round(timeout * 1000))}")
+            statement = await connection.prepare(sql, timeout=timeout)
+            columns = [attribute.name for attribute in statement.get_attributes()]
+            if not columns:
+                raise ValueError("Only statements that return rows can be run, e.g. SELECT, WITH or EXPLAIN")
+            cursor = await statement.cursor(*params, timeout=timeout)
+            state = _OpenCursor(self._new_cursor_id(), dsn, connection, transaction, cursor, columns, timeout,
+                                self._clock())
+            rows = await self._read(state, max_rows)
+        except BaseException:
+            await self._release(entry, connection, transaction)
+            raise
+        if state.lookahead:
+            await self._keep(state)
+        else:
+            await self._release(entry, connection, transaction)
+        return self._result(state, rows)
+
+    def _forget(self, dsn: str) -> None:
+        for target in [target for target, resolved in self._dsns.items() if resolved == dsn]:
+            del self._dsns[target]
+
+    def _new_cursor_id(self) -> str:
+        # Unguessable, so one client cannot read another client's result
+        return f"sql-{self.instance}-{secrets.token_urlsafe(16)}"
+
+    def _cursor(self, cursor_id: str) -> _OpenCursor:
+        if not cursor_id.startswith(f"sql-{self.instance}-"):
+            raise ValueError(f"SQL cursor {cursor_id!r} was not opened by this server process; run the query again")
+        state = self._cursors.get(cursor_id)
+        if state is None:
+            raise ValueError(f"Unknown or expired SQL cursor {cursor_id!r}; run the query again")
+        return state
+
+    async def fetch(self, cursor_id: str, max_rows: int = 100) -> Dict[str, Any]:
+        """Continue reading an open cursor returned by query()"""
+        state = self._cursor(cursor_id)
+        async with state.lock:
+            if cursor_id not in self._cursors:
+                raise ValueError(f"SQL cursor {cursor_id!r} was closed while waiting; run the query again")
+            try:
+                rows = await self._read(state, max_rows)
+            except BaseException:
+                await self.close_cursor(cursor_id)
+                raise
+            state.last_used = self._clock()
+            if not state.lookahead:
+                await self.close_cursor(cursor_id)
+        return self._result(state, rows)
+
+    async def _read(self, state: _OpenCursor, max_rows: int) -> List[List[Any]]:
+        """Up to `max_rows` rows in chunks of `chunk_rows`, reading one more row ahead when the limit is hit"""
+        records = state.lookahead
+        state.lookahead = []
+        wanted = max(1, max_rows) + 1
+        while len(records) < wanted:
+            size = min(self.chunk_rows, wanted - len(records))
+            chunk = await asyncio.wait_for(state.cursor.fetch(size, timeout=state.timeout),
+                                           state.timeout + CLIENT_TIMEOUT_MARGIN)
+            records.extend(chunk)
+            if len(chunk) < size:
+                break
+        if len(records) == wanted:
+            state.lookahead = [records.pop()]
+        state.rows_returned += len(records)
+        self.rows += len(records)
+        return [[jsonable(value) for value in record] for record in records]
+
+    def _result(self, state: _OpenCursor, rows: List[List[Any]]) -> Dict[str, Any]:
+        return {
+            "columns": state.columns,
+            "rows": rows,
+            "row_count": len(rows),
+            "rows_returned": state.rows_returned,
+            "cursor": state.id if state.lookahead else None,
+        }
+
+    async def _keep(self, state: _OpenCursor) -> None:
+        while len(self._cursors) >= self.max_cursors:
+            oldest = next(iter(self._cursors))
+            self.cursors_expired += 1
+            await self.close_cursor(oldest)
+        # Cursors hold their connections, so leave one free in the pool for new queries
+        per_pool = max(1, self.max_size - 1)
+        while sum(open_cursor.dsn == state.dsn for open_cursor in self._cursors.values()) >= per_pool:
+            if not await self._expire_oldest(state.dsn):
+                break
+        self._cursors[state.id] = state
+
+    async def _expire_oldest(self, dsn: str) -> bool:
+        """Close the oldest cursor on `dsn` that is not being read; False when there is none"""
+        for cursor_id, open_cursor in self._cursors.items():
+            if open_cursor.dsn == dsn and not open_cursor.lock.locked():
+                self.cursors_expired += 1
+                await self.close_cursor(cursor_id)
+                return True
+        return False
+
+    async def close_cursor(self, cursor_id: str) -> bool:
+        state = self._cursors.pop(cursor_id, None)
+        if state is None:
+            return False
+        entry = self._pools.get(state.dsn)
+        if entry is not None:
+            await self._release(entry, state.connection, state.transaction)
+        else:
+            await state.connection.close()
+        return True
+
+    async def _release(self, entry: _Pool, connection: Any, transaction: Any) -> None:
+        """End the read-only transaction and give the connection back to its pool"""
+        entry.leases -= 1
+        entry.last_used = self._clock()
+        try:
+            if not connection.is_closed() and connection.is_in_transaction():
+                await transaction.rollback()
+        finally:
+            await entry.pool.release(connection)
+
+    async def evict_idle(self) -> int:
+        """Close cursors and pools idle for longer than their limits; returns how many were closed"""
+        now = self._clock()
+        closed = 0
+        for cursor_id in [cursor_id for cursor_id, state in self._cursors.items()
+                          if now - state.last_used > self.cursor_idle_seconds and not state.lock.locked()]:
+            self.cursors_expired += 1
+            closed += await self.close_cursor(cursor_id)
+        for dsn in [dsn for dsn, entry in self._pools.items()
+                    if not entry.leases and now - entry.last_used > self.idle_seconds]:
+            await self._close_pool(dsn)
+            closed += 1
+        return closed
+
+    def _start_reaper(self) -> None:
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap_periodically())
+
+    async def _reap_periodically(self) -> None:
+        interval = max(1.0, min(self.idle_seconds, self.cursor_idle_seconds) / 4)
+        while self._pools:
+            await asyncio.sleep(interval)
+            await self.evict_idle()
+
+    async def aclose(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        for cursor_id in list(self._cursors):
+            await self.close_cursor(cursor_id)
+        for dsn in list(self._pools):
+            await self._close_pool(dsn)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pools": len(self._pools),
+            "pools_created": self.pools_created,
+            "pools_evicted": self.pools_evicted,
+            "connections_in_use": sum(entry.leases for entry in self._pools.values()),
+            "open_cursors": len(self._cursors),
+            "cursors_expired": self.cursors_expired,
+            "queries": self.queries,
+            "rows": self.rows,
+            "max_pool_size": self.max_size,
+            "max_pools": self.max_pools,
+            "statement_timeout": self.statement_timeout,
+        }
@@ -0,0 +1,154 @@
+"""
+Startup time measurement for the MCP server.
+
+Each run starts a fresh interpreter with `-X importtime`, imports the server
+module and then times the remaining startup phases (client construction,
+snapshot restore, tool listing). The report breaks import time down by the
+server's direct imports and by top-level package, so regressions show up as
+a changed row rather than just a slower total.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+# Runs in the child interpreter. Nothing but `time` is imported before the server
+# module, so every module the server pulls in is attributed to it.
+_PROBE = """
+import time
+started = time.perf_counter()
+import {module} as server
+imported = time.perf_counter()
+import asyncio, json, os
+os.environ.setdefault("NEON_API_KEY", "startup-probe")
+client = server.get_neon_client()
+constructed = time.perf_counter()
+asyncio.run(client.restore_snapshot())
+restored = time.perf_counter()
+tools = asyncio.run(server.mcp.get_tools())
+listed = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "client_ms": (constructed - imported) * 1000,
+    "snapshot_ms": (restored - constructed) * 1000,
+    "list_tools_ms": (listed - restored) * 1000,
+    "tools": len(tools),
+}}))
+"""
+
+ImportRecord = Tuple[str, int, float, float]
+
+def parse_importtime(stderr: str) -> List[ImportRecord]:
+    """(module, depth, self_ms, cumulative_ms) for each `-X importtime` line, in output order"""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        records.append((name.strip(), depth, int(fields[0]) / 1000, int(fields[1]) / 1000))
+    return records
+
+def direct_imports(records: List[ImportRecord], module: str) -> List[Dict[str, Any]]:
+    """Modules first imported directly by `module`, with their cumulative import time"""
+    # importtime prints children before their parent, so they are the depth-1 lines
+    # between the previous top-level import and `module`'s own line
+    children: List[ImportRecord] = []
+    for record in records:
+        name, depth = record[0], record[1]
+        if depth == 0:
+            if name == module:
+                break
+            children = []
+        elif depth == 1:
+            children.append(record)
+    return [{"module": name, "cumulative_ms": round(cumulative, 2)}
+            for name, _, _, cumulative in sorted(children, key=lambda record: -record[3])]
+
+def by_package(records: List[ImportRecord]) -> List[Dict[str, Any]]:
+    """Self import time summed per top-level package"""
+    totals: Dict[str, List[float]] = {}
+    for name, _, self_ms, _ in records:
+        package = totals.setdefault(name.split(".")[0], [0.0, 0])
+        package[0] += self_ms
+        package[1] += 1
+    return [{"package": package, "self_ms": round(self_ms, 2), "modules": count}
+            for package, (self_ms, count) in sorted(totals.items(), key=lambda item: -item[1][0])]
+
+def _run_probe(module: str, env: Dict[str, str]) -> Tuple[Dict[str, Any], List[ImportRecord], float]:
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module)],
+                               capture_output=True, text=True, env=env, check=False)
+    wall_ms = (time.perf_counter() - started) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(f"startup probe failed:\n{completed.stderr[-2000:]}")
+    phases = json.loads(completed.stdout.strip().splitlines()[-1])
+    return phases, parse_importtime(completed.stderr), wall_ms
+
+def measure_startup(module: str = "neonorgdb", runs: int = 3, top: int = 15) -> Dict[str, Any]:
+    """
+    Time `runs` cold starts of `module` and report the median of each phase.
+
+    The import breakdown comes from the fastest run, which is the least
+    disturbed by the rest of the machine.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)),
+                                                      env.get("PYTHONPATH")]))
+    # Measure construction cost, not the network or a background server
+    env.pop("NEON_METRICS_PORT", None)
+    samples = [_run_probe(module, env) for _ in range(max(1, runs))]
+
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    interpreter_ms = (time.perf_counter() - started) * 1000
+
+    fastest = min(samples, key=lambda sample: sample[0]["import_ms"])[1]
+    phases = {key: round(statistics.median(sample[0][key] for sample in samples), 2)
+              for key in ("import_ms", "client_ms", "snapshot_ms", "list_tools_ms")}
+    own = next((record for record in fastest if record[0] == module), None)
+    return {
+        "module": module,
+        "python": sys.version.split()[0],
+        "runs": len(samples),
+        "interpreter_ms": round(interpreter_ms, 2),
+        "total_ms": round(statistics.median(sample[2] for sample in samples), 2),
+        "phases": phases,
+        # The module body itself: constants, the FastMCP instance and tool registration
+        "module_body_ms": round(own[2], 2) if own else None,
+        "tools": samples[0][0]["tools"],
+        "direct_imports": direct_imports(fastest, module)[:top],
+        "packages": by_package(fastest)[:top],
+    }
+
+def _table(rows: List[Dict[str, Any]], columns: List[str]) -> List[str]:
+    widths = {col: max([len(col), *(len(str(row[col])) for row in rows)]) for col in columns}
+    lines = ["  ".join(col.ljust(widths[col]) for col in columns),
+             "  ".join("-" * widths[col] for col in columns)]
+    lines.extend("  ".join(str(row[col]).ljust(widths[col]) for col in columns) for row in rows)
+    return lines
+
+def format_report(report: Dict[str, Any]) -> str:
+    phases = report["phases"]
+    lines = [
+        f"{report['module']} startup on Python {report['python']} (median of {report['runs']} runs)",
+        f"  process total    {report['total_ms']:8.1f} ms (bare interpreter {report['interpreter_ms']:.1f} ms)",
+        f"  import           {phases['import_ms']:8.1f} ms (module body {report['module_body_ms']} ms)",
+        f"  client           {phases['client_ms']:8.1f} ms",
+        f"  snapshot restore {phases['snapshot_ms']:8.1f} ms",
+        f"  list tools       {phases['list_tools_ms']:8.1f} ms ({report['tools']} tools)",
+        "",
+        "Direct imports (cumulative):",
+        *_table(report["direct_imports"], ["module", "cumulative_ms"]),
+        "",
+        "Packages (self time):",
+        *_table(report["packages"], ["package", "self_ms", "modules"]),
+    ]
+    return "\n".join(lines)
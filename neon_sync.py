@@ -0,0 +1,304 @@
+"""
+Incremental organization state sync driven by the Neon operations feed.
+
+OrgSync keeps a local model of projects, branches and endpoints. Each pass
+re-lists projects with conditional requests, then tails the operations feed
+only for projects that are due: those whose `updated_at` moved, or whose
+adaptive poll interval has elapsed. Only the branch/endpoint listings that
+an operation touched are refreshed, so steady-state cost follows the rate of
+change rather than the size of the organization. Projects, branches and
+endpoints are held as compact records (see neon_records).
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from neon_records import BranchRecord, EndpointRecord, ProjectRecord, index_records, payloads
+from neon_scheduler import bulk_priority
+
+TERMINAL_STATUSES = {"finished", "failed", "error", "cancelled", "skipped"}
+# Operations that never change branch or endpoint listings
+NOOP_ACTIONS = {"check_availability"}
+# Compute lifecycle operations only change endpoint state
+COMPUTE_ACTIONS = {"start_compute", "suspend_compute"}
+
+@dataclass
+class ProjectSyncState:
+    project_id: str
+    updated_at: Optional[str] = None
+    branches: Dict[str, BranchRecord] = field(default_factory=dict)
+    endpoints: Dict[str, EndpointRecord] = field(default_factory=dict)
+    # Recently seen operation ids -> status, newest last (the saved feed cursor)
+    seen_operations: "OrderedDict[str, str]" = field(default_factory=OrderedDict)
+    interval: float = 0.0
+    next_poll_at: float = 0.0
+    last_polled_at: Optional[float] = None
+    last_change_at: Optional[float] = None
+
+    def remember(self, operation: Dict[str, Any], limit: int) -> None:
+        self.seen_operations[operation["id"]] = operation.get("status", "")
+        self.seen_operations.move_to_end(operation["id"])
+        while len(self.seen_operations) > limit:
+            self.seen_operations.popitem(last=False)
+
+class OrgSync:
+    """Local org model kept current by tailing each project's operations feed"""
+
+    def __init__(self, client: Any, min_interval: float = 15.0, max_interval: float = 600.0,
+                 max_concurrency: int = 8, page_size: int = 20, max_scan: int = 500,
+                 seen_limit: int = 200, clock: Callable[[], float] = time.monotonic):
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.page_size = page_size
+        self.max_scan = max_scan
+        self.seen_limit = seen_limit
+        self._clock = clock
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._listing_versions: Optional[Tuple[str, ...]] = None
+        self.projects: Dict[str, ProjectRecord] = {}
+        self.states: Dict[str, ProjectSyncState] = {}
+        self.last_sync_at: Optional[float] = None
+        self.counters = {
+            "syncs": 0,
+            "listing_unchanged": 0,
+            "bootstraps": 0,
+            "project_polls": 0,
+            "polls_skipped": 0,
+            "operations_applied": 0,
+            "branch_refreshes": 0,
+            "endpoint_refreshes": 0,
+            "full_resyncs": 0,
+            "errors": 0,
+        }
+
+    @property
+    def synced(self) -> bool:
+        return self.last_sync_at is not None
+
+    async def sync(self, full: bool = False) -> Dict[str, Any]:
+        """Run one sync pass; `full` polls every project regardless of its interval"""
+        async with self._lock:
+            with bulk_priority():
+                return await self._sync(full)
+
+    async def _sync(self, full: bool) -> Dict[str, Any]:
+        now = self._clock()
+        summary = {"added": 0, "removed": 0, "polled": 0, "skipped": 0, "operations_applied": 0, "errors": 0}
+
+        listing_changed, projects = await self._list_projects()
+        if listing_changed:
+            current = index_records(ProjectRecord, projects)
+            for project_id in set(self.states) - set(current):
+                del self.states[project_id]
+                summary["removed"] += 1
+            for project_id, project in current.items():
+                state = self.states.get(project_id)
+                if state is not None and project.get("updated_at") != state.updated_at:
+                    state.updated_at = project.get("updated_at")
+                    state.next_poll_at = now
+            self.projects = current
+            # The catalog indexes the same listing, so keep it current for free
+            self.client.catalog.load(current.values())
+        else:
+            self.counters["listing_unchanged"] += 1
+
+        new_ids = [project_id for project_id in self.projects if project_id not in self.states]
+        due = [state for state in self.states.values() if full or state.next_poll_at <= now]
+        summary["skipped"] = len(self.states) - len(due)
+        self.counters["polls_skipped"] += summary["skipped"]
+
+        results = await asyncio.gather(
+            *(self._guarded(self._bootstrap(project_id)) for project_id in new_ids),
+            *(self._guarded(self._poll(state)) for state in due),
+        )
+        summary["added"] = len(new_ids)
+        summary["polled"] = len(due)
+        summary["operations_applied"] = sum(result for result in results if result > 0)
+        summary["errors"] = sum(1 for result in results if result < 0)
+
+        self.counters["syncs"] += 1
+        self.last_sync_at = time.time()
+        summary["projects"] = len(self.states)
+        return summary
+
+    async def _guarded(self, job: Any) -> int:
+        async with self._semaphore:
+            try:
+                return await job
+            except httpx.HTTPError:
+                self.counters["errors"] += 1
+                return -1
+
+    async def _list_projects(self) -> Tuple[bool, List[Dict[str, Any]]]:
+        """Re-list projects page by page; unchanged page versions mean an unchanged listing"""
+        projects: List[Dict[str, Any]] = []
+        versions: List[str] = []
+        cursor: Optional[str] = None
+        while True:
+            params: Dict[str, Any] = {"limit": 100}
+            if cursor:
+                params["cursor"] = cursor
+            page, version = await self.client.get_versioned("/projects", params=params, refresh=True)
+            versions.append(version)
+            items = page.get("projects", [])
+            projects.extend(items)
+            previous, cursor = cursor, page.get("pagination", {}).get("cursor")
+            if not cursor or cursor == previous or len(items) < 100:
+                break
+        changed = tuple(versions) != self._listing_versions
+        self._listing_versions = tuple(versions)
+        return changed, projects
+
+    async def _bootstrap(self, project_id: str) -> int:
+        """Take a full snapshot of a newly seen project and start its feed cursor"""
+        branches, endpoints, operations = await asyncio.gather(
+            self.client.get_branches(project_id, refresh=True),
+            self.client.get_endpoints(project_id, refresh=True),
+            self.client.get_operations(project_id, limit=self.page_size, refresh=True),
+        )
+        now = self._clock()
+        state = ProjectSyncState(
+            project_id=project_id,
+            updated_at=self.projects[project_id].get("updated_at") if project_id in self.projects else None,
+            branches=index_records(BranchRecord, branches.get("branches", [])),
+            endpoints=index_records(EndpointRecord, endpoints.get("endpoints", [])),
+            interval=self.min_interval,
+            next_poll_at=now + self.min_interval,
+            last_polled_at=now,
+        )
+        for operation in reversed(operations.get("operations", [])):
+            state.remember(operation, self.seen_limit)
+        self.states[project_id] = state
+        self.counters["bootstraps"] += 1
+        return 0
+
+    async def _poll(self, state: ProjectSyncState) -> int:
+        """Tail the project's operations feed back to the saved cursor and apply changes"""
+        project_id = state.project_id
+        self.counters["project_polls"] += 1
+        pending = {op_id for op_id, status in state.seen_operations.items() if status not in TERMINAL_STATUSES}
+        changed: List[Dict[str, Any]] = []
+        scanned = 0
+        caught_up = False
+        feed = self.client.iter_operations(project_id, page_size=self.page_size, max_items=self.max_scan,
+                                           refresh=True)
+        async with aclosing(feed) as operations:
+            async for operation in operations:
+                scanned += 1
+                known = state.seen_operations.get(operation["id"])
+                if known != operation.get("status"):
+                    changed.append(operation)
+                pending.discard(operation["id"])
+                if known is not None and known in TERMINAL_STATUSES and not pending:
+                    caught_up = True
+                    break
+            else:
+                caught_up = scanned < self.max_scan
+
+        now = self._clock()
+        state.last_polled_at = now
+        for operation in reversed(changed):
+            state.remember(operation, self.seen_limit)
+
+        effective = [op for op in changed if op.get("action") not in NOOP_ACTIONS]
+        if not caught_up:
+            # Fell too far behind the feed to know what changed: resnapshot the project
+            self.counters["full_resyncs"] += 1
+            await self._refresh(state, branches=True, endpoints=True, branch_ids=set(state.branches))
+        elif effective:
+            branch_ids = {op["branch_id"] for op in effective if op.get("branch_id")}
+            await self._refresh(
+                state,
+                branches=any(op.get("branch_id") and op.get("action") not in COMPUTE_ACTIONS for op in effective),
+                endpoints=any(op.get("endpoint_id") for op in effective),
+                branch_ids=branch_ids,
+            )
+
+        if effective or not caught_up:
+            state.interval = self.min_interval
+            state.last_change_at = now
+        else:
+            state.interval = min(self.max_interval, max(self.min_interval, state.interval * 2))
+        state.next_poll_at = now + state.interval
+        self.counters["operations_applied"] += len(effective)
+        return len(effective)
+
+    async def _refresh(self, state: ProjectSyncState, branches: bool, endpoints: bool,
+                       branch_ids: Any) -> None:
+        project_id = state.project_id
+        # Stale rather than dropped, so the next read revalidates with its validators
+        self.client.expire_cached(f"/projects/{project_id}", recursive=False)
+        for branch_id in branch_ids:
+            self.client.expire_cached(f"/projects/{project_id}/branches/{branch_id}")
+        jobs = []
+        if branches:
+            jobs.append(self._refresh_branches(state))
+        if endpoints:
+            jobs.append(self._refresh_endpoints(state))
+        await asyncio.gather(*jobs)
+
+    async def _refresh_branches(self, state: ProjectSyncState) -> None:
+        result = await self.client.get_branches(state.project_id, refresh=True)
+        state.branches = index_records(BranchRecord, result.get("branches", []))
+        self.counters["branch_refreshes"] += 1
+
+    async def _refresh_endpoints(self, state: ProjectSyncState) -> None:
+        result = await self.client.get_endpoints(state.project_id, refresh=True)
+        state.endpoints = index_records(EndpointRecord, result.get("endpoints", []))
+        self.counters["endpoint_refreshes"] += 1
+
+    def start(self, interval: float) -> None:
+        """Run sync passes in the background every `interval` seconds"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_periodically(interval))
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run_periodically(self, interval: float) -> None:
+        while True:
+            try:
+                await self.sync()
+            except httpx.HTTPError:
+                self.counters["errors"] += 1
+            await asyncio.sleep(interval)
+
+    def snapshot(self, project_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Projects from the local model with their branches and endpoints nested"""
+        ids = [project_id] if project_id is not None else list(self.projects)
+        tree = []
+        for pid in ids:
+            state = self.states.get(pid)
+            if state is None:
+                continue
+            project = self.projects.get(pid)
+            tree.append({
+                **(project.payload() if project is not None else {"id": pid}),
+                "branches": payloads(state.branches.values()),
+                "endpoints": payloads(state.endpoints.values()),
+            })
+        return tree
+
+    def stats(self) -> Dict[str, Any]:
+        now = self._clock()
+        due = sum(1 for state in self.states.values() if state.next_poll_at <= now)
+        return {
+            "projects": len(self.states),
+            "due_now": due,
+            "last_sync_at": self.last_sync_at,
+            "background": self._task is not None and not self._task.done(),
+            "min_interval": self.min_interval,
+            "max_interval": self.max_interval,
+            **self.counters,
+        }
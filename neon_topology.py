@@ -0,0 +1,179 @@
+"""
+Branch topology of every project in the locally synced organization model.
+
+Neon branches form one tree per project through `parent_id`. TopologyIndex
+keeps a ProjectTopology per project, built from the branch and endpoint
+listings OrgSync holds, and rebuilds a project only after a sync pass has
+replaced one of those listings. Ancestry, descendant and cleanup queries
+("branches older than X", "leaves without an active endpoint") then run in
+process across every project without calling the API.
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Endpoint states that count as in use; "init" is a compute that is starting up
+ACTIVE_ENDPOINT_STATES = {"active", "init"}
+
+_AGE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([mhdw])\s*$")
+_AGE_UNITS = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+def parse_timestamp(value: str) -> datetime:
+    """Aware datetime for an ISO 8601 date or timestamp; naive values are taken as UTC"""
+    parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+def parse_cutoff(value: str, now: Optional[datetime] = None) -> datetime:
+    """Cutoff for an "older than" filter: an age such as "30d", "12h" or "2w", or an ISO 8601 date or timestamp"""
+    match = _AGE.match(value)
+    if match:
+        now = now or datetime.now(timezone.utc)
+        return now - timedelta(**{_AGE_UNITS[match.group(2)]: float(match.group(1))})
+    try:
+        return parse_timestamp(value)
+    except ValueError:
+        raise ValueError(f"Invalid age or timestamp {value!r}; expected e.g. \"30d\", \"12h\" or \"2024-06-01\"") from None
+
+class ProjectTopology:
+    """Branch tree of one project, indexed by parent_id, with each branch's endpoints"""
+
+    def __init__(self, project_id: str, branches: Dict[str, Dict[str, Any]], endpoints: Dict[str, Dict[str, Any]]):
+        self.project_id = project_id
+        self.branches = branches
+        # parent id -> child ids, oldest first; branches whose parent is gone hang off None as roots
+        self.children: Dict[Optional[str], List[str]] = {}
+        for branch_id, branch in branches.items():
+            parent_id = branch.get("parent_id")
+            self.children.setdefault(parent_id if parent_id in branches else None, []).append(branch_id)
+        for child_ids in self.children.values():
+            child_ids.sort(key=lambda branch_id: (branches[branch_id].get("created_at") or "", branch_id))
+        self.default_branch_id = next(
+            (branch_id for branch_id, branch in branches.items() if branch.get("default")),
+            next((branch_id for branch_id, branch in branches.items() if branch.get("primary")), None))
+        self.endpoints: Dict[str, List[Dict[str, Any]]] = {}
+        for endpoint in endpoints.values():
+            if endpoint.get("branch_id") in branches:
+                self.endpoints.setdefault(endpoint["branch_id"], []).append(endpoint)
+
+    def __contains__(self, branch_id: str) -> bool:
+        return branch_id in self.branches
+
+    def parent(self, branch_id: str) -> Optional[str]:
+        parent_id = self.branches[branch_id].get("parent_id")
+        return parent_id if parent_id in self.branches else None
+
+    def ancestors(self, branch_id: str) -> List[str]:
+        """Parent, grandparent, ... up to the root"""
+        chain: List[str] = []
+        parent_id = self.parent(branch_id)
+        while parent_id is not None and parent_id != branch_id and parent_id not in chain:
+            chain.append(parent_id)
+            parent_id = self.parent(parent_id)
+        return chain
+
+    def descendants(self, branch_id: Optional[str] = None, max_depth: Optional[int] = None) -> List[Tuple[str, int]]:
+        """(branch id, depth below `branch_id`) in tree order; the whole project from its roots when None"""
+        found: List[Tuple[str, int]] = []
+        # Roots are depth 0 of a whole-project walk; children are depth 1 below a branch
+        first = 0 if branch_id is None else 1
+        stack = [(child_id, first) for child_id in reversed(self.children.get(branch_id, []))]
+        seen = {branch_id}
+        while stack:
+            child_id, depth = stack.pop()
+            if child_id in seen:
+                continue
+            seen.add(child_id)
+            found.append((child_id, depth))
+            if max_depth is None or depth < max_depth:
+                stack.extend((grandchild_id, depth + 1) for grandchild_id in reversed(self.children.get(child_id, [])))
+        return found
+
+    def is_leaf(self, branch_id: str) -> bool:
+        return not self.children.get(branch_id)
+
+    def has_active_endpoint(self, branch_id: str) -> bool:
+        return any(endpoint.get("current_state") in ACTIVE_ENDPOINT_STATES
+                   for endpoint in self.endpoints.get(branch_id, []))
+
+    def describe(self, branch_id: str) -> Dict[str, Any]:
+        """Compact record of a branch and its place in the tree"""
+        branch = self.branches[branch_id]
+        return {
+            "id": branch_id,
+            "project_id": self.project_id,
+            "name": branch.get("name"),
+            "parent_id": branch.get("parent_id"),
+            "created_at": branch.get("created_at"),
+            "updated_at": branch.get("updated_at"),
+            "default": branch_id == self.default_branch_id,
+            "protected": bool(branch.get("protected")),
+            "children": len(self.children.get(branch_id, [])),
+            "endpoints": [{"id": endpoint.get("id"), "type": endpoint.get("type"),
+                           "current_state": endpoint.get("current_state")}
+                          for endpoint in self.endpoints.get(branch_id, [])],
+        }
+
+class TopologyIndex:
+    """ProjectTopology per synced project, rebuilt only when OrgSync replaced its listings"""
+
+    def __init__(self, sync: Any):
+        self.sync = sync
+        # project id -> (branch listing, endpoint listing, topology built from them)
+        self._topologies: Dict[str, Tuple[Dict[str, Any], Dict[str, Any], ProjectTopology]] = {}
+        self.builds = 0
+        # Projects the last find() call searched, skipping ids that are not synced
+        self.last_searched = 0
+
+    def project(self, project_id: str) -> Optional[ProjectTopology]:
+        state = self.sync.states.get(project_id)
+        if state is None:
+            self._topologies.pop(project_id, None)
+            return None
+        cached = self._topologies.get(project_id)
+        # Sync passes replace listings rather than mutating them, so identity means unchanged
+        if cached is not None and cached[0] is state.branches and cached[1] is state.endpoints:
+            return cached[2]
+        topology = ProjectTopology(project_id, state.branches, state.endpoints)
+        self._topologies[project_id] = (state.branches, state.endpoints, topology)
+        self.builds += 1
+        return topology
+
+    def projects(self, project_ids: Optional[Iterable[str]] = None) -> Iterator[ProjectTopology]:
+        for project_id in [project_id for project_id in self._topologies if project_id not in self.sync.states]:
+            del self._topologies[project_id]
+        for project_id in list(self.sync.states if project_ids is None else project_ids):
+            topology = self.project(project_id)
+            if topology is not None:
+                yield topology
+
+    def find(self, older_than: Optional[datetime] = None, leaves_only: bool = False,
+             without_active_endpoint: bool = False, include_default: bool = False,
+             project_ids: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Branches across projects matching every given filter, oldest first"""
+        matches = []
+        searched = 0
+        for topology in self.projects(project_ids):
+            searched += 1
+            for branch_id, branch in topology.branches.items():
+                if not include_default and branch_id == topology.default_branch_id:
+                    continue
+                if leaves_only and not topology.is_leaf(branch_id):
+                    continue
+                if without_active_endpoint and topology.has_active_endpoint(branch_id):
+                    continue
+                if older_than is not None:
+                    created_at = branch.get("created_at")
+                    if not created_at or parse_timestamp(created_at) >= older_than:
+                        continue
+                matches.append(topology.describe(branch_id))
+        matches.sort(key=lambda branch: (branch["created_at"] or "", branch["id"]))
+        self.last_searched = searched
+        return matches
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "projects": len(self._topologies),
+            "branches": sum(len(topology.branches) for _, _, topology in self._topologies.values()),
+            "builds": self.builds,
+        }
@@ -0,0 +1,233 @@
+"""
+Wait for Neon operations to reach a terminal state, with one poller per project.
+
+Waiters register the operation ids they need. A ProjectWatcher polls the
+project's operations feed, falling back to per-operation GETs for ids that
+are no longer on its first page, at an interval that starts short and backs
+off while nothing changes. All waiters on a project share that poll stream,
+and the watcher stops as soon as its last waiter is gone.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+import httpx
+
+from neon_scheduler import bulk_priority
+from neon_sync import NOOP_ACTIONS, TERMINAL_STATUSES
+
+# Reported for operation ids the API does not know; final like a terminal status
+NOT_FOUND = "not_found"
+FINAL_STATUSES = TERMINAL_STATUSES | {NOT_FOUND}
+
+@dataclass
+class _Waiter:
+    operation_ids: Set[str]
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    # Set when the poll loop fails with an error that retrying will not fix
+    error: Optional[BaseException] = None
+
+class ProjectWatcher:
+    """Shared poll loop for every waiter on one project"""
+
+    def __init__(self, client: Any, project_id: str, min_interval: float = 1.0, max_interval: float = 15.0,
+                 page_size: int = 20, clock: Callable[[], float] = time.monotonic):
+        self.client = client
+        self.project_id = project_id
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.page_size = page_size
+        self._clock = clock
+        self.interval = min_interval
+        # Latest known state of every operation a waiter has asked about
+        self.operations: Dict[str, Dict[str, Any]] = {}
+        self._waiters: List[_Waiter] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._last_poll_at: Optional[float] = None
+        self.polls = 0
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _pending(self) -> Set[str]:
+        return {op_id for waiter in self._waiters for op_id in waiter.operation_ids
+                if self.operations.get(op_id, {}).get("status") not in FINAL_STATUSES}
+
+    def _notify(self) -> None:
+        for waiter in self._waiters:
+            if all(self.operations.get(op_id, {}).get("status") in FINAL_STATUSES for op_id in waiter.operation_ids):
+                waiter.done.set()
+
+    async def wait(self, operation_ids: Sequence[str], timeout: float) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Block until every id is final or `timeout` seconds pass; returns the latest state per id"""
+        waiter = _Waiter(set(operation_ids))
+        self._waiters.append(waiter)
+        try:
+            self._notify()
+            if not waiter.done.is_set():
+                # New ids are polled promptly rather than at the backed-off interval
+                self._wakeup.set()
+                if self._task is None or self._task.done():
+                    with bulk_priority():
+                        self._task = asyncio.create_task(self._run())
+                try:
+                    await asyncio.wait_for(waiter.done.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._waiters.remove(waiter)
+        if waiter.error is not None:
+            raise waiter.error
+        return {op_id: self.operations.get(op_id) for op_id in operation_ids}
+
+    async def _run(self) -> None:
+        while self._pending():
+            await self._sleep()
+            pending = self._pending()
+            if not pending:
+                break
+            try:
+                changed = await self._poll(pending)
+            except httpx.HTTPError:
+                self.errors += 1
+                changed = False
+            except Exception as exc:
+                # Handed to the waiters rather than lost with the task, which they would only notice at their timeout
+                self.errors += 1
+                self._fail(exc)
+                return
+            self._notify()
+            self.interval = self.min_interval if changed else min(self.max_interval, self.interval * 1.5)
+
+    def _fail(self, error: BaseException) -> None:
+        for waiter in self._waiters:
+            waiter.error = error
+            waiter.done.set()
+
+    async def _sleep(self) -> None:
+        """Wait out the poll interval, waking early for new waiters but never polling faster than min_interval"""
+        if self._last_poll_at is not None:
+            remaining = self._last_poll_at + self.interval - self._clock()
+            if remaining > 0 and not self._wakeup.is_set():
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            floor = self._last_poll_at + self.min_interval - self._clock()
+            if floor > 0:
+                await asyncio.sleep(floor)
+        self._wakeup.clear()
+
+    async def _poll(self, pending: Set[str]) -> bool:
+        """One feed page for every pending id at once, then single GETs for ids not on it"""
+        self.polls += 1
+        self._last_poll_at = self._clock()
+        page = await self.client.get_operations(self.project_id, limit=self.page_size, refresh=True)
+        self.requests += 1
+        changed = False
+        for operation in page.get("operations", []):
+            if operation.get("id") in pending:
+                pending.discard(operation["id"])
+                changed |= self._update(operation)
+        if pending:
+            results = await asyncio.gather(*(self._fetch_one(op_id) for op_id in pending))
+            changed |= any(results)
+        return changed
+
+    async def _fetch_one(self, operation_id: str) -> bool:
+        self.requests += 1
+        try:
+            result = await self.client.get_operation(self.project_id, operation_id, refresh=True)
+        except httpx.HTTPStatusError as exc:
+            if exc.response.status_code != 404:
+                raise
+            return self._update({"id": operation_id, "project_id": self.project_id, "status": NOT_FOUND})
+        return self._update(result.get("operation", {"id": operation_id}))
+
+    def _update(self, operation: Dict[str, Any]) -> bool:
+        previous = self.operations.get(operation["id"])
+        self.operations[operation["id"]] = operation
+        status = operation.get("status")
+        if previous is not None and previous.get("status") == status:
+            return False
+        if status in TERMINAL_STATUSES and operation.get("action") not in NOOP_ACTIONS:
+            self._expire_cached(operation)
+        return True
+
+    def _expire_cached(self, operation: Dict[str, Any]) -> None:
+        """A finished operation may have changed listings the response cache still holds"""
+        base = f"/projects/{self.project_id}"
+        for path in (base, f"{base}/branches", f"{base}/endpoints"):
+            self.client.expire_cached(path, recursive=False)
+        if operation.get("branch_id"):
+            self.client.expire_cached(f"{base}/branches/{operation['branch_id']}")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "waiters": len(self._waiters),
+            "pending": len(self._pending()),
+            "interval": round(self.interval, 3),
+            "polls": self.polls,
+            "requests": self.requests,
+            "errors": self.errors,
+        }
+
+class OperationWatchers:
+    """One ProjectWatcher per project with waiters, created on demand and dropped when idle"""
+
+    def __init__(self, client: Any, min_interval: float = 1.0, max_interval: float = 15.0, page_size: int = 20):
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.page_size = page_size
+        self.watchers: Dict[str, ProjectWatcher] = {}
+        self.waits = 0
+        self.shared_waits = 0
+        # Totals from watchers that have already been dropped
+        self.polls = 0
+        self.requests = 0
+
+    async def wait(self, project_id: str, operation_ids: Sequence[str],
+                   timeout: float) -> Dict[str, Optional[Dict[str, Any]]]:
+        watcher = self.watchers.get(project_id)
+        if watcher is None:
+            watcher = self.watchers[project_id] = ProjectWatcher(
+                self.client, project_id, self.min_interval, self.max_interval, self.page_size)
+        elif watcher.waiting:
+            self.shared_waits += 1
+        self.waits += 1
+        try:
+            return await watcher.wait(operation_ids, timeout)
+        finally:
+            if not watcher.waiting and self.watchers.get(project_id) is watcher:
+                watcher.stop()
+                del self.watchers[project_id]
+                self.polls += watcher.polls
+                self.requests += watcher.requests
+
+    def stop(self) -> None:
+        for watcher in self.watchers.values():
+            watcher.stop()
+        self.watchers.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "waits": self.waits,
+            "shared_waits": self.shared_waits,
+            "polls": self.polls + sum(watcher.polls for watcher in self.watchers.values()),
+            "requests": self.requests + sum(watcher.requests for watcher in self.watchers.values()),
+            "min_interval": self.min_interval,
+            "max_interval": self.max_interval,
+            "projects": {project_id: watcher.stats() for project_id, watcher in self.watchers.items()},
+        }
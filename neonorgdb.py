@@ -1,80 +1,657 @@
-from typing import Any, Dict, List, Optional
+from contextlib import aclosing, asynccontextmanager
+from dataclasses import replace
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+import asyncio
+import importlib.util
 import httpx
 from fastmcp import FastMCP
+from fastmcp.tools.tool import default_serializer
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
 import os
 import json
+import time
 
-# Initialize FastMCP server
-mcp = FastMCP("neonorgdb",host="localhost", port=8000, debug=True)
+from neon_analytics import ConsumptionStore, day_timestamp, default_range
+from neon_batch import BatchRunner
+from neon_breaker import CLOSED, BreakerBoard, CircuitBreaker, timeouts_from_env
+from neon_cache import (CacheEntry, ResponseCache, SingleFlight, content_digest, endpoint_class, make_cache_key,
+                        ttls_from_env)
+from neon_catalog import ProjectCatalog
+from neon_inventory import INVENTORY_RESOURCES, InventoryCrawler, select_projects
+from neon_json import JSONCodec, iter_page
+from neon_metrics import MetricsRegistry, logger, route_template, serve_metrics
+from neon_orgs import (ALL_ORGS, across_orgs, default_org, interleave, org_override, org_snapshot_path, org_summary,
+                       orgs_from_env, tag_org)
+from neon_prefetch import Prefetcher, parse_rules
+from neon_projection import shape
+from neon_scheduler import RequestScheduler, backoff_delay, bulk_priority, parse_retry_after
+from neon_shared import SharedCache
+from neon_sql import SQLPools, SQLTarget
+from neon_snapshot import SnapshotStore, cache_key_from_record, key_fingerprint
+from neon_sync import OrgSync
+from neon_topology import TopologyIndex, parse_cutoff
+from neon_watch import FINAL_STATUSES, OperationWatchers
 
 # Constants
-NEON_API_BASE = "https://console.neon.tech/api/v2"
+# Override the base URL to target a local stand-in such as neon_mock.py
+NEON_API_BASE = os.getenv("NEON_API_BASE", "https://console.neon.tech/api/v2")
 USER_AGENT = "neonorgdb-mcp/1.0"
 
+# Connection pool settings (shared by every tool call in the process)
+HTTP_MAX_CONNECTIONS = int(os.getenv("NEON_HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("NEON_HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("NEON_HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("NEON_HTTP_TIMEOUT", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("NEON_HTTP_CONNECT_TIMEOUT", "5"))
+HTTP2_ENABLED = os.getenv("NEON_HTTP2", "false").lower() in ("1", "true", "yes")
+
+# Request scheduling: client-side rate budget, concurrency cap and retries
+RATE_LIMIT_PER_SECOND = float(os.getenv("NEON_RATE_LIMIT_RPS", "10"))
+RATE_LIMIT_BURST = float(os.getenv("NEON_RATE_LIMIT_BURST", "20"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("NEON_MAX_CONCURRENT_REQUESTS", "10"))
+MAX_RETRIES = int(os.getenv("NEON_MAX_RETRIES", "4"))
+RETRY_BASE_DELAY = float(os.getenv("NEON_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("NEON_RETRY_MAX_DELAY", "30"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# JSON backend for decoding API responses and encoding tool results: auto (orjson if installed), orjson or default
+JSON_BACKEND = os.getenv("NEON_JSON_BACKEND", "auto")
+codec = JSONCodec(JSON_BACKEND, fallback=default_serializer)
+
+# Circuit breakers per endpoint class: consecutive failures that open a circuit and seconds between
+# recovery probes; while open, cached responses up to STALE_MAX_AGE old are served flagged as stale
+BREAKER_ENABLED = os.getenv("NEON_BREAKER_ENABLED", "true").lower() in ("1", "true", "yes")
+BREAKER_FAILURES = int(os.getenv("NEON_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("NEON_BREAKER_RESET_SECONDS", "30"))
+SERVE_STALE_ON_ERROR = os.getenv("NEON_SERVE_STALE_ON_ERROR", "true").lower() in ("1", "true", "yes")
+STALE_MAX_AGE = float(os.getenv("NEON_STALE_MAX_AGE_SECONDS", "3600"))
+
+# Response cache settings for read-only (GET) endpoints
+CACHE_ENABLED = os.getenv("NEON_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_MAX_ENTRIES = int(os.getenv("NEON_CACHE_MAX_ENTRIES", "1024"))
+CACHE_MAX_BYTES = int(os.getenv("NEON_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# SQLite file shared by HTTP worker processes as a second cache tier (empty = disabled; main.py sets it for --workers)
+SHARED_CACHE_PATH = os.getenv("NEON_SHARED_CACHE_PATH", "")
+SHARED_CACHE_MAX_ENTRIES = int(os.getenv("NEON_SHARED_CACHE_MAX_ENTRIES", "20000"))
+
+# Worker processes sharing one API key; each gets an equal share of the rate budget
+WORKERS = max(1, int(os.getenv("NEON_WORKERS", "1")))
+
+# Project catalog settings (background re-index interval in seconds)
+CATALOG_REFRESH_SECONDS = float(os.getenv("NEON_CATALOG_REFRESH_SECONDS", "300"))
+
+# Page size used by the streaming pagination iterators
+PAGE_SIZE = 100
+
+# Maximum concurrent upstream calls made by one inventory crawl
+INVENTORY_CONCURRENCY = int(os.getenv("NEON_INVENTORY_CONCURRENCY", "8"))
+
+# Batch lookups: concurrent upstream calls per batch, and the most requests one batch may hold
+BATCH_CONCURRENCY = int(os.getenv("NEON_BATCH_CONCURRENCY", "8"))
+BATCH_MAX_REQUESTS = int(os.getenv("NEON_BATCH_MAX_REQUESTS", "200"))
+
+# On-disk snapshot of the catalog and cached responses for warm starts (empty path = disabled)
+SNAPSHOT_PATH = os.getenv("NEON_SNAPSHOT_PATH", "")
+SNAPSHOT_MAX_AGE = float(os.getenv("NEON_SNAPSHOT_MAX_AGE_SECONDS", "86400"))
+SNAPSHOT_SAVE_SECONDS = float(os.getenv("NEON_SNAPSHOT_SAVE_SECONDS", "300"))
+
+# Instrumentation: calls slower than this are logged (0 disables); optional standalone /metrics port for stdio mode
+SLOW_CALL_MS = float(os.getenv("NEON_SLOW_CALL_MS", "1000"))
+METRICS_HOST = os.getenv("NEON_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("NEON_METRICS_PORT", "0"))
+
+metrics = MetricsRegistry(slow_call_seconds=SLOW_CALL_MS / 1000)
+metrics.describe("neonorgdb_tool_duration_seconds", "MCP tool call latency")
+metrics.describe("neonorgdb_tool_calls_total", "MCP tool calls by outcome")
+metrics.describe("neonorgdb_tool_in_flight", "MCP tool calls currently running")
+metrics.describe("neonorgdb_upstream_duration_seconds", "Neon API request latency per attempt")
+metrics.describe("neonorgdb_upstream_responses_total", "Neon API responses by status code")
+metrics.describe("neonorgdb_upstream_errors_total", "Neon API transport errors")
+metrics.describe("neonorgdb_upstream_retries_total", "Neon API request retries by reason")
+metrics.describe("neonorgdb_upstream_in_flight", "Neon API requests currently on the wire")
+metrics.describe("neonorgdb_scheduler_wait_seconds", "Time spent waiting for a request scheduler slot")
+metrics.describe("neonorgdb_cache_events_total", "Response cache lookups and revalidations by outcome")
+metrics.describe("neonorgdb_circuit_opens_total", "Circuit breaker trips per endpoint class")
+metrics.describe("neonorgdb_circuit_rejections_total", "Requests failed fast by an open circuit")
+metrics.describe("neonorgdb_circuit_probes_total", "Background recovery probes by outcome")
+metrics.describe("neonorgdb_decode_duration_seconds", "Neon API response decoding time")
+metrics.describe("neonorgdb_serialization_duration_seconds", "Tool result serialization time")
+metrics.describe("neonorgdb_serialized_bytes_total", "Bytes of serialized tool results")
+
+# Incremental org sync: per-project feed poll interval bounds, and the background pass period (0 = on demand)
+SYNC_MIN_INTERVAL = float(os.getenv("NEON_SYNC_MIN_INTERVAL_SECONDS", "15"))
+SYNC_MAX_INTERVAL = float(os.getenv("NEON_SYNC_MAX_INTERVAL_SECONDS", "600"))
+SYNC_INTERVAL = float(os.getenv("NEON_SYNC_INTERVAL_SECONDS", "0"))
+
+# Operation waits: poll interval bounds (backs off while nothing changes) and the longest allowed wait
+WAIT_MIN_INTERVAL = float(os.getenv("NEON_WAIT_MIN_INTERVAL_SECONDS", "1"))
+WAIT_MAX_INTERVAL = float(os.getenv("NEON_WAIT_MAX_INTERVAL_SECONDS", "15"))
+WAIT_MAX_SECONDS = float(os.getenv("NEON_WAIT_MAX_SECONDS", "300"))
+
+# Prefetching of likely follow-up calls, opt-in since every prefetch spends rate-limit budget: configured rules
+# ("trigger -> follow-up", comma separated; unset = built-in), whether to learn more from observed sequences,
+# follow-ups per trigger and request slots kept free
+PREFETCH_ENABLED = os.getenv("NEON_PREFETCH_ENABLED", "false").lower() in ("1", "true", "yes")
+PREFETCH_RULES = os.getenv("NEON_PREFETCH_RULES")
+PREFETCH_LEARN = os.getenv("NEON_PREFETCH_LEARN", "true").lower() in ("1", "true", "yes")
+PREFETCH_MAX_PER_TRIGGER = int(os.getenv("NEON_PREFETCH_MAX_PER_TRIGGER", "6"))
+PREFETCH_RESERVE = float(os.getenv("NEON_PREFETCH_RESERVE", "5"))
+
+# Read-only SQL on branch databases (needs asyncpg): pool size per endpoint database, pools kept open, seconds
+# before an idle pool or result cursor is closed, statement timeout cap, and rows per call and per round trip
+SQL_POOL_MAX_SIZE = int(os.getenv("NEON_SQL_POOL_MAX_SIZE", "5"))
+SQL_MAX_POOLS = int(os.getenv("NEON_SQL_MAX_POOLS", "20"))
+SQL_POOL_IDLE_SECONDS = float(os.getenv("NEON_SQL_POOL_IDLE_SECONDS", "300"))
+SQL_STATEMENT_TIMEOUT = float(os.getenv("NEON_SQL_STATEMENT_TIMEOUT_SECONDS", "30"))
+SQL_MAX_ROWS = int(os.getenv("NEON_SQL_MAX_ROWS", "5000"))
+SQL_CHUNK_ROWS = int(os.getenv("NEON_SQL_CHUNK_ROWS", "500"))
+SQL_MAX_CURSORS = int(os.getenv("NEON_SQL_MAX_CURSORS", "16"))
+SQL_CURSOR_IDLE_SECONDS = float(os.getenv("NEON_SQL_CURSOR_IDLE_SECONDS", "120"))
+
+def _http2_enabled() -> bool:
+    """HTTP/2 needs the optional `h2` package; fall back to HTTP/1.1 without it"""
+    return HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
 class NeonAPIClient:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, http_client: Optional[httpx.AsyncClient] = None,
+                 base_url: str = NEON_API_BASE, snapshot_path: Optional[str] = SNAPSHOT_PATH or None,
+                 defer_snapshot: bool = False, org: Optional[str] = None):
         self.api_key = api_key
+        # Named org in multi-org mode; its NEON_*_<ORG> variables override the process-wide settings
+        self.org = org
+        self.base_url = base_url.rstrip("/")
         self.headers = {
             "Authorization": f"Bearer {api_key}",
             "Accept": "application/json",
             "Content-Type": "application/json",
             "User-Agent": USER_AGENT
         }
+        # A caller-supplied client is borrowed and never closed here
+        self._http_client = http_client
+        self._owns_http_client = http_client is None
+        self.cache: Optional[ResponseCache] = None
+        if CACHE_ENABLED:
+            self.cache = ResponseCache(
+                max_entries=org_override("NEON_CACHE_MAX_ENTRIES", org, CACHE_MAX_ENTRIES, int),
+                max_bytes=org_override("NEON_CACHE_MAX_BYTES", org, CACHE_MAX_BYTES, int),
+                ttls=ttls_from_env(),
+            )
+        self.shared: Optional[SharedCache] = None
+        if SHARED_CACHE_PATH and self.cache is not None:
+            self.shared = SharedCache(SHARED_CACHE_PATH, key_fingerprint(api_key, self.base_url),
+                                      max_entries=SHARED_CACHE_MAX_ENTRIES)
+        self._inflight = SingleFlight()
+        self.timeouts = timeouts_from_env()
+        self.breakers: Optional[BreakerBoard] = None
+        if BREAKER_ENABLED:
+            self.breakers = BreakerBoard(BREAKER_FAILURES, BREAKER_RESET_SECONDS)
+        # Last failing GET per endpoint class, re-sent as the recovery probe
+        self._probe_targets: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._probes: Dict[str, asyncio.Task] = {}
+        self.scheduler = RequestScheduler(
+            rate=org_override("NEON_RATE_LIMIT_RPS", org, RATE_LIMIT_PER_SECOND, float) / WORKERS,
+            burst=org_override("NEON_RATE_LIMIT_BURST", org, RATE_LIMIT_BURST, float) / WORKERS,
+            max_concurrency=org_override("NEON_MAX_CONCURRENT_REQUESTS", org, MAX_CONCURRENT_REQUESTS, int),
+        )
+        self._limits = httpx.Limits(
+            max_connections=org_override("NEON_HTTP_MAX_CONNECTIONS", org, HTTP_MAX_CONNECTIONS, int),
+            max_keepalive_connections=org_override("NEON_HTTP_MAX_KEEPALIVE", org, HTTP_MAX_KEEPALIVE_CONNECTIONS, int),
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        )
+        self.catalog = ProjectCatalog()
+        self._catalog_lock = asyncio.Lock()
+        self._catalog_task: Optional[asyncio.Task] = None
+        self.org_sync = OrgSync(
+            self,
+            min_interval=SYNC_MIN_INTERVAL,
+            max_interval=SYNC_MAX_INTERVAL,
+            max_concurrency=INVENTORY_CONCURRENCY,
+        )
+        self.topology = TopologyIndex(self.org_sync)
+        self.consumption = ConsumptionStore()
+        self.watchers = OperationWatchers(self, min_interval=WAIT_MIN_INTERVAL, max_interval=WAIT_MAX_INTERVAL)
+        self.sql = SQLPools(
+            self._connection_uri_for,
+            max_size=SQL_POOL_MAX_SIZE,
+            max_pools=SQL_MAX_POOLS,
+            idle_seconds=SQL_POOL_IDLE_SECONDS,
+            statement_timeout=SQL_STATEMENT_TIMEOUT,
+            chunk_rows=SQL_CHUNK_ROWS,
+            max_cursors=SQL_MAX_CURSORS,
+            cursor_idle_seconds=SQL_CURSOR_IDLE_SECONDS,
+        )
+        self.prefetcher: Optional[Prefetcher] = None
+        if PREFETCH_ENABLED and self.cache is not None:
+            self.prefetcher = Prefetcher(
+                self,
+                rules=parse_rules(PREFETCH_RULES) if PREFETCH_RULES is not None else None,
+                learn=PREFETCH_LEARN,
+                max_per_trigger=PREFETCH_MAX_PER_TRIGGER,
+                reserve=PREFETCH_RESERVE,
+            )
+        self._background: Set[asyncio.Task] = set()
+        self._catalog_restored = False
+        self.snapshot: Optional[SnapshotStore] = None
+        self._snapshot_task: Optional[asyncio.Task] = None
+        self._snapshot_loaded = False
+        if snapshot_path:
+            self.snapshot = SnapshotStore(snapshot_path, key_fingerprint(api_key, self.base_url),
+                                          max_age=SNAPSHOT_MAX_AGE)
+            # A deferred snapshot is loaded later by restore_snapshot(), off the event loop
+            if not defer_snapshot:
+                self.load_snapshot()
     
-    async def _make_request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
-        """Make authenticated request to Neon API"""
-        url = f"{NEON_API_BASE}/{endpoint.lstrip('/')}"
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.request(
-                method=method,
-                url=url,
-                headers=self.headers,
-                **kwargs
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Return the long-lived pooled HTTP client, creating it on first use"""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                limits=self._limits,
+                timeout=HTTP_TIMEOUT,
+                http2=_http2_enabled(),
             )
-            response.raise_for_status()
-            return response.json()
+            self._owns_http_client = True
+        return self._http_client
+    
+    async def aclose(self) -> None:
+        """Stop background work and close pooled connections owned by this client"""
+        if self._catalog_task is not None:
+            self._catalog_task.cancel()
+            self._catalog_task = None
+        self.org_sync.stop()
+        self.watchers.stop()
+        await self.sql.aclose()
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+            self._snapshot_task = None
+        tasks = [*self._background, *self._probes.values()]
+        for task in tasks:
+            task.cancel()
+        # A probe still running would reopen the HTTP client closed below
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Never replace a snapshot that was not restored yet with a colder one
+        if self.snapshot is not None and self._snapshot_loaded:
+            try:
+                await self.save_snapshot()
+            except OSError:
+                pass
+        if self._owns_http_client and self._http_client is not None:
+            await self._http_client.aclose()
+        self._http_client = None
+        if self.shared is not None:
+            self.shared.close()
+    
+    async def _make_request(self, method: str, endpoint: str, refresh: bool = False, **kwargs) -> Dict[str, Any]:
+        """
+        Make authenticated request to Neon API.
+        
+        GETs are served from the cache when fresh, and identical GETs already in
+        flight share a single upstream request.
+        """
+        if method.upper() != "GET":
+            url = f"{self.base_url}/{endpoint.lstrip('/')}"
+            response = await self._send(method, url, **kwargs)
+            return codec.loads(response.content)
+        
+        entry = await self._get_entry(endpoint, refresh=refresh, **kwargs)
+        if self.prefetcher is not None:
+            self.prefetcher.observe(endpoint, kwargs.get("params"), entry.value)
+        return entry.value
+    
+    async def prefetch(self, endpoint: str) -> bool:
+        """
+        Fetch `endpoint` into the cache unless it is already fresh or in flight.
+        
+        Returns False when nothing was sent, including while the endpoint's circuit is open.
+        """
+        cache_key = make_cache_key(endpoint)
+        if self.cache is None or self.cache.is_fresh(cache_key) or self._inflight.pending(cache_key):
+            return False
+        if self.breakers is not None and not self.breakers.get(endpoint_class(cache_key[0])).allow():
+            return False
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        metrics.inc("neonorgdb_cache_events_total", endpoint_class=endpoint_class(cache_key[0]), event="prefetch")
+        await self._inflight.run(cache_key, lambda: self._fetch(url, cache_key))
+        return True
+    
+    async def get_versioned(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                            refresh: bool = False) -> Tuple[Dict[str, Any], str]:
+        """
+        GET an endpoint along with a version string for its payload.
+        
+        The version is a hash of the response body, so it only changes when
+        the payload does; compare it with a previous value to skip unchanged data.
+        """
+        entry = await self._get_entry(endpoint, refresh=refresh, params=params)
+        return entry.value, entry.digest
     
-    async def get_projects(self, cursor: Optional[str] = None, limit: int = 10) -> Dict[str, Any]:
+    async def _get_entry(self, endpoint: str, refresh: bool = False, **kwargs) -> CacheEntry:
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        cache_key = make_cache_key(endpoint, kwargs.get("params"))
+        cls = endpoint_class(cache_key[0])
+        if self.cache is not None:
+            if refresh:
+                self.cache.record_bypass()
+                metrics.inc("neonorgdb_cache_events_total", endpoint_class=cls, event="bypass")
+            else:
+                cached = self.cache.get_entry(cache_key)
+                if cached is not None:
+                    metrics.inc("neonorgdb_cache_events_total", endpoint_class=cls, event="hit")
+                    return cached
+                stale = self.cache.take_stale(cache_key)
+                if stale is not None:
+                    metrics.inc("neonorgdb_cache_events_total", endpoint_class=cls, event="stale")
+                    self._revalidate_in_background(url, cache_key, **kwargs)
+                    return stale
+                metrics.inc("neonorgdb_cache_events_total", endpoint_class=cls, event="miss")
+        
+        if self._inflight.pending(cache_key):
+            metrics.inc("neonorgdb_cache_events_total", endpoint_class=cls, event="coalesced")
+        try:
+            return await self._inflight.run(cache_key, lambda: self._fetch(url, cache_key, use_shared=not refresh,
+                                                                           **kwargs))
+        except httpx.HTTPError as exc:
+            fallback = self._stale_fallback(cache_key, exc)
+            if fallback is None:
+                raise
+            return fallback
+    
+    def _stale_fallback(self, cache_key: Tuple, exc: httpx.HTTPError) -> Optional[CacheEntry]:
+        """
+        The last cached response for `cache_key` when the API is unavailable.
+        
+        Applies to open circuits, transport errors and 5xx/429 responses, never to
+        other 4xx answers. The value is a copy carrying a `_cache` flag with its age.
+        """
+        if self.cache is None or not SERVE_STALE_ON_ERROR:
+            return None
+        if isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code < 500 \
+                and exc.response.status_code != 429:
+            return None
+        entry = self.cache.fallback(cache_key, STALE_MAX_AGE)
+        if entry is None or not isinstance(entry.value, dict):
+            return None
+        metrics.inc("neonorgdb_cache_events_total", endpoint_class=entry.endpoint_class, event="stale_fallback")
+        flag = {"stale": True, "age_seconds": round(self.cache.age(entry), 1), "reason": str(exc)}
+        return replace(entry, value={**entry.value, "_cache": flag})
+    
+    def _revalidate_in_background(self, url: str, cache_key: Tuple, **kwargs) -> None:
+        async def revalidate() -> None:
+            try:
+                await self._inflight.run(cache_key, lambda: self._fetch(url, cache_key, **kwargs))
+            except httpx.HTTPError:
+                # The entry stays cached but expired, so the next read revalidates in the foreground
+                pass
+        
+        with bulk_priority():
+            task = asyncio.create_task(revalidate())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    async def _fetch(self, url: str, cache_key: Tuple, use_shared: bool = True, **kwargs) -> CacheEntry:
+        """
+        GET `url` and store the decoded body in the cache.
+        
+        A response another worker stored in the shared tier within the TTL is
+        used without calling the API. A stale cached copy is revalidated with
+        If-None-Match/If-Modified-Since. When the API has no validators, an
+        identical body hash still renews the cached copy without decoding the JSON again.
+        """
+        cls = endpoint_class(cache_key[0])
+        local = self.cache.peek(cache_key) if self.cache is not None else None
+        # An expired copy was outdated by an operation, and the shared row may be the same copy
+        if self.shared is not None and use_shared and not (local is not None and local.expired):
+            shared = await self.shared.aget(cache_key, self.cache.ttl_for(cls))
+            if shared is not None:
+                metrics.inc("neonorgdb_cache_events_total", endpoint_class=cls, event="shared_hit")
+                return self.cache.set(cache_key, codec.loads(shared.body), len(shared.body), etag=shared.etag,
+                                      last_modified=shared.last_modified, digest=shared.digest, age=shared.age)
+        
+        stale = self.cache.peek(cache_key) if self.cache is not None else None
+        conditional = {}
+        if stale is not None:
+            if stale.etag:
+                conditional["If-None-Match"] = stale.etag
+            if stale.last_modified:
+                conditional["If-Modified-Since"] = stale.last_modified
+            if conditional:
+                self.cache.record_revalidation()
+        
+        response = await self._send("GET", url, extra_headers=conditional, **kwargs)
+        if response.status_code == 304 and stale is not None:
+            metrics.inc("neonorgdb_cache_events_total", endpoint_class=stale.endpoint_class, event="not_modified")
+            self._share("touch", cache_key)
+            return self.cache.revalidated(cache_key, not_modified=True) or stale
+        
+        digest = content_digest(response.content)
+        if stale is not None and stale.digest == digest:
+            metrics.inc("neonorgdb_cache_events_total", endpoint_class=stale.endpoint_class, event="unchanged")
+            self._share("touch", cache_key)
+            return self.cache.revalidated(cache_key, not_modified=False) or stale
+        
+        started = time.perf_counter()
+        data = codec.loads(response.content)
+        metrics.observe("neonorgdb_decode_duration_seconds", time.perf_counter() - started,
+                        endpoint_class=endpoint_class(cache_key[0]))
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if self.cache is None:
+            return CacheEntry(data, len(response.content), "", 0.0, 0.0, etag, last_modified, digest)
+        if self.cache.ttl_for(cls) > 0:
+            self._share("put", cache_key, response.content, etag, last_modified, digest)
+        return self.cache.set(cache_key, data, len(response.content), etag=etag,
+                              last_modified=last_modified, digest=digest)
+    
+    def expire_cached(self, path_prefix: str, recursive: bool = True) -> int:
+        """Mark cached responses for `path_prefix` stale here and in the shared tier; returns local entries marked"""
+        if self.cache is None:
+            return 0
+        self._share("expire", path_prefix, recursive)
+        return self.cache.expire(path_prefix, recursive)
+    
+    def _share(self, method: str, *args: Any) -> None:
+        """Call SharedCache.put/touch/expire in the background; requests never wait on the database"""
+        if self.shared is None:
+            return
+        task = asyncio.create_task(self.shared.arun(getattr(self.shared, method), *args))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    async def _send(self, method: str, url: str, extra_headers: Optional[Dict[str, str]] = None,
+                    **kwargs) -> httpx.Response:
+        """
+        Send a request through the scheduler, retrying rate limits and transient failures.
+        
+        429s are retried for every method since the API rejected the request
+        outright; 5xx responses and transport errors only for idempotent GETs.
+        A 304 Not Modified is returned as-is for the caller to revalidate.
+        """
+        idempotent = method.upper() == "GET"
+        headers = {**self.headers, **extra_headers} if extra_headers else self.headers
+        route = route_template(url[len(self.base_url):])
+        cls = endpoint_class(route)
+        breaker = self.breakers.get(cls) if self.breakers is not None else None
+        timeout = self._timeout(cls)
+        attempt = 0
+        while True:
+            self._check_circuit(breaker)
+            queued_at = time.perf_counter()
+            async with self.scheduler.slot():
+                started = time.perf_counter()
+                metrics.observe("neonorgdb_scheduler_wait_seconds", started - queued_at)
+                # The circuit may have opened while this request was queued
+                self._check_circuit(breaker)
+                try:
+                    with metrics.in_flight("neonorgdb_upstream_in_flight"):
+                        response = await self._get_http_client().request(
+                            method=method,
+                            url=url,
+                            headers=headers,
+                            timeout=timeout,
+                            **kwargs
+                        )
+                except httpx.TransportError as e:
+                    metrics.inc("neonorgdb_upstream_errors_total", method=method, route=route, error=type(e).__name__)
+                    if not idempotent or attempt >= MAX_RETRIES:
+                        self._record_failure(breaker, type(e).__name__, method, url, kwargs)
+                        raise
+                    metrics.inc("neonorgdb_upstream_retries_total", route=route, reason=type(e).__name__)
+                    delay = backoff_delay(attempt, RETRY_BASE_DELAY, RETRY_MAX_DELAY)
+                else:
+                    elapsed = time.perf_counter() - started
+                    metrics.observe("neonorgdb_upstream_duration_seconds", elapsed, method=method, route=route)
+                    metrics.inc("neonorgdb_upstream_responses_total", method=method, route=route,
+                                status=response.status_code)
+                    metrics.log_if_slow("upstream", f"{method} {url}", elapsed, status=response.status_code,
+                                        attempt=attempt)
+                    retryable = response.status_code == 429 or (idempotent and response.status_code in RETRY_STATUSES)
+                    final = not retryable or attempt >= MAX_RETRIES
+                    if response.status_code >= 500:
+                        if final:
+                            self._record_failure(breaker, f"HTTP {response.status_code}", method, url, kwargs)
+                    elif breaker is not None and response.status_code < 400:
+                        # Throttling and client errors say nothing about whether the API has recovered
+                        breaker.record_success()
+                    if final:
+                        if response.status_code != 304:
+                            response.raise_for_status()
+                        return response
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    delay = backoff_delay(attempt, RETRY_BASE_DELAY, RETRY_MAX_DELAY)
+                    if retry_after is not None:
+                        delay = min(retry_after, RETRY_MAX_DELAY) + delay / 4
+                    if response.status_code == 429:
+                        self.scheduler.pause(delay)
+                    metrics.inc("neonorgdb_upstream_retries_total", route=route, reason=response.status_code)
+            self.scheduler.retries += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+    
+    def _timeout(self, cls: str) -> httpx.Timeout:
+        return httpx.Timeout(self.timeouts.get(cls, HTTP_TIMEOUT), connect=HTTP_CONNECT_TIMEOUT)
+    
+    @staticmethod
+    def _check_circuit(breaker: Optional[CircuitBreaker]) -> None:
+        if breaker is not None and not breaker.allow():
+            metrics.inc("neonorgdb_circuit_rejections_total", endpoint_class=breaker.name)
+            raise breaker.reject()
+    
+    def _record_failure(self, breaker: Optional[CircuitBreaker], error: str, method: str, url: str,
+                        kwargs: Dict[str, Any]) -> None:
+        """Count a request that failed after its retries against its circuit, probing when the circuit opens"""
+        if breaker is None:
+            return
+        if method.upper() == "GET":
+            self._probe_targets[breaker.name] = (url, kwargs)
+        if breaker.record_failure(error):
+            metrics.inc("neonorgdb_circuit_opens_total", endpoint_class=breaker.name)
+            logger.warning("circuit for %s opened after %d consecutive failures (last: %s)",
+                           breaker.name, breaker.consecutive_failures, error)
+            if breaker.name not in self._probes:
+                with bulk_priority():
+                    task = asyncio.create_task(self._probe_until_closed(breaker))
+                self._probes[breaker.name] = task
+                task.add_done_callback(lambda _: self._probes.pop(breaker.name, None))
+    
+    async def _probe_until_closed(self, breaker: CircuitBreaker) -> None:
+        """Re-send the last failing GET once per reset interval until the API answers without a 5xx"""
+        cls = breaker.name
+        while breaker.state != CLOSED:
+            await asyncio.sleep(breaker.retry_in())
+            url, kwargs = self._probe_targets.get(cls, (f"{self.base_url}/projects", {"params": {"limit": 1}}))
+            breaker.begin_probe()
+            error: Optional[str] = None
+            try:
+                async with self.scheduler.slot():
+                    response = await self._get_http_client().request(
+                        "GET", url, headers=self.headers, timeout=self._timeout(cls), **kwargs)
+                if response.status_code >= 500:
+                    error = f"HTTP {response.status_code}"
+            except httpx.TransportError as e:
+                error = type(e).__name__
+            metrics.inc("neonorgdb_circuit_probes_total", endpoint_class=cls, outcome="failed" if error else "ok")
+            if error is None:
+                breaker.record_success()
+                logger.info("circuit for %s closed after a successful probe", cls)
+            else:
+                breaker.record_failure(error)
+    
+    def breaker_stats(self) -> Dict[str, Any]:
+        """Circuit state per endpoint class, with the timeouts applied to each class"""
+        if self.breakers is None:
+            return {"enabled": False, "timeouts": dict(self.timeouts)}
+        return {
+            "enabled": True,
+            "failure_threshold": self.breakers.failure_threshold,
+            "reset_seconds": self.breakers.reset_timeout,
+            "circuits": self.breakers.stats(),
+            "timeouts": dict(self.timeouts),
+        }
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and occupancy of the response cache, plus request coalescing counters"""
+        if self.cache is None:
+            return {"enabled": False, "coalescing": self._inflight.stats()}
+        return {"enabled": True, **self.cache.stats(), "coalescing": self._inflight.stats()}
+    
+    async def get_projects(self, cursor: Optional[str] = None, limit: int = 10, refresh: bool = False) -> Dict[str, Any]:
         """Get all projects in the organization"""
         params = {"limit": limit}
         if cursor:
             params["cursor"] = cursor
-        return await self._make_request("GET", "/projects", params=params)
+        return await self._make_request("GET", "/projects", refresh=refresh, params=params)
     
-    async def get_project(self, project_id: str) -> Dict[str, Any]:
+    async def get_project(self, project_id: str, refresh: bool = False) -> Dict[str, Any]:
         """Get specific project details"""
-        return await self._make_request("GET", f"/projects/{project_id}")
+        return await self._make_request("GET", f"/projects/{project_id}", refresh=refresh)
     
-    async def get_branches(self, project_id: str) -> Dict[str, Any]:
+    async def get_branches(self, project_id: str, refresh: bool = False) -> Dict[str, Any]:
         """Get branches for a project"""
-        return await self._make_request("GET", f"/projects/{project_id}/branches")
+        return await self._make_request("GET", f"/projects/{project_id}/branches", refresh=refresh)
     
-    async def get_databases(self, project_id: str, branch_id: str) -> Dict[str, Any]:
+    async def get_databases(self, project_id: str, branch_id: str, refresh: bool = False) -> Dict[str, Any]:
         """Get databases for a specific branch"""
-        return await self._make_request("GET", f"/projects/{project_id}/branches/{branch_id}/databases")
+        return await self._make_request("GET", f"/projects/{project_id}/branches/{branch_id}/databases", refresh=refresh)
     
-    async def get_roles(self, project_id: str, branch_id: str) -> Dict[str, Any]:
+    async def get_roles(self, project_id: str, branch_id: str, refresh: bool = False) -> Dict[str, Any]:
         """Get roles for a specific branch"""
-        return await self._make_request("GET", f"/projects/{project_id}/branches/{branch_id}/roles")
+        return await self._make_request("GET", f"/projects/{project_id}/branches/{branch_id}/roles", refresh=refresh)
     
-    async def get_operations(self, project_id: str, cursor: Optional[str] = None, limit: int = 10) -> Dict[str, Any]:
+    async def get_operations(self, project_id: str, cursor: Optional[str] = None, limit: int = 10,
+                             refresh: bool = False) -> Dict[str, Any]:
         """Get operations for a project"""
         params = {"limit": limit}
         if cursor:
             params["cursor"] = cursor
-        return await self._make_request("GET", f"/projects/{project_id}/operations", params=params)
+        return await self._make_request("GET", f"/projects/{project_id}/operations", refresh=refresh, params=params)
     
-    async def get_endpoints(self, project_id: str) -> Dict[str, Any]:
+    async def get_operation(self, project_id: str, operation_id: str, refresh: bool = False) -> Dict[str, Any]:
+        """Get a single operation"""
+        return await self._make_request("GET", f"/projects/{project_id}/operations/{operation_id}", refresh=refresh)
+    
+    async def get_connection_uri(self, project_id: str, branch_id: str, database_name: str, role_name: str) -> str:
+        """Connection URI of a branch database; never cached, since it embeds the role's password"""
+        url = f"{self.base_url}/projects/{project_id}/connection_uri"
+        params = {"branch_id": branch_id, "database_name": database_name, "role_name": role_name}
+        response = await self._send("GET", url, params=params)
+        return codec.loads(response.content)["uri"]
+    
+    async def _connection_uri_for(self, target: SQLTarget) -> str:
+        return await self.get_connection_uri(*target)
+    
+    async def get_endpoints(self, project_id: str, refresh: bool = False) -> Dict[str, Any]:
         """Get compute endpoints for a project"""
-        return await self._make_request("GET", f"/projects/{project_id}/endpoints")
+        return await self._make_request("GET", f"/projects/{project_id}/endpoints", refresh=refresh)
     
-    async def get_organization(self) -> Dict[str, Any]:
+    async def get_organization(self, refresh: bool = False) -> Dict[str, Any]:
         """Get organization details"""
-        return await self._make_request("GET", "/users/me")
+        return await self._make_request("GET", "/users/me", refresh=refresh)
     
     async def get_consumption_history(self, cursor: Optional[str] = None, limit: int = 10, 
-                                    from_date: Optional[str] = None, to_date: Optional[str] = None) -> Dict[str, Any]:
+                                    from_date: Optional[str] = None, to_date: Optional[str] = None,
+                                    refresh: bool = False) -> Dict[str, Any]:
         """Get consumption history for the organization"""
         params = {"limit": limit}
         if cursor:
@@ -83,90 +660,468 @@ class NeonAPIClient:
             params["from"] = from_date
         if to_date:
             params["to"] = to_date
-        return await self._make_request("GET", "/consumption_history/account", params=params)
+        return await self._make_request("GET", "/consumption_history/account", refresh=refresh, params=params)
+    
+    async def get_project_consumption_history(self, cursor: Optional[str] = None, limit: int = 10,
+                                              from_date: Optional[str] = None, to_date: Optional[str] = None,
+                                              granularity: str = "daily", refresh: bool = False) -> Dict[str, Any]:
+        """Get per-project consumption, one entry per project with its consumption timeframes"""
+        params = {"limit": limit, "granularity": granularity}
+        if cursor:
+            params["cursor"] = cursor
+        if from_date:
+            params["from"] = from_date
+        if to_date:
+            params["to"] = to_date
+        return await self._make_request("GET", "/consumption_history/projects", refresh=refresh, params=params)
+    
+    async def _paginate(self, fetch_page: Callable[[Optional[str]], Awaitable[Dict[str, Any]]], items_key: str,
+                        page_size: int, max_items: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield items across cursor-paginated pages, fetching the next page while
+        the current one is consumed.
+        
+        Stops at the last page or after `max_items`. Close the iterator (e.g. with
+        `contextlib.aclosing`) when breaking out early so a pending prefetch is cancelled.
+        """
+        yielded = 0
+        cursor: Optional[str] = None
+        next_page: Optional[asyncio.Future] = asyncio.ensure_future(fetch_page(None))
+        try:
+            while next_page is not None:
+                page = await next_page
+                next_page = None
+                items = page.get(items_key, [])
+                previous_cursor, cursor = cursor, page.get("pagination", {}).get("cursor")
+                more = bool(cursor) and cursor != previous_cursor and len(items) >= page_size
+                if more and (max_items is None or yielded + len(items) < max_items):
+                    next_page = asyncio.ensure_future(fetch_page(cursor))
+                for item in items:
+                    yield item
+                    yielded += 1
+                    if max_items is not None and yielded >= max_items:
+                        return
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+    
+    def iter_projects(self, page_size: int = PAGE_SIZE, max_items: Optional[int] = None,
+                      refresh: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Stream every project in the organization page by page"""
+        return self._paginate(
+            lambda cursor: self.get_projects(cursor=cursor, limit=page_size, refresh=refresh),
+            "projects", page_size, max_items,
+        )
+    
+    def iter_operations(self, project_id: str, page_size: int = PAGE_SIZE, max_items: Optional[int] = None,
+                        refresh: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a project's operations page by page, newest first"""
+        return self._paginate(
+            lambda cursor: self.get_operations(project_id, cursor=cursor, limit=page_size, refresh=refresh),
+            "operations", page_size, max_items,
+        )
+    
+    def iter_consumption_history(self, from_date: Optional[str] = None, to_date: Optional[str] = None,
+                                 page_size: int = PAGE_SIZE, max_items: Optional[int] = None,
+                                 refresh: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the organization's consumption periods page by page"""
+        return self._paginate(
+            lambda cursor: self.get_consumption_history(cursor=cursor, limit=page_size, from_date=from_date,
+                                                        to_date=to_date, refresh=refresh),
+            "periods", page_size, max_items,
+        )
+    
+    def iter_project_consumption(self, from_date: Optional[str] = None, to_date: Optional[str] = None,
+                                 granularity: str = "daily", page_size: int = PAGE_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream per-project consumption records page by page.
+        
+        Pages are decoded one project at a time and bypass the response cache: a page
+        for many projects over months is megabytes of JSON, and its only consumer folds
+        it into the consumption store's columns.
+        """
+        params = {"granularity": granularity, "from": from_date, "to": to_date}
+        return self._stream_pages("/consumption_history/projects",
+                                  {key: value for key, value in params.items() if value}, "projects", page_size)
+    
+    async def _stream_pages(self, endpoint: str, params: Dict[str, Any], items_key: str,
+                            page_size: int) -> AsyncIterator[Dict[str, Any]]:
+        """Yield items across cursor-paginated pages, uncached, decoding each item only when it is reached"""
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        cursor: Optional[str] = None
+        while True:
+            page_params = {**params, "limit": page_size}
+            if cursor:
+                page_params["cursor"] = cursor
+            response = await self._send("GET", url, params=page_params)
+            envelope, items = iter_page(response.content, items_key)
+            count = 0
+            for item in items:
+                yield item
+                count += 1
+            previous_cursor, cursor = cursor, envelope.get("pagination", {}).get("cursor")
+            if not cursor or cursor == previous_cursor or count < page_size:
+                return
+    
+    async def get_all_projects(self, refresh: bool = False) -> List[Dict[str, Any]]:
+        """Get every project in the organization by following pagination cursors"""
+        return [project async for project in self.iter_projects(refresh=refresh)]
+    
+    async def refresh_catalog(self) -> ProjectCatalog:
+        """Re-list all projects and rebuild the catalog indexes"""
+        async with self._catalog_lock:
+            self.catalog.load(await self.get_all_projects(refresh=True))
+            self._catalog_restored = False
+        return self.catalog
+    
+    def request_stats(self) -> Dict[str, Any]:
+        """Rate limiting, queueing and retry counters of the request scheduler"""
+        return self.scheduler.stats()
+    
+    async def ensure_catalog(self, refresh: bool = False) -> ProjectCatalog:
+        """Return the project catalog, loading it on first use and keeping it refreshed"""
+        if refresh or not self.catalog.loaded:
+            async with self._catalog_lock:
+                if refresh or not self.catalog.loaded:
+                    self.catalog.load(await self.get_all_projects(refresh=True))
+        if self._catalog_task is None or self._catalog_task.done():
+            self._catalog_task = asyncio.create_task(self._refresh_catalog_periodically())
+        return self.catalog
+    
+    async def _refresh_catalog_periodically(self) -> None:
+        # A catalog restored from a snapshot is served at once and refreshed straight away
+        delay = 0.0 if self._catalog_restored else CATALOG_REFRESH_SECONDS
+        with bulk_priority():
+            while True:
+                await asyncio.sleep(delay)
+                delay = CATALOG_REFRESH_SECONDS
+                try:
+                    await self.refresh_catalog()
+                except httpx.HTTPError:
+                    # Keep serving the last good index until the next attempt
+                    continue
 
-# Initialize API client
-def get_neon_client() -> NeonAPIClient:
-    api_key = os.getenv("NEON_API_KEY")
-    if not api_key:
-        raise ValueError("NEON_API_KEY environment variable is required")
-    return NeonAPIClient(api_key)
+    def load_snapshot(self) -> None:
+        """Warm the catalog and cache from the snapshot file; restored responses are revalidated on first use"""
+        self._apply_snapshot(self.snapshot.read())
+    
+    async def restore_snapshot(self) -> None:
+        """Like load_snapshot(), but decompress and parse the file in a worker thread"""
+        if self.snapshot is None or self._snapshot_loaded:
+            return
+        records = await asyncio.to_thread(lambda: list(self.snapshot.read()))
+        self._apply_snapshot(records)
+    
+    def _apply_snapshot(self, records: Iterable[Dict[str, Any]]) -> None:
+        # Anything fetched while the snapshot was loading is newer than the snapshot
+        for record in records:
+            if "projects" in record:
+                if not self.catalog.loaded:
+                    self.catalog.load(record["projects"])
+                    self._catalog_restored = True
+            elif self.cache is not None:
+                key = cache_key_from_record(record)
+                if self.cache.peek(key) is not None:
+                    continue
+                self.cache.restore(
+                    key, record["value"], record["size"],
+                    etag=record.get("etag"), last_modified=record.get("last_modified"),
+                    digest=record.get("digest"), age=max(0.0, time.time() - record["stored_at"]),
+                )
+        self._snapshot_loaded = True
+    
+    async def save_snapshot(self) -> int:
+        """Persist the catalog and cached responses; returns the snapshot size in bytes"""
+        projects = self.catalog.find() if self.catalog.loaded else None
+        records = []
+        if self.cache is not None:
+            # Entry times are monotonic; store wall-clock times so ages survive a restart
+            offset = time.time() - time.monotonic()
+            for (path, params), entry in self.cache.items():
+                records.append({
+                    "key": [path, [list(param) for param in params]],
+                    "stored_at": entry.stored_at + offset,
+                    "size": entry.size,
+                    "etag": entry.etag,
+                    "last_modified": entry.last_modified,
+                    "digest": entry.digest,
+                    "value": entry.value,
+                })
+        # Cached values are read-only, so the thread can serialize them while the loop keeps serving
+        return await asyncio.to_thread(self.snapshot.write, projects, records)
+    
+    def start_snapshots(self) -> None:
+        """Save the snapshot every NEON_SNAPSHOT_SAVE_SECONDS in the background"""
+        if self.snapshot is None or SNAPSHOT_SAVE_SECONDS <= 0:
+            return
+        if self._snapshot_task is None or self._snapshot_task.done():
+            self._snapshot_task = asyncio.create_task(self._save_snapshot_periodically())
+    
+    async def _save_snapshot_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(SNAPSHOT_SAVE_SECONDS)
+            try:
+                await self.save_snapshot()
+            except OSError:
+                continue
+    
+    def snapshot_stats(self) -> Dict[str, Any]:
+        if self.snapshot is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.snapshot.stats()}
+    
+    def stats(self) -> Dict[str, Any]:
+        """Everything get_cache_stats reports for this client"""
+        return {
+            **self.cache_stats(),
+            "project_catalog": self.catalog.stats(),
+            "request_scheduler": self.request_stats(),
+            "circuit_breakers": self.breaker_stats(),
+            "operation_watchers": self.watchers.stats(),
+            "sql_pools": self.sql.stats(),
+            "branch_topology": self.topology.stats(),
+            "prefetch": self.prefetcher.stats() if self.prefetcher is not None else {"enabled": False},
+            "shared_cache": self.shared.stats() if self.shared is not None else {"enabled": False},
+            "snapshot": self.snapshot_stats(),
+        }
+
+# Initialize API client (single-org mode) and one client per named org (multi-org mode)
+_neon_client: Optional[NeonAPIClient] = None
+_org_clients: Dict[str, NeonAPIClient] = {}
+
+def org_names() -> List[str]:
+    """Orgs listed in NEON_ORGS; empty in single-org mode"""
+    return list(orgs_from_env())
+
+def get_neon_client(org: Optional[str] = None) -> NeonAPIClient:
+    """
+    Return the process-wide client for `org` so its tools share one connection pool.
+    
+    Without NEON_ORGS there is a single client for NEON_API_KEY and `org` must be omitted.
+    """
+    global _neon_client
+    orgs = orgs_from_env()
+    if not orgs:
+        if org is not None:
+            raise ValueError(f"Unknown org {org!r}: set NEON_ORGS to serve several organizations")
+        api_key = os.getenv("NEON_API_KEY")
+        if not api_key:
+            raise ValueError("NEON_API_KEY environment variable is required")
+        if _neon_client is None or _neon_client.api_key != api_key:
+            # Keep construction cheap; warm_up_client() restores the snapshot in the background
+            _neon_client = NeonAPIClient(api_key, defer_snapshot=True)
+        return _neon_client
+    
+    name = default_org(orgs) if org is None else org
+    if name not in orgs:
+        if name == ALL_ORGS:
+            raise ValueError('org="*" is only supported by search_projects_by_name, find_projects, '
+                             'get_organization_inventory, find_branches and get_cache_stats')
+        raise ValueError(f"Unknown org {name!r}; choose from {list(orgs)}")
+    client = _org_clients.get(name)
+    if client is None or client.api_key != orgs[name].api_key:
+        snapshot_path = org_override("NEON_SNAPSHOT_PATH", name, SNAPSHOT_PATH, str)
+        if snapshot_path == SNAPSHOT_PATH and SNAPSHOT_PATH:
+            snapshot_path = org_snapshot_path(SNAPSHOT_PATH, name)
+        client = _org_clients[name] = NeonAPIClient(
+            orgs[name].api_key,
+            base_url=org_override("NEON_API_BASE", name, NEON_API_BASE, str),
+            snapshot_path=snapshot_path or None,
+            defer_snapshot=True,
+            org=name,
+        )
+    return client
+
+async def warm_up_client() -> None:
+    """Build the shared clients, restore their snapshots off the event loop and start periodic saves"""
+    clients = [get_neon_client(name) for name in org_names()] or [get_neon_client()]
+    for client in clients:
+        await client.restore_snapshot()
+        client.start_snapshots()
+
+async def close_neon_client() -> None:
+    """Release the shared clients' pooled connections"""
+    global _neon_client, _warm_up_task
+    if _warm_up_task is not None:
+        _warm_up_task.cancel()
+        _warm_up_task = None
+    if _neon_client is not None:
+        await _neon_client.aclose()
+        _neon_client = None
+    clients = list(_org_clients.values())
+    _org_clients.clear()
+    for client in clients:
+        await client.aclose()
+
+_active_sessions = 0
+_metrics_server: Optional[asyncio.AbstractServer] = None
+_warm_up_task: Optional[asyncio.Task] = None
+
+@asynccontextmanager
+async def lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """Close the shared HTTP pool once the last MCP session has ended"""
+    global _active_sessions, _metrics_server, _warm_up_task
+    _active_sessions += 1
+    if METRICS_PORT and _metrics_server is None:
+        _metrics_server = await serve_metrics(metrics, METRICS_HOST, METRICS_PORT)
+    if (os.getenv("NEON_API_KEY") or os.getenv("NEON_ORGS")) and _warm_up_task is None:
+        # In the background, so the MCP handshake never waits on reading the snapshot
+        _warm_up_task = asyncio.create_task(warm_up_client())
+    try:
+        yield
+    finally:
+        _active_sessions -= 1
+        if _active_sessions == 0:
+            await close_neon_client()
+            if _metrics_server is not None:
+                _metrics_server.close()
+                _metrics_server = None
+
+# Initialize FastMCP server
+mcp = FastMCP("neonorgdb", lifespan=lifespan, tool_serializer=metrics.timed_serializer(codec.dumps),
+              host="localhost", port=8000, debug=True)
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def prometheus_metrics(request: Request) -> PlainTextResponse:
+    """Prometheus scrape endpoint when serving over HTTP"""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+def http_app(transport: str = "streamable-http", stateless: bool = False):
+    """
+    ASGI app serving many concurrent MCP sessions over streamable HTTP or SSE.
+    
+    The app holds a session of its own while it runs, so the shared client, cache and
+    catalog outlive individual agent sessions instead of closing with the last one.
+    Stateless mode answers every request on its own, which lets several worker
+    processes serve one port.
+    """
+    mcp.settings.stateless_http = stateless
+    app = mcp.http_app(transport=transport)
+    serve_sessions = app.router.lifespan_context
+    
+    @asynccontextmanager
+    async def app_lifespan(app: Any) -> AsyncIterator[None]:
+        async with lifespan(mcp):
+            async with serve_sessions(app):
+                yield
+    
+    app.router.lifespan_context = app_lifespan
+    return app
+
+def worker_app():
+    """uvicorn factory for each --workers process; main.py passes the transport in NEON_TRANSPORT"""
+    return http_app(os.getenv("NEON_TRANSPORT", "streamable-http"), stateless=WORKERS > 1)
 
 @mcp.tool()
-async def list_projects(cursor: Optional[str] = None, limit: int = 10) -> Dict[str, Any]:
+@metrics.instrument_tool
+async def list_projects(cursor: Optional[str] = None, limit: int = 10, refresh: bool = False,
+                        fields: Optional[List[str]] = None, compact: bool = False,
+                        org: Optional[str] = None) -> Dict[str, Any]:
     """
     List all projects in the Neon organization.
     
     Args:
         cursor: Pagination cursor for fetching next page
         limit: Maximum number of projects to return (default: 10)
+        refresh: Bypass the response cache and fetch fresh data
+        fields: Only return these fields of each project; dotted paths select nested fields (e.g. "settings.allowed_ips.ips")
+        compact: Return listings as {"columns": [...], "rows": [[...], ...]} instead of lists of objects
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed)
     
     Returns:
         Dictionary containing projects list and pagination info
     """
-    client = get_neon_client()
-    return await client.get_projects(cursor=cursor, limit=limit)
+    client = get_neon_client(org)
+    return shape(await client.get_projects(cursor=cursor, limit=limit, refresh=refresh), fields, compact)
 
 @mcp.tool()
-async def get_project_details(project_id: str) -> Dict[str, Any]:
+@metrics.instrument_tool
+async def get_project_details(project_id: str, refresh: bool = False,
+                              fields: Optional[List[str]] = None, org: Optional[str] = None) -> Dict[str, Any]:
     """
     Get detailed information about a specific project.
     
     Args:
         project_id: The unique identifier of the project
+        refresh: Bypass the response cache and fetch fresh data
+        fields: Only return these fields; dotted paths select nested fields (e.g. "default_endpoint_settings.suspend_timeout_seconds")
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed)
     
     Returns:
         Dictionary containing project details
     """
-    client = get_neon_client()
-    return await client.get_project(project_id)
+    client = get_neon_client(org)
+    return shape(await client.get_project(project_id, refresh=refresh), fields)
 
 @mcp.tool()
-async def list_project_branches(project_id: str) -> Dict[str, Any]:
+@metrics.instrument_tool
+async def list_project_branches(project_id: str, refresh: bool = False, fields: Optional[List[str]] = None,
+                                compact: bool = False, org: Optional[str] = None) -> Dict[str, Any]:
     """
     List all branches for a specific project.
     
     Args:
         project_id: The unique identifier of the project
+        refresh: Bypass the response cache and fetch fresh data
+        fields: Only return these fields of each branch (e.g. ["id", "name", "parent_id"])
+        compact: Return listings as {"columns": [...], "rows": [[...], ...]} instead of lists of objects
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed)
     
     Returns:
         Dictionary containing branches list
     """
-    client = get_neon_client()
-    return await client.get_branches(project_id)
+    client = get_neon_client(org)
+    return shape(await client.get_branches(project_id, refresh=refresh), fields, compact)
 
 @mcp.tool()
-async def list_branch_databases(project_id: str, branch_id: str) -> Dict[str, Any]:
+@metrics.instrument_tool
+async def list_branch_databases(project_id: str, branch_id: str, refresh: bool = False,
+                                fields: Optional[List[str]] = None, compact: bool = False,
+                                org: Optional[str] = None) -> Dict[str, Any]:
     """
     List all databases for a specific branch.
     
     Args:
         project_id: The unique identifier of the project
         branch_id: The unique identifier of the branch
+        refresh: Bypass the response cache and fetch fresh data
+        fields: Only return these fields of each database (e.g. ["name", "owner_name"])
+        compact: Return listings as {"columns": [...], "rows": [[...], ...]} instead of lists of objects
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed)
     
     Returns:
         Dictionary containing databases list
     """
-    client = get_neon_client()
-    return await client.get_databases(project_id, branch_id)
+    client = get_neon_client(org)
+    return shape(await client.get_databases(project_id, branch_id, refresh=refresh), fields, compact)
 
 @mcp.tool()
-async def list_branch_roles(project_id: str, branch_id: str) -> Dict[str, Any]:
+@metrics.instrument_tool
+async def list_branch_roles(project_id: str, branch_id: str, refresh: bool = False,
+                            fields: Optional[List[str]] = None, compact: bool = False,
+                            org: Optional[str] = None) -> Dict[str, Any]:
     """
     List all roles for a specific branch.
     
     Args:
         project_id: The unique identifier of the project
         branch_id: The unique identifier of the branch
+        refresh: Bypass the response cache and fetch fresh data
+        fields: Only return these fields of each role (e.g. ["name", "protected"])
+        compact: Return listings as {"columns": [...], "rows": [[...], ...]} instead of lists of objects
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed)
     
     Returns:
         Dictionary containing roles list
     """
-    client = get_neon_client()
-    return await client.get_roles(project_id, branch_id)
+    client = get_neon_client(org)
+    return shape(await client.get_roles(project_id, branch_id, refresh=refresh), fields, compact)
 
 @mcp.tool()
-async def get_project_operations(project_id: str, cursor: Optional[str] = None, limit: int = 10) -> Dict[str, Any]:
+@metrics.instrument_tool
+async def get_project_operations(project_id: str, cursor: Optional[str] = None, limit: int = 10,
+                                 refresh: bool = False, fields: Optional[List[str]] = None,
+                                 compact: bool = False, org: Optional[str] = None) -> Dict[str, Any]:
     """
     Get recent operations for a specific project.
     
@@ -174,41 +1129,59 @@ async def get_project_operations(project_id: str, cursor: Optional[str] = None,
         project_id: The unique identifier of the project
         cursor: Pagination cursor for fetching next page
         limit: Maximum number of operations to return (default: 10)
+        refresh: Bypass the response cache and fetch fresh data
+        fields: Only return these fields of each operation (e.g. ["id", "action", "status"])
+        compact: Return listings as {"columns": [...], "rows": [[...], ...]} instead of lists of objects
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed)
     
     Returns:
         Dictionary containing operations list and pagination info
     """
-    client = get_neon_client()
-    return await client.get_operations(project_id, cursor=cursor, limit=limit)
+    client = get_neon_client(org)
+    operations = await client.get_operations(project_id, cursor=cursor, limit=limit, refresh=refresh)
+    return shape(operations, fields, compact)
 
 @mcp.tool()
-async def list_project_endpoints(project_id: str) -> Dict[str, Any]:
+@metrics.instrument_tool
+async def list_project_endpoints(project_id: str, refresh: bool = False, fields: Optional[List[str]] = None,
+                                 compact: bool = False, org: Optional[str] = None) -> Dict[str, Any]:
     """
     List all compute endpoints for a specific project.
     
     Args:
         project_id: The unique identifier of the project
+        refresh: Bypass the response cache and fetch fresh data
+        fields: Only return these fields of each endpoint (e.g. ["id", "host", "current_state"])
+        compact: Return listings as {"columns": [...], "rows": [[...], ...]} instead of lists of objects
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed)
     
     Returns:
         Dictionary containing endpoints list
     """
-    client = get_neon_client()
-    return await client.get_endpoints(project_id)
+    client = get_neon_client(org)
+    return shape(await client.get_endpoints(project_id, refresh=refresh), fields, compact)
 
 @mcp.tool()
-async def get_organization_info() -> Dict[str, Any]:
+@metrics.instrument_tool
+async def get_organization_info(refresh: bool = False, org: Optional[str] = None) -> Dict[str, Any]:
     """
     Get organization information and current user details.
     
+    Args:
+        refresh: Bypass the response cache and fetch fresh data
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed)
+    
     Returns:
         Dictionary containing organization and user information
     """
-    client = get_neon_client()
-    return await client.get_organization()
+    client = get_neon_client(org)
+    return await client.get_organization(refresh=refresh)
 
 @mcp.tool()
+@metrics.instrument_tool
 async def get_consumption_metrics(cursor: Optional[str] = None, limit: int = 10, 
-                                from_date: Optional[str] = None, to_date: Optional[str] = None) -> Dict[str, Any]:
+                                from_date: Optional[str] = None, to_date: Optional[str] = None,
+                                refresh: bool = False, org: Optional[str] = None) -> Dict[str, Any]:
     """
     Get consumption history and metrics for the organization.
     
@@ -217,46 +1190,545 @@ async def get_consumption_metrics(cursor: Optional[str] = None, limit: int = 10,
         limit: Maximum number of consumption records to return (default: 10)
         from_date: Start date for consumption data (ISO 8601 format)
         to_date: End date for consumption data (ISO 8601 format)
+        refresh: Bypass the response cache and fetch fresh data
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed)
     
     Returns:
         Dictionary containing consumption metrics and pagination info
     """
-    client = get_neon_client()
+    client = get_neon_client(org)
     return await client.get_consumption_history(cursor=cursor, limit=limit, 
-                                              from_date=from_date, to_date=to_date)
+                                              from_date=from_date, to_date=to_date,
+                                              refresh=refresh)
+
+@mcp.tool()
+@metrics.instrument_tool
+async def get_consumption_summary(from_date: Optional[str] = None, to_date: Optional[str] = None,
+                                  group_by: Optional[List[str]] = None, metric_names: Optional[List[str]] = None,
+                                  project_ids: Optional[List[str]] = None, refresh: bool = False,
+                                  org: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Summarize consumption over a date range, aggregated inside the server.
+    
+    The full range is fetched through pagination once; overlapping ranges queried later reuse the
+    days already fetched, and only the aggregated table is returned.
+    
+    Args:
+        from_date: First day to include (ISO 8601, default: 30 days before to_date)
+        to_date: Day after the last day to include (ISO 8601, default: tomorrow, i.e. through today)
+        group_by: Any of "project", "day", "week", "month" (default: ["project"]; [] for grand totals only)
+        metric_names: Metrics to sum, any of "active_time_seconds", "compute_time_seconds", "written_data_bytes",
+            "synthetic_storage_size_bytes", "data_storage_bytes_hour", "data_transfer_bytes" (default: all)
+        project_ids: Only include these projects
+        refresh: Discard previously fetched days and fetch the whole range again
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed)
+    
+    Returns:
+        Dictionary containing column names, one row per group, per-metric totals and the day ranges fetched
+    """
+    client = get_neon_client(org)
+    start, end = default_range(from_date, to_date)
+    
+    def fetch(lo: int, hi: int) -> AsyncIterator[Dict[str, Any]]:
+        return client.iter_project_consumption(day_timestamp(lo), day_timestamp(hi))
+    
+    return await client.consumption.query(
+        fetch, start, end,
+        group_by=["project"] if group_by is None else group_by,
+        metrics=metric_names,
+        project_ids=project_ids,
+        refresh=refresh,
+    )
 
 @mcp.tool()
-async def search_projects_by_name(name_pattern: str) -> List[Dict[str, Any]]:
+@metrics.instrument_tool
+async def search_projects_by_name(name_pattern: str, limit: Optional[int] = None, fuzzy: bool = False,
+                                  refresh: bool = False, fields: Optional[List[str]] = None,
+                                  compact: bool = False,
+                                  org: Optional[str] = None) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
     """
     Search for projects by name pattern.
     
+    Searches run against an in-memory project catalog that is re-indexed in the
+    background every NEON_CATALOG_REFRESH_SECONDS.
+    
     Args:
         name_pattern: Pattern to search for in project names (case-insensitive)
+        limit: Maximum number of projects to return (default: all matches)
+        fuzzy: Also match names that are similar to the pattern (trigram similarity)
+        refresh: Re-list projects from the Neon API before searching
+        fields: Only return these fields of each project (e.g. ["id", "name", "region_id"])
+        compact: Return listings as {"columns": [...], "rows": [[...], ...]} instead of lists of objects
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed),
+            or "*" to query every org in parallel
     
     Returns:
-        List of projects matching the name pattern
+        List of projects matching the name pattern, best matches first (a {"columns", "rows"} table when compact).
+        With org="*", a dictionary of the matches tagged with their "org" (each org's best first, interleaved)
+        and a per-org count or error
     """
-    client = get_neon_client()
-    all_projects = []
-    cursor = None
+    async def search(name: Optional[str]) -> List[Dict[str, Any]]:
+        catalog = await get_neon_client(name).ensure_catalog(refresh=refresh)
+        return catalog.search(name_pattern, limit=limit, fuzzy=fuzzy)
     
-    # Fetch all projects (with pagination)
-    while True:
-        result = await client.get_projects(cursor=cursor, limit=100)
-        projects = result.get("projects", [])
-        all_projects.extend(projects)
+    if org != ALL_ORGS:
+        return shape(await search(org), fields, compact)
+    results, errors = await across_orgs(org_names(), search)
+    projects = interleave([tag_org(found, name) for name, found in results.items()])[:limit]
+    return {"projects": shape(projects, fields, compact), "orgs": org_summary(results, errors, len)}
+
+@mcp.tool()
+@metrics.instrument_tool
+async def find_projects(project_ids: Optional[List[str]] = None, region_id: Optional[str] = None,
+                        created_after: Optional[str] = None, created_before: Optional[str] = None,
+                        limit: int = 100, refresh: bool = False, fields: Optional[List[str]] = None,
+                        compact: bool = False,
+                        org: Optional[str] = None) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Find projects by id, region and creation date using the project catalog.
+    
+    Args:
+        project_ids: Only return projects with these identifiers
+        region_id: Only return projects in this region (e.g. aws-us-east-2)
+        created_after: Only return projects created after this time (ISO 8601 format)
+        created_before: Only return projects created before this time (ISO 8601 format)
+        limit: Maximum number of projects to return (default: 100)
+        refresh: Re-list projects from the Neon API before filtering
+        fields: Only return these fields of each project; dotted paths select nested fields (e.g. "settings.allowed_ips.ips")
+        compact: Return listings as {"columns": [...], "rows": [[...], ...]} instead of lists of objects
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed),
+            or "*" to query every org in parallel
+    
+    Returns:
+        List of matching projects, oldest first (a {"columns", "rows"} table when compact). With org="*",
+        a dictionary of the matches across orgs tagged with their "org" and a per-org count or error
+    """
+    async def find(name: Optional[str]) -> List[Dict[str, Any]]:
+        catalog = await get_neon_client(name).ensure_catalog(refresh=refresh)
+        return catalog.find(project_ids=project_ids, region_id=region_id, created_after=created_after,
+                            created_before=created_before, limit=limit)
+    
+    if org != ALL_ORGS:
+        return shape(await find(org), fields, compact)
+    results, errors = await across_orgs(org_names(), find)
+    projects = sorted((project for name, found in results.items() for project in tag_org(found, name)),
+                      key=lambda project: project.get("created_at") or "")[:limit]
+    return {"projects": shape(projects, fields, compact), "orgs": org_summary(results, errors, len)}
+
+@mcp.tool()
+@metrics.instrument_tool
+async def find_project_operations(project_id: str, status: Optional[str] = None, action: Optional[str] = None,
+                                  limit: int = 20, max_scanned: int = 1000,
+                                  refresh: bool = False, fields: Optional[List[str]] = None,
+                                  compact: bool = False, org: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Find a project's most recent operations matching a status and/or action.
+    
+    Pages through the operations feed only until enough matches are found.
+    
+    Args:
+        project_id: The unique identifier of the project
+        status: Only return operations in this status (e.g. running, finished, failed)
+        action: Only return operations of this action (e.g. create_branch, start_compute)
+        limit: Maximum number of matching operations to return (default: 20)
+        max_scanned: Stop after scanning this many operations (default: 1000)
+        refresh: Bypass the response cache and fetch fresh data
+        fields: Only return these fields of each operation (e.g. ["id", "action", "created_at"])
+        compact: Return listings as {"columns": [...], "rows": [[...], ...]} instead of lists of objects
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed)
+    
+    Returns:
+        Dictionary containing matching operations and how many were scanned
+    """
+    client = get_neon_client(org)
+    matches = []
+    scanned = 0
+    async with aclosing(client.iter_operations(project_id, max_items=max_scanned, refresh=refresh)) as operations:
+        async for operation in operations:
+            scanned += 1
+            if status is not None and operation.get("status") != status:
+                continue
+            if action is not None and operation.get("action") != action:
+                continue
+            matches.append(operation)
+            if len(matches) >= limit:
+                break
+    return shape({"operations": matches, "scanned": scanned}, fields, compact)
+
+@mcp.tool()
+@metrics.instrument_tool
+async def wait_for_operations(project_id: str, operation_ids: List[str], timeout_seconds: float = 60,
+                              org: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Wait until operations reach a terminal state (finished, failed, error, cancelled, skipped).
+    
+    Use this instead of polling get_project_operations. Concurrent waits on the same project share
+    one poller, which checks often at first and backs off while nothing changes.
+    
+    Args:
+        project_id: The project the operations belong to
+        operation_ids: Operation ids to wait for
+        timeout_seconds: Return after this many seconds even if some are still running
+            (default: 60, capped by NEON_WAIT_MAX_SECONDS)
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed)
+    
+    Returns:
+        Dictionary containing the latest state of each operation ("status": "not_found" for unknown
+        ids, null if not seen yet), the ids still pending, whether all are done and the time waited
+    """
+    if not operation_ids:
+        raise ValueError("operation_ids must not be empty")
+    client = get_neon_client(org)
+    timeout = min(max(timeout_seconds, 1.0), WAIT_MAX_SECONDS)
+    started = time.monotonic()
+    states = await client.watchers.wait(project_id, operation_ids, timeout)
+    pending = [op_id for op_id, state in states.items() if (state or {}).get("status") not in FINAL_STATUSES]
+    return {
+        "operations": [state or {"id": op_id, "status": None} for op_id, state in states.items()],
+        "pending": pending,
+        "done": not pending,
+        "waited_seconds": round(time.monotonic() - started, 3),
+    }
+
+@mcp.tool()
+@metrics.instrument_tool
+async def batch_lookup(requests: List[Dict[str, Any]], max_concurrency: Optional[int] = None,
+                       fields: Optional[List[str]] = None, compact: bool = False,
+                       refresh: bool = False, org: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run many project, branch, database, role, endpoint and operation lookups in one call.
+    
+    Lookups run concurrently; results are returned in request order and a failed lookup
+    reports its own error instead of failing the whole batch.
+    
+    Args:
+        requests: Lookups such as {"op": "project", "project_id": "..."} or
+            {"op": "databases", "project_id": "...", "branch_id": "..."}. "op" is one of "project",
+            "branches", "databases", "roles", "endpoints", "operations"; each request may also set
+            its own "fields" and "compact"
+        max_concurrency: Maximum concurrent Neon API calls (default: NEON_BATCH_CONCURRENCY or 8)
+        fields: Only return these fields of each result, for requests that do not set their own (e.g. ["id", "name"])
+        compact: Return listings as {"columns": [...], "rows": [[...], ...]} tables
+        refresh: Bypass the response cache and fetch fresh data
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed)
+    
+    Returns:
+        Dictionary containing one result or error per request, in order, and success/failure counts
+    """
+    if len(requests) > BATCH_MAX_REQUESTS:
+        raise ValueError(f"A batch may hold at most {BATCH_MAX_REQUESTS} requests, got {len(requests)}")
+    runner = BatchRunner(
+        get_neon_client(org),
+        max_concurrency=max_concurrency or BATCH_CONCURRENCY,
+        refresh=refresh,
+        fields=fields,
+        compact=compact,
+    )
+    return await runner.run(requests)
+
+@mcp.tool()
+@metrics.instrument_tool
+async def get_organization_inventory(include: Optional[List[str]] = None, project_ids: Optional[List[str]] = None,
+                                     exclude_project_ids: Optional[List[str]] = None,
+                                     name_pattern: Optional[str] = None, max_concurrency: Optional[int] = None,
+                                     refresh: bool = False, org: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Map the whole organization in one call: projects with their branches, databases, roles and endpoints.
+    
+    Branch, database, role and endpoint listings are fetched concurrently inside the server.
+    
+    Args:
+        include: Resources to crawl, any of "branches", "databases", "roles", "endpoints" (default: all)
+        project_ids: Only crawl these projects
+        exclude_project_ids: Skip these projects
+        name_pattern: Only crawl projects whose name contains this pattern (case-insensitive)
+        max_concurrency: Maximum concurrent Neon API calls (default: NEON_INVENTORY_CONCURRENCY or 8)
+        refresh: Bypass the response cache and fetch fresh data
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed),
+            or "*" to query every org in parallel
+    
+    Returns:
+        Dictionary containing the project tree, resource counts and any per-resource errors. With org="*",
+        every org is crawled concurrently (each within its own rate budget); projects and errors carry
+        their "org", counts are summed and "orgs" holds each org's own counts or error
+    """
+    async def crawl(name: Optional[str]) -> Dict[str, Any]:
+        client = get_neon_client(name)
+        catalog = await client.ensure_catalog(refresh=refresh)
+        if name_pattern is not None:
+            projects = catalog.search(name_pattern)
+        else:
+            projects = catalog.find()
+        projects = select_projects(projects, project_ids=project_ids, exclude_project_ids=exclude_project_ids)
         
-        cursor = result.get("pagination", {}).get("cursor")
-        if not cursor:
-            break
+        crawler = InventoryCrawler(
+            client,
+            include=INVENTORY_RESOURCES if include is None else include,
+            max_concurrency=max_concurrency or INVENTORY_CONCURRENCY,
+            refresh=refresh,
+        )
+        # Interactive tool calls from other sessions are admitted ahead of the crawl
+        with bulk_priority():
+            return await crawler.crawl(projects)
+    
+    if org != ALL_ORGS:
+        return await crawl(org)
+    results, errors = await across_orgs(org_names(), crawl)
+    summary: Dict[str, int] = {}
+    for result in results.values():
+        for key, value in result["summary"].items():
+            summary[key] = summary.get(key, 0) + value
+    orgs: Dict[str, Any] = {name: result["summary"] for name, result in results.items()}
+    orgs.update({name: {"error": error} for name, error in errors.items()})
+    return {
+        "projects": [project for name, result in results.items() for project in tag_org(result["projects"], name)],
+        "summary": summary,
+        "errors": [error for name, result in results.items() for error in tag_org(result["errors"], name)],
+        "orgs": orgs,
+    }
+
+@mcp.tool()
+@metrics.instrument_tool
+async def sync_organization_state(full: bool = False, org: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Bring the local organization model up to date from each project's operations feed.
+    
+    Only projects whose listing entry changed or whose poll interval elapsed are checked, and
+    only the branches or endpoints touched by new operations are re-fetched.
+    
+    Args:
+        full: Check every project's operations feed regardless of its poll interval
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed)
+    
+    Returns:
+        Dictionary with the number of projects added, removed, polled and skipped and the
+        operations applied in this pass, plus cumulative sync counters
+    """
+    client = get_neon_client(org)
+    summary = await client.org_sync.sync(full=full)
+    if SYNC_INTERVAL > 0:
+        client.org_sync.start(SYNC_INTERVAL)
+    return {**summary, "sync": client.org_sync.stats()}
+
+@mcp.tool()
+@metrics.instrument_tool
+async def get_synced_org_state(project_id: Optional[str] = None, org: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Read projects with their branches and endpoints from the locally synced organization model.
+    
+    Runs a sync pass first if the model has never been synced; otherwise makes no API calls.
     
-    # Filter projects by name pattern
-    matching_projects = [
-        project for project in all_projects 
-        if name_pattern.lower() in project.get("name", "").lower()
-    ]
+    Args:
+        project_id: Only return this project
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed)
+    
+    Returns:
+        Dictionary containing the project tree and sync counters, including when the model was last synced
+    """
+    client = await _synced_client(org)
+    return {"projects": client.org_sync.snapshot(project_id), "sync": client.org_sync.stats()}
+
+async def _synced_client(org: Optional[str]) -> NeonAPIClient:
+    """The org's client, after a first sync pass if its local model has never been synced"""
+    client = get_neon_client(org)
+    if not client.org_sync.synced:
+        await client.org_sync.sync()
+        if SYNC_INTERVAL > 0:
+            client.org_sync.start(SYNC_INTERVAL)
+    return client
+
+@mcp.tool()
+@metrics.instrument_tool
+async def get_branch_lineage(project_id: str, branch_id: Optional[str] = None, max_depth: Optional[int] = None,
+                             org: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Get a branch's ancestry and descendants from the locally synced branch tree.
+    
+    Runs a sync pass first if the model has never been synced; otherwise makes no API calls.
+    
+    Args:
+        project_id: The ID of the project
+        branch_id: The branch to trace (default: the whole project tree from its root branches)
+        max_depth: Only return descendants up to this many levels below the branch
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed)
+    
+    Returns:
+        Dictionary containing the branch, its ancestors from parent up to the root, and its descendants
+        in tree order with their depth below it, each with its endpoints and child count
+    """
+    client = await _synced_client(org)
+    topology = client.topology.project(project_id)
+    if topology is None:
+        raise ValueError(f"Project {project_id!r} is not in the synced organization model")
+    if branch_id is not None and branch_id not in topology:
+        raise ValueError(f"Branch {branch_id!r} is not in project {project_id!r}")
+    return {
+        "project_id": project_id,
+        "default_branch_id": topology.default_branch_id,
+        "branch": topology.describe(branch_id) if branch_id is not None else None,
+        "ancestors": [topology.describe(ancestor_id) for ancestor_id in topology.ancestors(branch_id)]
+        if branch_id is not None else [],
+        "descendants": [{**topology.describe(descendant_id), "depth": depth}
+                        for descendant_id, depth in topology.descendants(branch_id, max_depth)],
+        "synced_at": client.org_sync.last_sync_at,
+    }
+
+@mcp.tool()
+@metrics.instrument_tool
+async def find_branches(older_than: Optional[str] = None, leaves_only: bool = False,
+                        without_active_endpoint: bool = False, include_default: bool = False,
+                        project_ids: Optional[List[str]] = None, limit: Optional[int] = None,
+                        org: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Find branches across every project in the locally synced branch trees, e.g. for cleanup audits.
+    
+    Runs a sync pass first if the model has never been synced; otherwise makes no API calls.
+    
+    Args:
+        older_than: Only branches created before this age ("30d", "12h", "2w") or ISO 8601 date/timestamp
+        leaves_only: Only branches with no child branches
+        without_active_endpoint: Only branches with no active or starting compute endpoint
+        include_default: Also match each project's default branch (excluded by default)
+        project_ids: Only search these projects
+        limit: Maximum number of branches to return (oldest first)
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed),
+            or "*" to query every org in parallel
+    
+    Returns:
+        Dictionary containing matching branches oldest first, each with its project, parent, child count
+        and endpoints, the total match count and the number of projects searched. With org="*", branches
+        carry their "org" and "orgs" holds each org's match count or error
+    """
+    cutoff = parse_cutoff(older_than) if older_than is not None else None
+    
+    async def find(name: Optional[str]) -> Dict[str, Any]:
+        client = await _synced_client(name)
+        branches = client.topology.find(older_than=cutoff, leaves_only=leaves_only,
+                                        without_active_endpoint=without_active_endpoint,
+                                        include_default=include_default, project_ids=project_ids)
+        return {"branches": branches, "projects": client.topology.last_searched}
+    
+    if org != ALL_ORGS:
+        result = await find(org)
+        branches, projects, orgs = result["branches"], result["projects"], None
+    else:
+        results, errors = await across_orgs(org_names(), find)
+        branches = [branch for name, result in results.items() for branch in tag_org(result["branches"], name)]
+        branches.sort(key=lambda branch: (branch["created_at"] or "", branch["id"]))
+        projects = sum(result["projects"] for result in results.values())
+        orgs = org_summary(results, errors, lambda result: len(result["branches"]))
+    response: Dict[str, Any] = {
+        "branches": branches[:limit] if limit is not None else branches,
+        "count": len(branches),
+        "projects_searched": projects,
+    }
+    if orgs is not None:
+        response["orgs"] = orgs
+    return response
+
+@mcp.tool()
+@metrics.instrument_tool
+async def query_branch_database(project_id: str, branch_id: str, database: str, sql: str,
+                                params: Optional[List[Any]] = None, role: Optional[str] = None, max_rows: int = 100,
+                                timeout_seconds: Optional[float] = None, org: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run a read-only SQL query on a branch database through a pooled connection to its compute endpoint.
+    
+    The query runs in a read-only transaction, so it cannot change data, and only statements that
+    return rows (SELECT, WITH, EXPLAIN, ...) are accepted. Starts the branch's compute if it is suspended.
+    
+    Args:
+        project_id: The ID of the project
+        branch_id: The ID of the branch
+        database: Name of the database to query
+        sql: One SQL statement, with $1, $2, ... placeholders for params
+        params: Values for the statement's placeholders
+        role: Role to connect as (default: the database owner)
+        max_rows: Maximum number of rows to return from this call (at most NEON_SQL_MAX_ROWS)
+        timeout_seconds: Statement timeout, greater than 0 (default and maximum: NEON_SQL_STATEMENT_TIMEOUT_SECONDS)
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed)
+    
+    Returns:
+        Dictionary containing the column names, rows as lists of values, the role used, and a "cursor"
+        to pass to fetch_query_rows when more rows remain (null once the result is exhausted)
+    """
+    client = get_neon_client(org)
+    if role is None:
+        databases = (await client.get_databases(project_id, branch_id)).get("databases", [])
+        role = next((item.get("owner_name") for item in databases if item.get("name") == database), None)
+        if role is None:
+            raise ValueError(f"Database {database!r} not found on branch {branch_id!r}")
+    result = await client.sql.query((project_id, branch_id, database, role), sql, params,
+                                    max_rows=min(max_rows, SQL_MAX_ROWS), timeout=timeout_seconds)
+    return {**result, "role": role}
+
+@mcp.tool()
+@metrics.instrument_tool
+async def fetch_query_rows(cursor: str, max_rows: int = 100, close: bool = False,
+                           org: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Read the next rows of a query_branch_database result.
+    
+    Rows are read from the open server-side cursor in chunks. Cursors not read for
+    NEON_SQL_CURSOR_IDLE_SECONDS are closed.
+    
+    Args:
+        cursor: The "cursor" returned by query_branch_database or a previous fetch_query_rows call
+        max_rows: Maximum number of rows to return (at most NEON_SQL_MAX_ROWS)
+        close: Close the cursor without reading further rows
+        org: Organization the query ran in, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed)
+    
+    Returns:
+        Dictionary containing the column names, the next rows and the cursor to continue from
+        (null once the result is exhausted), or whether the cursor was closed
+    """
+    client = get_neon_client(org)
+    if close:
+        return {"cursor": cursor, "closed": await client.sql.close_cursor(cursor)}
+    return await client.sql.fetch(cursor, max_rows=min(max_rows, SQL_MAX_ROWS))
+
+@mcp.tool()
+@metrics.instrument_tool
+async def get_diagnostics(output_format: str = "json") -> Union[Dict[str, Any], str]:
+    """
+    Get latency histograms, counters and in-flight gauges for tools and Neon API calls.
+    
+    Args:
+        output_format: "json" for percentile summaries, or "prometheus" for the text exposition format
+    
+    Returns:
+        Dictionary with per-tool and per-route latency percentiles, status code, retry and cache event
+        counters and in-flight gauges, or the same metrics as Prometheus text
+    """
+    if output_format == "prometheus":
+        return metrics.render_prometheus()
+    if output_format != "json":
+        raise ValueError('output_format must be "json" or "prometheus"')
+    return {**metrics.snapshot(), "slow_call_threshold_ms": SLOW_CALL_MS}
+
+@mcp.tool()
+@metrics.instrument_tool
+async def get_cache_stats(org: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Get response cache statistics for the Neon API client.
+    
+    Args:
+        org: Organization to query, one of NEON_ORGS (default: NEON_DEFAULT_ORG or the first listed),
+            or "*" to query every org in parallel
+    
+    Returns:
+        Dictionary containing hit/miss counters, evictions, occupancy and TTLs per endpoint class,
+        coalesced in-flight requests, the size and age of the project catalog, request
+        scheduler counters, circuit breaker states, operation watcher polls, branch topology index size, SQL pools, prefetch hit rates and on-disk snapshot load/save timings.
+        With org="*", the same statistics keyed by org
+    """
+    async def stats(name: Optional[str]) -> Dict[str, Any]:
+        return get_neon_client(name).stats()
     
-    return matching_projects
+    if org != ALL_ORGS:
+        return await stats(org)
+    results, errors = await across_orgs(org_names(), stats)
+    return {"orgs": {**results, **{name: {"error": error} for name, error in errors.items()}}}
 
 if __name__ == "__main__":
     mcp.run()
\ No newline at end of file
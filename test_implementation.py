@@ -27,7 +27,7 @@ async def test_tools_registration():
     from neonorgdb import mcp
     
     # Get all registered tools
-    tools = mcp._tools
+    tools = await mcp.get_tools()
     tool_names = list(tools.keys())
     
     expected_tools = [
@@ -40,7 +40,21 @@ async def test_tools_registration():
         'list_project_endpoints',
         'get_organization_info',
         'get_consumption_metrics',
-        'search_projects_by_name'
+        'search_projects_by_name',
+        'get_cache_stats',
+        'find_projects',
+        'get_organization_inventory',
+        'find_project_operations',
+        'wait_for_operations',
+        'sync_organization_state',
+        'get_synced_org_state',
+        'get_branch_lineage',
+        'find_branches',
+        'get_consumption_summary',
+        'get_diagnostics',
+        'query_branch_database',
+        'fetch_query_rows',
+        'batch_lookup'
     ]
     
     print(f"✓ Found {len(tool_names)} registered tools:")
@@ -81,6 +95,1381 @@ async def test_environment_validation():
     
     return True
 
+async def test_response_cache():
+    """Test TTL expiry and LRU eviction of the response cache"""
+    from neon_cache import ResponseCache, endpoint_class, make_cache_key
+    
+    now = [0.0]
+    cache = ResponseCache(max_entries=2, ttls={"branches": 30.0, "project": 60.0}, clock=lambda: now[0])
+    
+    assert endpoint_class("/projects") == "projects"
+    assert endpoint_class("/projects/p1") == "project"
+    assert endpoint_class("/projects/p1/branches/b1/roles") == "roles"
+    assert endpoint_class("/users/me") == "organization"
+    
+    branches = make_cache_key("/projects/p1/branches")
+    cache.set(branches, {"branches": []}, 10)
+    assert cache.get(branches) == {"branches": []}
+    
+    now[0] = 31.0
+    assert cache.get(branches) is None
+    print("✓ Entries expire after their endpoint class TTL")
+    
+    for project_id in ("p1", "p2", "p3"):
+        cache.set(make_cache_key(f"/projects/{project_id}"), {"id": project_id}, 10)
+    assert cache.get(make_cache_key("/projects/p1")) is None
+    assert cache.get(make_cache_key("/projects/p3")) == {"id": "p3"}
+    print(f"✓ LRU eviction respects max_entries: {cache.stats()['evictions']} evicted")
+    return True
+
+async def test_request_coalescing():
+    """Test that identical concurrent calls share one upstream request"""
+    from neon_cache import SingleFlight
+    
+    flight = SingleFlight()
+    upstream_calls = 0
+    
+    async def fetch():
+        nonlocal upstream_calls
+        upstream_calls += 1
+        await asyncio.sleep(0.01)
+        return {"branches": []}
+    
+    results = await asyncio.gather(*(flight.run(("GET", "/projects/p1/branches"), fetch) for _ in range(10)))
+    assert upstream_calls == 1
+    assert all(result == {"branches": []} for result in results)
+    assert flight.stats()["coalesced"] == 9
+    print("✓ 10 concurrent identical calls made 1 upstream request")
+    return True
+
+async def test_project_catalog():
+    """Test indexed name, region and creation-date lookups"""
+    from neon_catalog import ProjectCatalog
+    
+    catalog = ProjectCatalog()
+    catalog.load([
+        {"id": "p1", "name": "billing-api", "region_id": "aws-us-east-2", "created_at": "2024-01-10T00:00:00Z"},
+        {"id": "p2", "name": "Billing", "region_id": "aws-eu-central-1", "created_at": "2024-03-01T00:00:00Z"},
+        {"id": "p3", "name": "analytics", "region_id": "aws-us-east-2", "created_at": "2024-05-20T00:00:00Z"},
+    ])
+    
+    assert [p["id"] for p in catalog.search("BILL")] == ["p2", "p1"]
+    assert [p["id"] for p in catalog.search("bill", limit=1)] == ["p2"]
+    assert catalog.search("bilingg") == []
+    assert [p["id"] for p in catalog.search("bilingg", fuzzy=True)] == ["p2", "p1"]
+    print("✓ Name search is case-insensitive, ranked and supports fuzzy matching")
+    
+    assert [p["id"] for p in catalog.find(region_id="aws-us-east-2")] == ["p1", "p3"]
+    assert [p["id"] for p in catalog.find(created_after="2024-02-01", created_before="2024-06-01")] == ["p2", "p3"]
+    assert catalog.get("p3")["name"] == "analytics"
+    print("✓ Region, id and creation-date lookups use the catalog indexes")
+    return True
+
+async def test_organization_inventory():
+    """Test that the inventory crawl stays within its concurrency bound and reports failures per resource"""
+    import json
+    import httpx
+    from fastmcp import Client
+    from neon_mock import MockNeonConfig, MockNeonServer
+    import neonorgdb
+    
+    mock = MockNeonServer(MockNeonConfig(projects=4, branches_per_project=3, latency=0.0, latency_jitter=0.0))
+    failing = mock.org.branches[mock.org.projects[1]["id"]][2]["id"]
+    in_flight = peak = 0
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            await asyncio.sleep(0.005)
+            if request.url.path.endswith(f"/branches/{failing}/roles"):
+                return httpx.Response(500, json={"message": "internal error"})
+            status, body, headers = await mock._respond(request.method, request.url.raw_path.decode(),
+                                                        {k.lower(): v for k, v in request.headers.items()})
+            return httpx.Response(status, json=body, headers=headers)
+        finally:
+            in_flight -= 1
+    
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    try:
+        with patch.dict(os.environ, {"NEON_API_KEY": "test-api-key"}), patch.object(neonorgdb, "MAX_RETRIES", 0):
+            await neonorgdb.close_neon_client()
+            neonorgdb._neon_client = neonorgdb.NeonAPIClient("test-api-key", http_client=http_client,
+                                                             base_url="http://mock/api/v2")
+            neonorgdb._neon_client.prefetcher = None
+            neonorgdb._neon_client.scheduler.bucket.rate = 0
+            try:
+                await neonorgdb._neon_client.ensure_catalog()
+                peak = 0
+                async with Client(neonorgdb.mcp) as client:
+                    inventory = json.loads((await client.call_tool(
+                        "get_organization_inventory", {"max_concurrency": 3}))[0].text)
+            finally:
+                await neonorgdb.close_neon_client()
+    finally:
+        await http_client.aclose()
+    
+    assert 1 < peak <= 3, peak
+    print(f"✓ Inventory crawl kept at most {peak} of 3 allowed Neon API calls in flight")
+    summary = inventory["summary"]
+    assert summary["projects"] == 4 and summary["branches"] == 12 and summary["databases"] == 24
+    assert summary["roles"] == 22 and summary["upstream_calls"] == 4 + 4 + 12 * 2
+    assert inventory["errors"] == [{"project_id": mock.org.projects[1]["id"], "branch_id": failing,
+                                    "resource": "roles", "error": inventory["errors"][0]["error"]}]
+    assert "500" in inventory["errors"][0]["error"]
+    branch = next(branch for project in inventory["projects"] for branch in project["branches"]
+                  if branch["id"] == failing)
+    assert branch["roles"] == [] and len(branch["databases"]) == 2
+    print("✓ A failed role listing was reported for its branch while the rest of the crawl completed")
+    return True
+
+async def test_request_scheduler():
+    """Test that interactive requests are admitted ahead of bulk crawls"""
+    from neon_scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE, RequestScheduler, parse_retry_after
+    
+    scheduler = RequestScheduler(rate=0, burst=1, max_concurrency=1)
+    order = []
+    
+    async def request(name, priority):
+        async with scheduler.slot(priority):
+            order.append(name)
+            await asyncio.sleep(0.01)
+    
+    await asyncio.gather(
+        request("bulk-1", PRIORITY_BULK),
+        request("bulk-2", PRIORITY_BULK),
+        request("bulk-3", PRIORITY_BULK),
+        request("interactive", PRIORITY_INTERACTIVE),
+    )
+    assert order == ["bulk-1", "interactive", "bulk-2", "bulk-3"], order
+    print("✓ Interactive request jumped the bulk queue")
+    
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", now=1445412470.0) == 10.0
+    print("✓ Retry-After parsed as seconds and HTTP date")
+    return True
+
+async def test_paginated_streaming():
+    """Test next-page prefetch, its cancellation on early exit and find_project_operations paging"""
+    import json
+    from contextlib import aclosing
+    from fastmcp import Client
+    from neon_mock import MockNeonConfig, MockNeonServer
+    import neonorgdb
+    
+    client = neonorgdb.NeonAPIClient("test-api-key")
+    requested, cancelled = [], []
+    
+    async def fetch_page(cursor):
+        page = int(cursor or 0)
+        requested.append(page)
+        try:
+            await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            cancelled.append(page)
+            raise
+        items = [{"id": page * 10 + i} for i in range(10 if page < 4 else 3)]
+        return {"items": items, "pagination": {"cursor": str(page + 1)}}
+    
+    items = []
+    async for item in client._paginate(fetch_page, "items", 10):
+        if item["id"] == 0:
+            # The second page is requested before the first one is consumed
+            await asyncio.sleep(0)
+            assert requested == [0, 1]
+        items.append(item["id"])
+    assert items == list(range(43)) and requested == [0, 1, 2, 3, 4] and cancelled == []
+    print("✓ Streamed 5 pages with 5 page requests, each prefetched while the previous page was consumed")
+    
+    requested.clear()
+    async with aclosing(client._paginate(fetch_page, "items", 10)) as stream:
+        async for item in stream:
+            if item["id"] == 12:
+                # Let the prefetch of the third page start before stopping
+                await asyncio.sleep(0)
+                break
+    await asyncio.sleep(0)
+    pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task() and not task.done()]
+    assert requested == [0, 1, 2] and cancelled == [2] and pending == []
+    assert [item async for item in client._paginate(fetch_page, "items", 10, max_items=15)][-1] == {"id": 14}
+    print("✓ Breaking out early cancelled the pending prefetch and left no task behind")
+    await client.aclose()
+    
+    async with MockNeonServer(MockNeonConfig(projects=1, operations_per_project=450, latency=0.0,
+                                             latency_jitter=0.0)) as server:
+        project_id = server.org.projects[0]["id"]
+        with patch.dict(os.environ, {"NEON_API_KEY": "test-api-key"}):
+            await neonorgdb.close_neon_client()
+            neonorgdb._neon_client = neonorgdb.NeonAPIClient("test-api-key", base_url=server.base_url)
+            neonorgdb._neon_client.prefetcher = None
+            try:
+                async with Client(neonorgdb.mcp) as mcp_client:
+                    async def find(arguments):
+                        server.reset_counters()
+                        result = json.loads((await mcp_client.call_tool(
+                            "find_project_operations", {"project_id": project_id, "refresh": True, **arguments}))[0].text)
+                        return result, server.requests_by_route.get("/projects/{id}/operations", 0)
+                    
+                    early, early_pages = await find({"limit": 2})
+                    capped, capped_pages = await find({"action": "no_such_action", "max_scanned": 150})
+                    full, full_pages = await find({"action": "no_such_action"})
+            finally:
+                await neonorgdb.close_neon_client()
+    
+    newest = [operation["id"] for operation in server.org.operations[project_id][:2]]
+    assert [operation["id"] for operation in early["operations"]] == newest and early["scanned"] == 2
+    # The first page plus at most the one prefetched behind it
+    assert early_pages <= 2
+    assert capped["scanned"] == 150 and capped["operations"] == [] and capped_pages == 2
+    assert full["scanned"] == 450 and full_pages == 5
+    print(f"✓ find_project_operations read {early_pages}, {capped_pages} and {full_pages} pages "
+          "for an early match, a 150-item cap and a full scan")
+    return True
+
+async def test_mock_neon_api():
+    """Test the client against the local mock Neon API, including injected 429s"""
+    from neon_mock import MockNeonConfig, MockNeonServer
+    from neonorgdb import NeonAPIClient
+    
+    config = MockNeonConfig(projects=250, latency=0.0, latency_jitter=0.0, error_rate_429=0.2, retry_after=0.01)
+    async with MockNeonServer(config) as server:
+        client = NeonAPIClient("test-api-key", base_url=server.base_url)
+        try:
+            projects = await client.get_all_projects()
+            assert len(projects) == 250
+            print(f"✓ Paginated {len(projects)} projects in {server.requests_total} upstream calls "
+                  f"({server.errors_injected.get(429, 0)} rate limited)")
+            
+            project_id = projects[0]["id"]
+            await asyncio.gather(*(client.get_branches(project_id) for _ in range(5)))
+            assert server.requests_by_route["/projects/{id}/branches"] <= 1 + server.errors_injected.get(429, 0)
+            print("✓ Repeated branch listings were served from the cache")
+        finally:
+            await client.aclose()
+    return True
+
+async def test_conditional_revalidation():
+    """Test that expired cache entries are revalidated instead of re-downloaded"""
+    from neon_mock import MockNeonConfig, MockNeonServer
+    from neonorgdb import NeonAPIClient
+    
+    for etags in (True, False):
+        async with MockNeonServer(MockNeonConfig(projects=2, latency=0.0, etags=etags)) as server:
+            client = NeonAPIClient("test-api-key", base_url=server.base_url)
+            client.cache.ttls["branches"] = 0.01
+            endpoint = f"/projects/{server.org.projects[0]['id']}/branches"
+            try:
+                first, first_version = await client.get_versioned(endpoint)
+                await asyncio.sleep(0.02)
+                second, second_version = await client.get_versioned(endpoint)
+            finally:
+                await client.aclose()
+            assert first is second and first_version == second_version
+            stats = client.cache_stats()
+            if etags:
+                assert server.not_modified == 1 and stats["not_modified"] == 1
+                print("✓ ETag validator turned the refetch into a 304")
+            else:
+                assert stats["unchanged"] == 1
+                print("✓ Content hash detected an unchanged body without validators")
+    return True
+
+async def test_org_sync():
+    """Test that incremental sync only re-fetches what the operations feed says changed"""
+    from neon_mock import MockNeonConfig, MockNeonServer
+    from neon_sync import OrgSync
+    from neonorgdb import NeonAPIClient
+    
+    async with MockNeonServer(MockNeonConfig(projects=5, operations_per_project=10, latency=0.0)) as server:
+        client = NeonAPIClient("test-api-key", base_url=server.base_url)
+        sync = OrgSync(client, min_interval=0.0)
+        try:
+            first = await sync.sync()
+            assert first["added"] == 5 and len(sync.snapshot()) == 5
+            assert client.catalog.loaded
+            
+            server.reset_counters()
+            quiet = await sync.sync()
+            assert quiet["operations_applied"] == 0 and quiet["polled"] == 5
+            assert "/projects/{id}/branches" not in server.requests_by_route
+            assert "/projects/{id}/endpoints" not in server.requests_by_route
+            print("✓ Quiet pass only re-checked the project listing and operations feeds")
+            
+            project_id = server.org.projects[0]["id"]
+            endpoint = server.org.endpoints[project_id][0]
+            endpoint["current_state"] = "suspended"
+            server.org.record_operation(project_id, "suspend_compute", branch_id=endpoint["branch_id"],
+                                        endpoint_id=endpoint["id"])
+            server.reset_counters()
+            changed = await sync.sync()
+        finally:
+            await client.aclose()
+    assert changed["operations_applied"] == 1
+    assert server.requests_by_route.get("/projects/{id}/endpoints") == 1
+    assert "/projects/{id}/branches" not in server.requests_by_route
+    synced = sync.snapshot(project_id)[0]
+    assert synced["endpoints"][0]["current_state"] == "suspended"
+    print("✓ New compute operation refreshed only the affected project's endpoints")
+    return True
+
+async def test_snapshot_warm_start():
+    """Test that a snapshot serves the catalog and cached responses before any API call"""
+    import tempfile
+    import time
+    from neon_mock import MockNeonConfig, MockNeonServer
+    import neonorgdb
+    from neonorgdb import NeonAPIClient
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "snapshot.jsonl.gz")
+        async with MockNeonServer(MockNeonConfig(projects=5, latency=0.0)) as server:
+            project_id = server.org.projects[0]["id"]
+            client = NeonAPIClient("test-api-key", base_url=server.base_url, snapshot_path=path)
+            await client.ensure_catalog()
+            branches = await client.get_branches(project_id)
+            await client.aclose()
+            assert os.path.exists(path)
+            
+            server.reset_counters()
+            warm = NeonAPIClient("test-api-key", base_url=server.base_url, snapshot_path=path)
+            # Counts exact upstream requests, so no speculative follow-ups
+            warm.prefetcher = None
+            assert warm.catalog.loaded and len(warm.catalog) == 5
+            assert await warm.get_branches(project_id) == branches
+            assert server.requests_total == 0
+            print(f"✓ Warm start answered from the snapshot in {warm.snapshot.load_ms} ms with no API calls")
+            
+            # The stale copy is revalidated in the background, then served fresh
+            for _ in range(200):
+                if server.not_modified:
+                    break
+                await asyncio.sleep(0.01)
+            assert server.requests_total == 1 and server.not_modified == 1
+            await warm.get_branches(project_id)
+            assert server.requests_total == 1 and warm.cache_stats()["stale_served"] == 1
+            await warm.aclose()
+            
+            other = NeonAPIClient("another-api-key", base_url=server.base_url, snapshot_path=path)
+            assert not other.catalog.loaded
+            print("✓ Snapshot is revalidated after serving and ignored for another API key")
+            
+            with patch.object(neonorgdb, "SNAPSHOT_MAX_AGE", 60):
+                with patch("neon_snapshot.time.time", return_value=time.time() + 120):
+                    expired = NeonAPIClient("test-api-key", base_url=server.base_url, snapshot_path=path)
+            assert not expired.catalog.loaded and expired.snapshot.stats()["expired"]
+            assert expired.snapshot.loaded_entries == 0
+            print("✓ A snapshot older than NEON_SNAPSHOT_MAX_AGE_SECONDS is not restored")
+    return True
+
+async def test_consumption_summary():
+    """Test consumption aggregation and reuse of already fetched days"""
+    import httpx
+    import neon_analytics
+    from neon_analytics import day_timestamp, parse_day
+    from neon_mock import MockNeonConfig, MockNeonServer
+    from neonorgdb import NeonAPIClient
+    
+    async with MockNeonServer(MockNeonConfig(projects=3, latency=0.0)) as server:
+        client = NeonAPIClient("test-api-key", base_url=server.base_url)
+        
+        def fetch(lo, hi):
+            return client.iter_project_consumption(day_timestamp(lo), day_timestamp(hi))
+        
+        try:
+            store = client.consumption
+            january = await store.query(fetch, parse_day("2024-01-01"), parse_day("2024-02-01"),
+                                        group_by=["project", "month"], metrics=["compute_time_seconds"])
+            assert january["columns"] == ["project", "month", "compute_time_seconds"]
+            assert len(january["rows"]) == 3 and {row[1] for row in january["rows"]} == {"2024-01"}
+            expected = sum(day["compute_time_seconds"]
+                           for project in server.org.projects
+                           for day in server.org.daily_consumption(
+                               project["id"], "2024-01-01T00:00:00Z", "2024-02-01T00:00:00Z"
+                           )["periods"][0]["consumption"])
+            assert january["totals"]["compute_time_seconds"] == expected
+            
+            calls = server.requests_total
+            overlap = await store.query(fetch, parse_day("2024-01-15"), parse_day("2024-02-15"), group_by=["week"])
+            assert overlap["fetched_ranges"] == [["2024-02-01", "2024-02-15"]]
+            assert server.requests_total == calls + 1
+            print("✓ Overlapping range only fetched the 14 days not already stored")
+            
+            # The pure Python fallback agrees with the vectorized path
+            vectorized = overlap["rows"]
+            numpy_module, neon_analytics.np = neon_analytics.np, None
+            try:
+                fallback = await store.query(fetch, parse_day("2024-01-15"), parse_day("2024-02-15"),
+                                             group_by=["week"])
+            finally:
+                neon_analytics.np = numpy_module
+            assert fallback["rows"] == vectorized
+            print("✓ Weekly aggregates match with and without numpy")
+            
+            async def failing(lo, hi):
+                pages = fetch(lo, hi)
+                yield await pages.__anext__()
+                await pages.aclose()
+                raise httpx.ReadTimeout("second page timed out")
+            
+            store = neon_analytics.ConsumptionStore()
+            args = (parse_day("2024-01-01"), parse_day("2024-02-01"))
+            kwargs = {"group_by": ["project", "month"], "metrics": ["compute_time_seconds"]}
+            try:
+                await store.query(failing, *args, **kwargs)
+            except httpx.ReadTimeout:
+                pass
+            assert len(store.settled) == 0 and store.covered == []
+            retried = await store.query(fetch, *args, **kwargs)
+            assert retried["totals"] == january["totals"] and retried["rows"] == january["rows"]
+            print("✓ A fetch failing partway leaves nothing cached; the retry totals match a clean run")
+        finally:
+            await client.aclose()
+    return True
+
+async def test_response_shaping():
+    """Test field selection and compact tables without touching cached responses"""
+    import copy
+    import json
+    from neon_mock import MockOrg, MockNeonConfig
+    from neon_projection import shape
+    
+    org = MockOrg(MockNeonConfig(projects=100))
+    listing = {"projects": org.projects, "pagination": {"cursor": "abc"}}
+    original = copy.deepcopy(listing)
+    
+    selected = shape(listing, ["id", "settings.allowed_ips.ips", "missing.field"])
+    assert selected["pagination"] == {"cursor": "abc"}
+    assert selected["projects"][0] == {"id": org.projects[0]["id"], "settings": {"allowed_ips": {"ips": []}}}
+    
+    table = shape(listing, ["id", "name", "region_id"], compact=True)
+    assert table["projects"]["columns"] == ["id", "name", "region_id"]
+    assert table["projects"]["rows"][0] == [org.projects[0]["id"], org.projects[0]["name"], org.projects[0]["region_id"]]
+    assert shape({"project": org.projects[0]}, ["name"]) == {"project": {"name": org.projects[0]["name"]}}
+    assert shape(listing, ["settings", "settings.enable_logical_replication"])["projects"][0]["settings"] is \
+        org.projects[0]["settings"]
+    
+    tagged = {"projects": [{"id": "p1", "tags": [{"k": 1, "v": "a"}, {"v": "b"}, {"k": 3}]}, {"id": "p2", "tags": [{}]}]}
+    assert shape(tagged, ["id", "tags.k"]) == {"projects": [{"id": "p1", "tags": [{"k": 1}, {"k": 3}]}, {"id": "p2"}]}
+    assert shape(tagged, ["tags.k", "tags.v"])["projects"][0]["tags"] == [{"k": 1, "v": "a"}, {"v": "b"}, {"k": 3}]
+    assert shape(tagged, ["id", "tags.k"], compact=True)["projects"]["rows"] == [["p1", [1, 3]], ["p2", []]]
+    print("✓ Paths through lists select from each element and leave out elements without the field")
+    assert listing == original
+    
+    ratio = len(json.dumps(listing)) / len(json.dumps(table))
+    assert ratio > 10
+    print(f"✓ Compact 3-column listing is {ratio:.0f}x smaller and the source is unchanged")
+    return True
+
+async def test_metrics():
+    """Test tool and upstream instrumentation and the Prometheus export"""
+    import logging
+    from fastmcp import Client
+    from neon_metrics import Histogram, MetricsRegistry, route_template
+    from neon_mock import MockNeonConfig, MockNeonServer
+    import neonorgdb
+    
+    histogram = Histogram()
+    for ms in range(1, 101):
+        histogram.observe(ms / 1000)
+    assert 0.04 <= histogram.quantile(0.5) <= 0.06 and histogram.quantile(0.99) <= 0.1
+    assert route_template("/projects/p-1/branches/br-2/roles") == "/projects/{id}/branches/{id}/roles"
+    assert route_template("/consumption_history/projects?limit=10") == "/consumption_history/projects"
+    assert route_template("/users/me") == "/users/me"
+    
+    registry = MetricsRegistry(slow_call_seconds=0.001)
+    with patch.object(logging.getLogger("neonorgdb"), "warning") as warning:
+        registry.log_if_slow("tool", "list_projects", 0.5)
+    assert warning.called
+    
+    neonorgdb.metrics.reset()
+    async with MockNeonServer(MockNeonConfig(projects=3, latency=0.0)) as server:
+        project_id = server.org.projects[0]["id"]
+        with patch.dict(os.environ, {"NEON_API_KEY": "test-api-key"}):
+            await neonorgdb.close_neon_client()
+            neonorgdb._neon_client = neonorgdb.NeonAPIClient("test-api-key", base_url=server.base_url)
+            async with Client(neonorgdb.mcp) as client:
+                for _ in range(3):
+                    await client.call_tool("list_project_branches", {"project_id": project_id})
+                text = (await client.call_tool("get_diagnostics", {"output_format": "prometheus"}))[0].text
+    
+    metrics = neonorgdb.metrics
+    assert metrics.counter_value("neonorgdb_tool_calls_total", tool="list_project_branches", outcome="ok") == 3
+    assert metrics.counter_value("neonorgdb_cache_events_total", endpoint_class="branches", event="hit") == 2
+    assert metrics.histogram("neonorgdb_upstream_duration_seconds", method="GET",
+                             route="/projects/{id}/branches").count == 1
+    assert 'neonorgdb_upstream_responses_total{method="GET",route="/projects/{id}/branches",status="200"} 1' in text
+    assert 'neonorgdb_tool_duration_seconds_bucket{tool="list_project_branches",le="+Inf"} 3' in text
+    print("✓ Tool, upstream and cache metrics recorded and exported as Prometheus text")
+    return True
+
+async def test_batch_lookup():
+    """Test that a batch runs concurrently, keeps request order and isolates failures"""
+    from neon_batch import BatchRunner
+    from neon_mock import MockNeonConfig, MockNeonServer
+    from neonorgdb import NeonAPIClient
+    
+    async with MockNeonServer(MockNeonConfig(projects=4, latency=0.05, latency_jitter=0.0)) as server:
+        projects = server.org.projects
+        requests = [{"op": "project", "project_id": project["id"]} for project in projects]
+        requests += [
+            {"op": "project", "project_id": "no-such-project"},
+            {"op": "databases", "project_id": projects[0]["id"]},
+            {"op": "unknown", "project_id": projects[0]["id"]},
+            {"op": "branches", "project_id": projects[1]["id"], "fields": ["id"], "compact": True},
+        ]
+        client = NeonAPIClient("test-api-key", base_url=server.base_url)
+        try:
+            started = asyncio.get_running_loop().time()
+            batch = await BatchRunner(client, max_concurrency=8).run(requests)
+            elapsed = asyncio.get_running_loop().time() - started
+        finally:
+            await client.aclose()
+    
+    results = batch["results"]
+    assert [result["index"] for result in results] == list(range(len(requests)))
+    assert [result["result"]["project"]["id"] for result in results[:4]] == [p["id"] for p in projects]
+    assert results[4]["status"] == 404
+    assert "branch_id" in results[5]["error"] and "Unknown op" in results[6]["error"]
+    assert results[7]["result"]["branches"]["columns"] == ["id"]
+    assert batch["summary"] == {"requested": 8, "succeeded": 5, "failed": 3}
+    assert elapsed < 0.2
+    print(f"✓ 8 lookups in {elapsed * 1000:.0f} ms, in order, with 3 per-item errors")
+    return True
+
+async def test_circuit_breaker():
+    """Test that an open circuit fails fast, serves flagged stale data and recovers via a probe"""
+    import httpx
+    import neonorgdb
+    from neon_breaker import BreakerBoard, CircuitOpenError
+    from neon_mock import MockNeonConfig, MockNeonServer
+    from neonorgdb import NeonAPIClient
+    
+    async with MockNeonServer(MockNeonConfig(projects=3, latency=0.0, latency_jitter=0.0)) as server, \
+            httpx.AsyncClient() as http_client:
+        cached, uncached = server.org.projects[0]["id"], server.org.projects[1]["id"]
+        client = NeonAPIClient("test-api-key", http_client=http_client, base_url=server.base_url)
+        client.breakers = BreakerBoard(failure_threshold=2, reset_timeout=0.2)
+        try:
+            # One request that fails on every retry is one failure, not one per attempt
+            server.config.error_rate_5xx = 1.0
+            with patch.object(neonorgdb, "MAX_RETRIES", 2), patch.object(neonorgdb, "RETRY_BASE_DELAY", 0.001):
+                try:
+                    await client.get_branches(uncached)
+                    assert False, "expected HTTPStatusError"
+                except httpx.HTTPStatusError:
+                    pass
+            assert server.errors_injected[503] == 3
+            assert client.breakers.get("branches").stats()["consecutive_failures"] == 1
+            assert client.breakers.get("branches").state == "closed"
+            server.config.error_rate_5xx = 0.0
+            print("✓ A request failing on all 3 attempts counted as one breaker failure")
+            
+            # A 429 is neither a failure nor a sign of recovery, so it must not reset the count
+            with patch.object(neonorgdb, "MAX_RETRIES", 0):
+                for rate_429, rate_5xx in ((0.0, 1.0), (1.0, 0.0), (0.0, 1.0)):
+                    server.config.error_rate_429, server.config.error_rate_5xx = rate_429, rate_5xx
+                    try:
+                        await client.get_endpoints(uncached)
+                        assert False, "expected HTTPStatusError"
+                    except httpx.HTTPStatusError:
+                        pass
+            server.config.error_rate_429 = server.config.error_rate_5xx = 0.0
+            assert server.errors_injected[429] == 1 and client.breakers.get("endpoints").state == "open"
+            print("✓ 5xx, 429, 5xx opened the circuit; the 429 in between did not reset the failure count")
+            
+            with patch.object(neonorgdb, "MAX_RETRIES", 0):
+                assert "_cache" not in await client.get_project(cached)
+                server.config.error_rate_5xx = 1.0
+                
+                # Failures below the threshold still fall back to the cached copy, flagged stale
+                for _ in range(2):
+                    stale = await client.get_project(cached, refresh=True)
+                    assert stale["_cache"]["stale"] and stale["project"]["id"] == cached
+                assert client.breakers.get("project").state == "open"
+                
+                # Open circuit: no upstream request, stale data or an immediate error
+                before = server.requests_total
+                stale = await client.get_project(cached, refresh=True)
+                assert "circuit for project is open" in stale["_cache"]["reason"]
+                try:
+                    await client.get_project(uncached)
+                    assert False, "expected CircuitOpenError"
+                except CircuitOpenError:
+                    pass
+                assert server.requests_total == before
+                assert client.breakers.get("branches").state == "closed"
+                
+                server.config.error_rate_5xx = 0.0
+                await asyncio.sleep(0.35)
+                assert client.breakers.get("project").state == "closed"
+                fresh = await client.get_project(uncached)
+                assert "_cache" not in fresh
+                stats = client.breaker_stats()["circuits"]["project"]
+                assert stats["opens"] == 1 and stats["rejected"] == 2 and stats["probes"] >= 1
+        finally:
+            await client.aclose()
+    
+    print("✓ Circuit opened after 2 failures, failed fast, served stale data and closed after a probe")
+    return True
+
+async def test_startup():
+    """Test lazy imports, deferred snapshot restore and the import-time report parser"""
+    import subprocess
+    import tempfile
+    from neon_mock import MockNeonConfig, MockNeonServer
+    from neon_startup import by_package, direct_imports, parse_importtime
+    from neonorgdb import NeonAPIClient
+    
+    probe = subprocess.run([sys.executable, "-c", "import sys, neonorgdb; print('numpy' in sys.modules)"],
+                           capture_output=True, text=True, check=True,
+                           cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert probe.stdout.strip() == "False"
+    print("✓ Importing the server does not import numpy")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "snapshot.jsonl.gz")
+        async with MockNeonServer(MockNeonConfig(projects=3, latency=0.0)) as server:
+            first, second = (project["id"] for project in server.org.projects[:2])
+            client = NeonAPIClient("test-api-key", base_url=server.base_url, snapshot_path=path)
+            await client.ensure_catalog()
+            await client.get_branches(first)
+            await client.get_branches(second)
+            await client.aclose()
+            
+            deferred = NeonAPIClient("test-api-key", base_url=server.base_url, snapshot_path=path,
+                                     defer_snapshot=True)
+            assert not deferred.catalog.loaded
+            # Fetched before the snapshot arrived, so the snapshot must not overwrite it
+            await deferred.get_branches(first)
+            await deferred.restore_snapshot()
+            assert deferred.catalog.loaded and len(deferred.catalog) == 3
+            await deferred.get_branches(first)
+            await deferred.get_branches(second)
+            assert deferred.cache_stats()["stale_served"] == 1
+            await deferred.aclose()
+    print("✓ Deferred snapshot restore keeps entries fetched in the meantime")
+    
+    stderr = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       100 |        100 |   _json",
+        "import time:       400 |        500 | json",
+        "import time:       300 |        300 |     httpx._models",
+        "import time:      1000 |       1300 |   httpx",
+        "import time:       200 |        200 |   neon_cache",
+        "import time:       500 |       2000 | neonorgdb",
+    ])
+    records = parse_importtime(stderr)
+    assert records[2] == ("httpx._models", 2, 0.3, 0.3)
+    assert direct_imports(records, "neonorgdb") == [
+        {"module": "httpx", "cumulative_ms": 1.3}, {"module": "neon_cache", "cumulative_ms": 0.2}]
+    assert by_package(records)[0] == {"package": "httpx", "self_ms": 1.3, "modules": 2}
+    print("✓ Import-time output is attributed to direct imports and packages")
+    return True
+
+async def test_json_codec():
+    """Test the JSON backends and item-by-item decoding of list pages"""
+    import json
+    from fastmcp.tools.tool import default_serializer
+    from neon_json import JSONCodec, iter_page, orjson
+    
+    page = {"pagination": {"cursor": "b"}, "projects": [{"id": "a", "name": "é"}, {"id": "b", "tags": [1, 2]}],
+            "total": 2}
+    for text in (json.dumps(page), json.dumps(page, indent=2), json.dumps(page, separators=(",", ":"))):
+        envelope, items = iter_page(text.encode(), "projects")
+        assert envelope == {"pagination": {"cursor": "b"}}
+        first = next(items)
+        assert first == {"id": "a", "name": "é"} and "total" not in envelope
+        assert list(items) == page["projects"][1:] and envelope["total"] == 2
+    envelope, items = iter_page(b'{"projects": [], "pagination": {}}', "projects")
+    assert list(items) == [] and envelope == {"pagination": {}}
+    print("✓ List pages decode one item at a time, in any key order")
+    
+    backends = ["default"] + (["orjson"] if orjson is not None else [])
+    encoded = {JSONCodec(backend, fallback=default_serializer).dumps(page) for backend in backends}
+    assert encoded == {default_serializer(page)}
+    assert JSONCodec("default").loads(json.dumps(page).encode()) == page
+    try:
+        JSONCodec("simdjson")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print(f"✓ Backends {backends} encode tool results identically to FastMCP's serializer")
+    return True
+
+async def test_operation_waits():
+    """Test that concurrent waits on a project share one poller and return on terminal states"""
+    import time
+    from neon_mock import MockNeonConfig, MockNeonServer
+    from neonorgdb import NeonAPIClient
+    
+    async with MockNeonServer(MockNeonConfig(projects=2, operations_per_project=3, latency=0.0)) as server:
+        client = NeonAPIClient("test-api-key", base_url=server.base_url)
+        client.watchers.min_interval = 0.02
+        client.watchers.max_interval = 0.05
+        project_id = server.org.projects[0]["id"]
+        first = server.org.record_operation(project_id, "start_compute", status="running")
+        second = server.org.record_operation(project_id, "apply_config", status="scheduling")
+        try:
+            server.reset_counters()
+            waits = [asyncio.create_task(client.watchers.wait(project_id, [op["id"]], 5.0))
+                     for op in (first, second, first)]
+            await asyncio.sleep(0.15)
+            assert not any(wait.done() for wait in waits)
+            server.org.set_operation_status(project_id, first["id"], "finished")
+            server.org.set_operation_status(project_id, second["id"], "failed")
+            results = await asyncio.gather(*waits)
+            assert results[0][first["id"]]["status"] == "finished"
+            assert results[1][second["id"]]["status"] == "failed"
+            stats = client.watchers.stats()
+            assert stats["shared_waits"] == 2 and not stats["projects"]
+            # One feed poll per interval served all three waiters
+            assert server.requests_by_route["/projects/{id}/operations"] == stats["polls"]
+            assert stats["polls"] <= 15
+            print(f"✓ Three waiters shared {stats['polls']} polls of one operations feed")
+            
+            missing = await client.watchers.wait(project_id, ["op-does-not-exist"], 5.0)
+            assert missing["op-does-not-exist"]["status"] == "not_found"
+            print("✓ Unknown operation ids resolve as not_found")
+            
+            stalled = server.org.record_operation(project_id, "create_branch", status="running")
+            started = time.monotonic()
+            timed_out = await client.watchers.wait(project_id, [stalled["id"]], 0.2)
+            assert timed_out[stalled["id"]]["status"] == "running"
+            assert time.monotonic() - started < 1.0
+            print("✓ Wait returned the running state at its timeout")
+            
+            # An error that is not an API error reaches every waiter instead of ending the poller silently
+            broken = server.org.record_operation(project_id, "create_branch", status="running")
+            with patch.object(client, "get_operations", AsyncMock(side_effect=ValueError("bad feed page"))):
+                started = time.monotonic()
+                failed = await asyncio.gather(*(client.watchers.wait(project_id, [broken["id"]], 5.0)
+                                                for _ in range(2)), return_exceptions=True)
+            assert all(isinstance(error, ValueError) for error in failed) and time.monotonic() - started < 1.0
+            assert not client.watchers.watchers
+            print("✓ A non-HTTP poll error was raised to every waiter at once")
+        finally:
+            await client.aclose()
+    return True
+
+async def test_prefetching():
+    """Test that likely follow-up calls are prefetched into the cache within a budget"""
+    from neon_mock import MockNeonConfig, MockNeonServer
+    import neonorgdb
+    from neon_prefetch import Prefetcher, expand, parse_rules
+    from neonorgdb import NeonAPIClient
+    
+    assert parse_rules("/projects/abc -> /projects/abc/endpoints") == {"/projects/{id}": ["/projects/{id}/endpoints"]}
+    branches = {"branches": [{"id": "br-b"}, {"id": "br-a", "primary": True}]}
+    assert expand("/projects/p1/branches", branches, "/projects/{id}/branches/{id}/roles") == [
+        "/projects/p1/branches/br-a/roles", "/projects/p1/branches/br-b/roles"]
+    assert expand("/projects/p1", {}, "/projects/{id}/branches/{id}/roles") == []
+    
+    async with MockNeonServer(MockNeonConfig(projects=6, branches_per_project=3, latency=0.0)) as server:
+        assert NeonAPIClient("test-api-key", base_url=server.base_url).prefetcher is None
+        with patch.object(neonorgdb, "PREFETCH_ENABLED", True):
+            client = NeonAPIClient("test-api-key", base_url=server.base_url)
+        # No token bucket: the prefetch budget then only depends on free request slots
+        client.scheduler.bucket.rate = 0
+        try:
+            project_id = server.org.projects[0]["id"]
+            primary = server.org.branches[project_id][0]["id"]
+            await client.get_branches(project_id)
+            await client.prefetcher.drain()
+            server.reset_counters()
+            await client.get_databases(project_id, primary)
+            await client.get_roles(project_id, primary)
+            await client.get_project(project_id)
+            await client.prefetcher.drain()
+            before = server.requests_total
+            await client.get_endpoints(project_id)
+            assert server.requests_by_route.get("/projects/{id}/branches/{id}/databases") is None
+            assert server.requests_total == before == 2
+            stats = client.prefetcher.stats()
+            assert stats["used"] == 3 and stats["issued"] == 7
+            print(f"✓ Follow-up calls were cache hits ({stats['used']} of {stats['issued']} prefetches used)")
+            
+            client.prefetcher = Prefetcher(client, rules={}, min_samples=3)
+            for project in server.org.projects[1:4]:
+                await client.get_operations(project["id"])
+                await client.get_endpoints(project["id"])
+            assert client.prefetcher.stats()["learned_rules"] == {
+                "/projects/{id}/operations": ["/projects/{id}/endpoints"]}
+            next_id = server.org.projects[4]["id"]
+            await client.get_operations(next_id)
+            await client.prefetcher.drain()
+            server.reset_counters()
+            await client.get_endpoints(next_id)
+            assert server.requests_total == 0
+            print("✓ Learned operations -> endpoints from observed calls and prefetched it")
+            
+            # With no spare request slots, interactive calls keep the whole budget
+            client.prefetcher = Prefetcher(client, reserve=client.scheduler.max_concurrency)
+            server.reset_counters()
+            await client.get_branches(server.org.projects[5]["id"])
+            await client.prefetcher.drain()
+            assert server.requests_total == 1 and client.prefetcher.skipped_busy == 6
+            print("✓ Prefetching stood down when it would eat into the interactive reserve")
+        finally:
+            await client.aclose()
+    return True
+
+async def test_multiple_orgs():
+    """Test that named orgs get separate clients and cross-org tools fan out in parallel"""
+    import json
+    from fastmcp import Client
+    from neon_mock import MockNeonConfig, MockNeonServer
+    import neonorgdb
+    
+    async with MockNeonServer(MockNeonConfig(projects=3, latency=0.0, seed=1)) as prod, \
+            MockNeonServer(MockNeonConfig(projects=2, latency=0.0, seed=2)) as staging:
+        env = {
+            "NEON_ORGS": "prod,eu-staging,broken",
+            "NEON_API_KEY_PROD": "prod-key", "NEON_API_BASE_PROD": prod.base_url,
+            "NEON_API_KEY_EU_STAGING": "staging-key", "NEON_API_BASE_EU_STAGING": staging.base_url,
+            "NEON_RATE_LIMIT_RPS_EU_STAGING": "3",
+            # Answers every call with a 404
+            "NEON_API_KEY_BROKEN": "broken-key", "NEON_API_BASE_BROKEN": prod.base_url.replace("/api/v2", "/nowhere"),
+        }
+        with patch.dict(os.environ, env):
+            await neonorgdb.close_neon_client()
+            try:
+                default = neonorgdb.get_neon_client()
+                other = neonorgdb.get_neon_client("eu-staging")
+                assert default is neonorgdb.get_neon_client("prod") and default.org == "prod"
+                assert other.scheduler.bucket.rate == 3 and default.scheduler.bucket.rate == neonorgdb.RATE_LIMIT_PER_SECOND
+                assert other.cache is not default.cache and other.scheduler is not default.scheduler
+                for bad in ("nope", "*"):
+                    try:
+                        neonorgdb.get_neon_client(bad)
+                        raise AssertionError(f"org {bad!r} should be rejected")
+                    except ValueError:
+                        pass
+                print("✓ Each org has its own client, rate budget and cache")
+                
+                async with Client(neonorgdb.mcp) as client:
+                    found = json.loads((await client.call_tool("find_projects", {"org": "*"}))[0].text)
+                    single = json.loads((await client.call_tool("find_projects", {"org": "eu-staging"}))[0].text)
+                    inventory = json.loads((await client.call_tool(
+                        "get_organization_inventory", {"org": "*", "include": ["branches"]}))[0].text)
+            finally:
+                await neonorgdb.close_neon_client()
+    
+    assert [project["org"] for project in found["projects"]].count("prod") == 3
+    assert {project["id"] for project in single} == {project["id"] for project in staging.org.projects}
+    assert found["orgs"]["prod"] == {"count": 3} and found["orgs"]["eu-staging"] == {"count": 2}
+    assert "404" in found["orgs"]["broken"]["error"]
+    print("✓ find_projects(org='*') merged two orgs and reported the failing one")
+    assert inventory["summary"]["projects"] == 5 and inventory["summary"]["branches"] == 15
+    assert inventory["orgs"]["eu-staging"]["projects"] == 2 and "error" in inventory["orgs"]["broken"]
+    print("✓ Cross-org inventory crawled every org and summed the counts")
+    return True
+
+async def test_shared_cache_tier():
+    """Test that clients in different workers share responses through the SQLite tier"""
+    import tempfile
+    from neon_mock import MockNeonConfig, MockNeonServer
+    from neon_shared import SharedCache
+    import neonorgdb
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "shared.sqlite3")
+        async with MockNeonServer(MockNeonConfig(projects=2, latency=0.0)) as server:
+            project_id = server.org.projects[0]["id"]
+            with patch.object(neonorgdb, "SHARED_CACHE_PATH", path):
+                first = neonorgdb.NeonAPIClient("test-api-key", base_url=server.base_url)
+                second = neonorgdb.NeonAPIClient("test-api-key", base_url=server.base_url)
+                other_key = neonorgdb.NeonAPIClient("another-api-key", base_url=server.base_url)
+            for client in (first, second, other_key):
+                client.prefetcher = None
+            try:
+                branches = await first.get_branches(project_id)
+                await asyncio.sleep(0.05)
+                server.reset_counters()
+                assert await second.get_branches(project_id) == branches
+                assert server.requests_total == 0 and second.shared.stats()["hits"] == 1
+                print("✓ Second worker answered from the shared tier without an API call")
+                
+                await second.get_branches(project_id, refresh=True)
+                await other_key.get_branches(project_id)
+                assert server.requests_total == 2
+                print("✓ refresh=True and another API key bypass the shared tier")
+                
+                # An operation changed the listing: the expiring worker must not read the old row back
+                listing = server.org.branches[project_id]
+                listing.append({**listing[-1], "id": f"br-{project_id}-new"})
+                server.reset_counters()
+                second.expire_cached(f"/projects/{project_id}/branches", recursive=False)
+                updated = await second.get_branches(project_id)
+                assert server.requests_total == 1 and len(updated["branches"]) == len(branches["branches"]) + 1
+                await asyncio.sleep(0.05)
+                with patch.object(neonorgdb, "SHARED_CACHE_PATH", path):
+                    third = neonorgdb.NeonAPIClient("test-api-key", base_url=server.base_url)
+                third.prefetcher = None
+                assert await third.get_branches(project_id) == updated
+                await third.aclose()
+                print("✓ Expiring a listing after an operation also skipped its outdated shared row")
+            finally:
+                for client in (first, second, other_key):
+                    await client.aclose()
+        
+        store = SharedCache(os.path.join(tmp, "expire.sqlite3"), "ns")
+        for key in ["/projects/p1", "/projects/p1/branches", "/projects/p1/branches/b1/roles", "/projects/p10"]:
+            store.put((key, ()), b"{}")
+        store.put(("/projects/p1/operations", (("limit", "10"),)), b"{}")
+        store.expire("/projects/p1/branches")
+        store.expire("/projects/p1", recursive=False)
+        fresh = {key for key in ["/projects/p1", "/projects/p1/branches", "/projects/p1/branches/b1/roles",
+                                 "/projects/p10"] if store.get((key, ()), 60) is not None}
+        assert fresh == {"/projects/p10"} and store.get(("/projects/p1/operations", (("limit", "10"),)), 60)
+        store.close()
+        print("✓ Shared rows are expired by exact path or subtree without touching sibling paths")
+    return True
+
+async def test_http_transport():
+    """Test serving MCP sessions over streamable HTTP, in one process and as a stateless worker"""
+    import json
+    import socket
+    import stat
+    import tempfile
+    import httpx
+    import uvicorn
+    from fastmcp import Client
+    from fastmcp.client.transports import StreamableHttpTransport
+    from neon_mock import MockNeonConfig, MockNeonServer
+    import main
+    import neonorgdb
+    
+    async def call_over_http(app):
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+        server = uvicorn.Server(uvicorn.Config(app, lifespan="on", log_level="warning"))
+        task = asyncio.create_task(server.serve(sockets=[sock]))
+        try:
+            while not server.started:
+                await asyncio.sleep(0.01)
+            async with Client(StreamableHttpTransport(f"http://127.0.0.1:{port}/mcp/")) as client:
+                found = json.loads((await client.call_tool("find_projects", {}))[0].text)
+            async with httpx.AsyncClient() as http:
+                scrape = await http.get(f"http://127.0.0.1:{port}/metrics")
+            # The app holds a session of its own, so the shared client outlives the agent's session
+            kept = neonorgdb._neon_client is not None
+        finally:
+            server.should_exit = True
+            await task
+        return found, scrape, kept
+    
+    stateless = neonorgdb.mcp.settings.stateless_http
+    async with MockNeonServer(MockNeonConfig(projects=3, latency=0.0)) as mock:
+        with patch.dict(os.environ, {"NEON_API_KEY": "test-api-key", "NEON_TRANSPORT": "streamable-http"}):
+            try:
+                for name, make_app in [("http_app", lambda: neonorgdb.http_app("streamable-http")),
+                                       ("worker_app", neonorgdb.worker_app)]:
+                    await neonorgdb.close_neon_client()
+                    neonorgdb._neon_client = neonorgdb.NeonAPIClient("test-api-key", base_url=mock.base_url)
+                    with patch.object(neonorgdb, "WORKERS", 1 if name == "http_app" else 2):
+                        app = make_app()
+                        assert neonorgdb.mcp.settings.stateless_http == (name == "worker_app")
+                        found, scrape, kept = await call_over_http(app)
+                    assert {project["id"] for project in found} == {project["id"] for project in mock.org.projects}
+                    assert scrape.status_code == 200 and "neonorgdb_tool_calls_total" in scrape.text
+                    assert kept and neonorgdb._neon_client is None
+                    print(f"✓ {name} answered a tool call and /metrics, and closed the client on shutdown")
+            finally:
+                neonorgdb.mcp.settings.stateless_http = stateless
+                await neonorgdb.close_neon_client()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chmod(tmp, 0o755)
+        with patch.dict(os.environ, {"XDG_CACHE_HOME": tmp}):
+            os.makedirs(os.path.join(tmp, "neonorgdb"), mode=0o755)
+            directory = main.private_cache_dir()
+        assert directory == os.path.join(tmp, "neonorgdb") and stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+        from neon_shared import SharedCache
+        shared = SharedCache(os.path.join(directory, "shared-8000.sqlite3"), "ns")
+        shared.put(("/projects", ()), b"{}")
+        shared.close()
+        assert stat.S_IMODE(os.stat(shared.path).st_mode) == 0o600
+    print("✓ The default shared cache directory is private to its owner, and the file is 0600")
+    return True
+
+async def test_branch_topology():
+    """Test ancestry, descendant and cleanup queries over the synced branch trees"""
+    import json
+    from fastmcp import Client
+    from neon_mock import MockNeonConfig, MockNeonServer
+    from neon_topology import parse_cutoff, parse_timestamp
+    import neonorgdb
+    
+    async with MockNeonServer(MockNeonConfig(projects=4, branches_per_project=6, latency=0.0)) as server:
+        branches = server.org.branches[server.org.projects[0]["id"]]
+        project_id = branches[0]["project_id"]
+        parents = {branch["id"]: branch.get("parent_id") for branch in branches}
+        with patch.dict(os.environ, {"NEON_API_KEY": "test-api-key"}):
+            await neonorgdb.close_neon_client()
+            neonorgdb._neon_client = neonorgdb.NeonAPIClient("test-api-key", base_url=server.base_url)
+            neonorgdb._neon_client.prefetcher = None
+            async with Client(neonorgdb.mcp) as client:
+                tree = json.loads((await client.call_tool("get_branch_lineage", {"project_id": project_id}))[0].text)
+                server.reset_counters()
+                lineage = json.loads((await client.call_tool(
+                    "get_branch_lineage", {"project_id": project_id, "branch_id": branches[-1]["id"]}))[0].text)
+                stale = json.loads((await client.call_tool(
+                    "find_branches", {"leaves_only": True, "without_active_endpoint": True}))[0].text)
+                old = json.loads((await client.call_tool(
+                    "find_branches", {"older_than": "2024-01-01T05:00:00Z"}))[0].text)
+                filtered = json.loads((await client.call_tool(
+                    "find_branches", {"project_ids": [project_id, "p-unknown"]}))[0].text)
+                assert server.requests_total == 0
+                print("✓ Lineage and cleanup queries after the first sync made no API calls")
+                
+                topology = neonorgdb._neon_client.topology
+                builds = topology.stats()["builds"]
+                new_branch = {**branches[-1], "id": f"br-{project_id}-new", "parent_id": branches[-1]["id"],
+                              "created_at": "2024-06-01T00:00:00Z", "default": False, "primary": False}
+                branches.append(new_branch)
+                server.org.record_operation(project_id, "create_branch", branch_id=new_branch["id"])
+                await neonorgdb._neon_client.org_sync.sync(full=True)
+                grown = json.loads((await client.call_tool(
+                    "get_branch_lineage", {"project_id": project_id, "branch_id": branches[-2]["id"]}))[0].text)
+                # Reads every project; the unchanged ones reuse their trees
+                topology.find()
+    
+    assert [(node["id"], node["depth"]) for node in tree["descendants"]][0] == (branches[0]["id"], 0)
+    assert len(tree["descendants"]) == 6 and tree["default_branch_id"] == branches[0]["id"]
+    expected = []
+    parent_id = parents[branches[-2]["id"]]
+    while parent_id is not None:
+        expected.append(parent_id)
+        parent_id = parents[parent_id]
+    assert [node["id"] for node in lineage["ancestors"]] == expected
+    assert lineage["ancestors"][-1]["id"] == branches[0]["id"] and lineage["descendants"] == []
+    print("✓ Ancestors run from the parent up to the root branch")
+    
+    expected_stale = set()
+    for project in server.org.projects:
+        listed = [branch for branch in server.org.branches[project["id"]] if branch["id"] != new_branch["id"]]
+        with_children = {branch.get("parent_id") for branch in listed}
+        active = {endpoint["branch_id"] for endpoint in server.org.endpoints[project["id"]]
+                  if endpoint["current_state"] in ("active", "init")}
+        expected_stale |= {branch["id"] for branch in listed
+                           if branch["id"] not in with_children and branch["id"] not in active and not branch["default"]}
+    assert {branch["id"] for branch in stale["branches"]} == expected_stale and stale["projects_searched"] == 4
+    # After the unfiltered calls built every tree, only the listed, synced project is counted
+    assert filtered["projects_searched"] == 1 and {branch["project_id"] for branch in filtered["branches"]} == {project_id}
+    created = [branch["created_at"] for branch in stale["branches"]]
+    assert created == sorted(created)
+    # Only project 0 has branches created before 05:00, and its default branch is excluded
+    assert old["count"] == 2 and all(branch["created_at"] < "2024-01-01T05:00:00Z" for branch in old["branches"])
+    print("✓ Leaf branches without an active endpoint and branches older than a cutoff found across projects")
+    
+    assert [node["id"] for node in grown["descendants"]] == [new_branch["id"]]
+    assert topology.stats()["builds"] == builds + 1
+    print("✓ Only the project whose branch listing changed was rebuilt")
+    assert parse_cutoff("2d", now=parse_timestamp("2024-01-03")) == parse_timestamp("2024-01-01")
+    return True
+
+async def test_compact_records():
+    """Test that compact records rebuild the full objects and hold far less memory than dicts"""
+    import gc
+    import json
+    import tracemalloc
+    from neon_catalog import ProjectCatalog
+    from neon_mock import MockNeonConfig, MockOrg
+    from neon_records import RECORD_TYPES, BranchRecord, ProjectRecord
+    
+    org = MockOrg(MockNeonConfig(projects=200, branches_per_project=5))
+    listings = {
+        "projects": org.projects,
+        "branches": [item for items in org.branches.values() for item in items],
+        "endpoints": [item for items in org.endpoints.values() for item in items],
+        "databases": [item for items in org.databases.values() for item in items],
+        "roles": [item for items in org.roles.values() for item in items],
+        "operations": [item for items in org.operations.values() for item in items],
+    }
+    for kind, items in listings.items():
+        records = [RECORD_TYPES[kind].from_payload(item) for item in items]
+        assert all(record.payload() == item for record, item in zip(records, items)), kind
+        assert list(records[0].payload()) == list(items[0])
+    print("✓ Every kind of record rebuilds its original object, key order included")
+    
+    branch = BranchRecord.from_payload(org.branches[org.projects[0]["id"]][1])
+    assert branch.get("parent_id") == branch["parent_id"] and branch.get("logical_size") == branch.payload()["logical_size"]
+    assert branch.get("missing", "fallback") == "fallback" and "missing" not in branch
+    first, second = (BranchRecord.from_payload(json.loads(json.dumps(item))) for item in listings["branches"][:2])
+    assert first.get("project_id") is second.get("project_id")
+    print("✓ Kept fields read from slots, other fields from the compressed rest, repeated strings interned")
+    
+    body = json.dumps(listings["branches"]).encode()
+    gc.collect()
+    tracemalloc.start()
+    decoded = json.loads(body)
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    gc.collect()
+    tracemalloc.start()
+    records = [BranchRecord.from_payload(item) for item in decoded]
+    record_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert record_bytes * 2 < dict_bytes, (record_bytes, dict_bytes)
+    print(f"✓ {len(records)} branches: {dict_bytes // len(records)} bytes each as dicts, "
+          f"{record_bytes // len(records)} as records")
+    
+    catalog = ProjectCatalog()
+    catalog.load(org.projects)
+    assert isinstance(catalog._projects[org.projects[0]["id"]], ProjectRecord)
+    assert catalog.get(org.projects[0]["id"]) == org.projects[0]
+    assert catalog.find(region_id=org.projects[0]["region_id"])[0]["settings"] == org.projects[0]["settings"]
+    print("✓ Catalog holds records and still returns full project objects")
+    return True
+
+async def test_sql_pools():
+    """Test target resolution, pool eviction and, against NEON_TEST_PG_DSN, chunked read-only queries"""
+    import json
+    import time
+    from types import SimpleNamespace
+    from fastmcp import Client
+    from neon_mock import MockNeonConfig, MockNeonServer
+    import neon_sql
+    from neon_sql import SQLPools
+    import neonorgdb
+    
+    class Transaction:
+        def __init__(self, connection):
+            self.connection = connection
+        
+        async def start(self):
+            self.connection.in_transaction = True
+        
+        async def rollback(self):
+            self.connection.in_transaction = False
+    
+    class Cursor:
+        def __init__(self, rows, slow=False):
+            self.rows = rows
+            self.slow = slow
+        
+        async def fetch(self, n, timeout=None):
+            if self.slow:
+                # A statement that raised its own statement_timeout, with a driver ignoring its timeout
+                await asyncio.sleep(10)
+            chunk, self.rows = self.rows[:n], self.rows[n:]
+            return chunk
+    
+    class Statement:
+        def __init__(self, sql):
+            self.sql = sql
+        
+        def get_attributes(self):
+            return [SimpleNamespace(name="n")]
+        
+        async def cursor(self, *params, timeout=None):
+            return Cursor([(n,) for n in range(10)], slow="pg_sleep" in self.sql)
+    
+    class Connection:
+        def __init__(self):
+            self.executed = []
+            self.in_transaction = False
+        
+        def transaction(self, readonly=False):
+            self.readonly = readonly
+            return Transaction(self)
+        
+        async def execute(self, sql):
+            self.executed.append(sql)
+        
+        async def prepare(self, sql, timeout=None):
+            return Statement(sql)
+        
+        def is_closed(self):
+            return False
+        
+        def is_in_transaction(self):
+            return self.in_transaction
+    
+    class Pool:
+        def __init__(self, dsn, max_size=5):
+            self.dsn = dsn
+            self.max_size = max_size
+            self.in_use = 0
+            self.connections = []
+            self.closed = False
+            self.error = None
+        
+        async def acquire(self, timeout=None):
+            if self.error is not None:
+                raise self.error
+            if self.in_use >= self.max_size:
+                raise asyncio.TimeoutError()
+            self.in_use += 1
+            self.connections.append(Connection())
+            return self.connections[-1]
+        
+        async def release(self, connection):
+            self.in_use -= 1
+        
+        async def close(self):
+            self.closed = True
+    
+    async def create_pool(dsn, max_size=5, **kwargs):
+        return Pool(dsn, max_size)
+    
+    async def resolve(target):
+        return "postgresql://{3}@{0}.example/{2}".format(*target)
+    
+    now = [0.0]
+    pools = SQLPools(resolve, max_pools=2, idle_seconds=60, create_pool=create_pool, clock=lambda: now[0])
+    first = (await pools._pool(await pools._dsn(("p1", "br-1", "db", "owner")))).pool
+    await pools._pool(await pools._dsn(("p2", "br-1", "db", "owner")))
+    now[0] = 30
+    await pools._pool(await pools._dsn(("p1", "br-1", "db", "owner")))
+    await pools._pool(await pools._dsn(("p3", "br-1", "db", "owner")))
+    assert not first.closed and pools.stats()["pools"] == 2 and pools.pools_evicted == 1
+    print("✓ Least recently used pool was closed beyond max_pools")
+    now[0] = 100
+    assert await pools.evict_idle() == 2 and pools.stats()["pools"] == 0 and first.closed
+    await pools.aclose()
+    print("✓ Idle pools were closed after idle_seconds")
+    
+    target = ("p1", "br-1", "db", "owner")
+    pools = SQLPools(resolve, create_pool=create_pool)
+    other = SQLPools(resolve, create_pool=create_pool)
+    ids = [(await pools.query(target, "SELECT n", max_rows=2))["cursor"] for _ in range(2)]
+    foreign = (await other.query(target, "SELECT n", max_rows=2))["cursor"]
+    assert ids[0] != ids[1] and all(cursor.startswith(f"sql-{pools.instance}-") for cursor in ids)
+    assert len(ids[0]) - len(f"sql-{pools.instance}-") >= 22
+    rejected = []
+    for cursor in (foreign, f"sql-{pools.instance}-guess", "sql-1"):
+        try:
+            await pools.fetch(cursor)
+        except ValueError as exc:
+            rejected.append(str(exc))
+    assert len(rejected) == 3 and "this server process" in rejected[0] and "Unknown" in rejected[1]
+    assert (await pools.fetch(ids[0], max_rows=20))["rows"][0] == [2]
+    await pools.aclose()
+    await other.aclose()
+    print("✓ Cursor ids are random and carry their process; unknown and foreign ids are rejected")
+    
+    pools = SQLPools(resolve, create_pool=create_pool)
+    await pools.query(target, "SELECT n", max_rows=20, timeout=0.0001)
+    rejected = []
+    for timeout in (0, -1):
+        try:
+            await pools.query(target, "SELECT n", timeout=timeout)
+        except ValueError as exc:
+            rejected.append(str(exc))
+    connections = (await pools._pool(await pools._dsn(target))).pool.connections
+    await pools.aclose()
+    assert len(connections) == 1 and connections[0].executed == ["SET LOCAL statement_timeout = 1"]
+    assert connections[0].readonly
+    assert len(rejected) == 2 and all("must be positive" in error for error in rejected)
+    print("✓ Timeouts at or below zero are rejected and tiny ones clamped to 1 ms, never disabling the limit")
+    
+    for max_size in (1, 3):
+        pools = SQLPools(resolve, max_size=max_size, create_pool=create_pool)
+        ids = [(await pools.query(target, "SELECT n", max_rows=2))["cursor"] for _ in range(4)]
+        kept = (await pools.query(("p2", "br-1", "db", "owner"), "SELECT n", max_rows=2))["cursor"]
+        pool = (await pools._pool(await pools._dsn(target))).pool
+        open_ids = [cursor for cursor in ids if cursor in pools._cursors]
+        assert open_ids == ids[-max(1, max_size - 1):] and pool.in_use == len(open_ids) <= max(1, max_size - 1)
+        assert kept in pools._cursors and pools.cursors_expired == len(ids) - len(open_ids)
+        await pools.aclose()
+    print("✓ Open cursors leave a connection free in their pool; the oldest is closed when the pool runs out")
+    
+    resolved = []
+    async def resolve_counted(target):
+        resolved.append(target)
+        return await resolve(target)
+    
+    pools = SQLPools(resolve_counted, create_pool=create_pool)
+    await pools.query(target, "SELECT n", max_rows=20)
+    await pools.query(target, "SELECT n", max_rows=20)
+    pool = (await pools._pool(await pools._dsn(target))).pool
+    pool.error = OSError("connection refused")
+    try:
+        await pools.query(target, "SELECT n", max_rows=20)
+        assert False, "expected OSError"
+    except OSError:
+        pass
+    pool.error = None
+    await pools.query(target, "SELECT n", max_rows=20)
+    assert len(resolved) == 2
+    print("✓ A failed connection drops the cached URI, so the next query resolves the target again")
+    
+    started = time.monotonic()
+    with patch.object(neon_sql, "CLIENT_TIMEOUT_MARGIN", 0.05):
+        try:
+            await pools.query(target, "SELECT pg_sleep(60)", timeout=0.05)
+            assert False, "expected TimeoutError"
+        except asyncio.TimeoutError:
+            pass
+    assert time.monotonic() - started < 1.0 and pool.in_use == 0
+    await pools.aclose()
+    print("✓ A read is cancelled client-side shortly after the statement timeout")
+    
+    dsn = os.getenv("NEON_TEST_PG_DSN")
+    async with MockNeonServer(MockNeonConfig(projects=2, latency=0.0, connection_uri=dsn)) as server:
+        project_id = server.org.projects[0]["id"]
+        branch_id = server.org.branches[project_id][0]["id"]
+        database = server.org.databases[(project_id, branch_id)][0]
+        client = neonorgdb.NeonAPIClient("test-api-key", base_url=server.base_url)
+        client.prefetcher = None
+        try:
+            uri = await client.get_connection_uri(project_id, branch_id, database["name"], database["owner_name"])
+            assert uri == dsn or f"@ep-{project_id}-000" in uri
+            print("✓ Branch database resolved to its endpoint's connection URI through the API")
+        finally:
+            await client.aclose()
+        if not dsn:
+            print("- Set NEON_TEST_PG_DSN to a local PostgreSQL to run the query checks")
+            return True
+        
+        import asyncpg
+        setup = await asyncpg.connect(dsn)
+        await setup.execute("CREATE TABLE IF NOT EXISTS neonorgdb_probe (id int)")
+        try:
+            with patch.dict(os.environ, {"NEON_API_KEY": "test-api-key"}), patch.object(neonorgdb, "SQL_CHUNK_ROWS", 400):
+                await neonorgdb.close_neon_client()
+                neonorgdb._neon_client = neonorgdb.NeonAPIClient("test-api-key", base_url=server.base_url)
+                target = {"project_id": project_id, "branch_id": branch_id, "database": database["name"]}
+                async with Client(neonorgdb.mcp) as mcp_client:
+                    async def call(tool, arguments):
+                        return json.loads((await mcp_client.call_tool(tool, arguments))[0].text)
+                    
+                    first_page = await call("query_branch_database", {
+                        **target, "sql": "SELECT n, n * $1::int AS scaled FROM generate_series(1, 2500) AS n",
+                        "params": [2], "max_rows": 1000})
+                    pages = [first_page]
+                    while pages[-1]["cursor"]:
+                        pages.append(await call("fetch_query_rows", {"cursor": pages[-1]["cursor"], "max_rows": 1000}))
+                    exact = await call("query_branch_database", {**target, "sql": "SELECT 1 AS one", "max_rows": 1})
+                    stats = neonorgdb._neon_client.sql.stats()
+                    errors = []
+                    for sql, arguments in (("CREATE TABLE neonorgdb_created (id int)", {}),
+                                           ("SELECT pg_sleep(2)", {"timeout_seconds": 0.2}),
+                                           ("WITH x AS (INSERT INTO neonorgdb_probe VALUES (1) RETURNING *) SELECT * FROM x",
+                                            {})):
+                        try:
+                            await call("query_branch_database", {**target, "sql": sql, **arguments})
+                        except Exception as exc:
+                            errors.append(str(exc))
+            probe_rows = await setup.fetchval("SELECT count(*) FROM neonorgdb_probe")
+        finally:
+            await setup.execute("DROP TABLE neonorgdb_probe")
+            await setup.close()
+    
+    assert first_page["columns"] == ["n", "scaled"] and first_page["rows"][:2] == [[1, 2], [2, 4]]
+    assert [page["row_count"] for page in pages] == [1000, 1000, 500] and pages[-1]["rows_returned"] == 2500
+    assert exact["cursor"] is None and exact["rows"] == [[1]]
+    assert stats["pools"] == 1 and stats["open_cursors"] == 0 and stats["connections_in_use"] == 0
+    print("✓ 2500 rows streamed in three calls over one pooled connection; cursor closed at the end")
+    assert len(errors) == 3 and "return rows" in errors[0] and "statement timeout" in errors[1]
+    print("✓ Statements without rows are rejected and the statement timeout cancels slow queries")
+    assert "read-only" in errors[2] and probe_rows == 0
+    print("✓ A write that returns rows fails in the read-only transaction and changes nothing")
+    return True
+
 async def main():
     """Run all tests"""
     print("🧪 Testing Neon DB MCP Server Implementation\n")
@@ -89,6 +1478,31 @@ async def main():
         ("NeonAPIClient initialization", test_neon_client),
         ("MCP tools registration", test_tools_registration),
         ("Environment validation", test_environment_validation),
+        ("Response cache", test_response_cache),
+        ("Request coalescing", test_request_coalescing),
+        ("Project catalog", test_project_catalog),
+        ("Organization inventory", test_organization_inventory),
+        ("Request scheduler", test_request_scheduler),
+        ("Paginated streaming", test_paginated_streaming),
+        ("Mock Neon API", test_mock_neon_api),
+        ("Conditional revalidation", test_conditional_revalidation),
+        ("Incremental org sync", test_org_sync),
+        ("Snapshot warm start", test_snapshot_warm_start),
+        ("Consumption summary", test_consumption_summary),
+        ("Response shaping", test_response_shaping),
+        ("Metrics", test_metrics),
+        ("Batch lookup", test_batch_lookup),
+        ("Circuit breaker", test_circuit_breaker),
+        ("Startup", test_startup),
+        ("JSON codec", test_json_codec),
+        ("Operation waits", test_operation_waits),
+        ("Prefetching", test_prefetching),
+        ("Multiple orgs", test_multiple_orgs),
+        ("Shared cache tier", test_shared_cache_tier),
+        ("HTTP transport", test_http_transport),
+        ("Branch topology", test_branch_topology),
+        ("Compact records", test_compact_records),
+        ("SQL pools", test_sql_pools),
     ]
     
     results = []